@@ -1,8 +1,48 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 from .models import CustomUser
 
+# Filters applied to the user autocomplete of each profile's user field, so
+# that only users of the right role without such a profile are offered.
+PROFILE_USER_FILTERS = {
+    ("profiles", "professor"): Q(
+        is_staff=True, is_superuser=False, professor__isnull=True
+    ),
+    ("profiles", "student"): Q(
+        is_staff=False, is_superuser=False, student__isnull=True
+    ),
+}
+
+
+def is_autocomplete(request):
+    return request.resolver_match is not None and (
+        request.resolver_match.url_name == "autocomplete"
+    )
+
+
+def identifier_search(search_term, prefix=""):
+    """
+    Match users whose username, email or contact number starts with
+    ``search_term``. Ranges are used instead of LIKE so that the unique
+    indexes of those columns serve the lookup.
+    """
+    term = search_term.strip()
+    query = Q()
+    for field, value in (
+        ("username", term),
+        ("email_lookup", term.casefold()),
+        ("contact_number", term),
+    ):
+        query |= Q(
+            **{
+                "%s%s__gte" % (prefix, field): value,
+                "%s%s__lt" % (prefix, field): value + chr(0x10FFFF),
+            }
+        )
+    return query
+
 
 # Register your models here.
 class CustomUserAdmin(UserAdmin):
@@ -89,5 +129,17 @@ class CustomUserAdmin(UserAdmin):
     )
     ordering = ("last_name", "first_name", "username")
 
+    def get_search_results(self, request, queryset, search_term):
+        if not is_autocomplete(request):
+            return super().get_search_results(request, queryset, search_term)
+        user_filter = PROFILE_USER_FILTERS.get(
+            (request.GET.get("app_label"), request.GET.get("model_name"))
+        )
+        if user_filter is not None and request.GET.get("field_name") == "user":
+            queryset = queryset.filter(user_filter)
+        if search_term.strip():
+            queryset = queryset.filter(identifier_search(search_term))
+        return queryset, False
+
 
 admin.site.register(CustomUser, CustomUserAdmin)
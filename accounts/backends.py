@@ -1,33 +1,122 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
 from django.db.models import Q
 from accounts.models import CustomUser
+from enrollment_system.profiling import timed
 
+_hashing_pool = None
 
-class EmailBackend(ModelBackend):
+
+def hashing_pool():
+    """
+    The threads that hash passwords for async views, at most
+    PASSWORD_HASHING_THREADS of them, so that hashing blocks neither the
+    event loop nor the thread the rest of the request's sync code runs in.
+    """
+    global _hashing_pool
+    if _hashing_pool is None:
+        _hashing_pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, "PASSWORD_HASHING_THREADS", 4),
+            thread_name_prefix="password-hashing",
+        )
+    return _hashing_pool
+
+
+async def run_hasher(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(
+        hashing_pool(), function, *args
+    )
+
+
+class IdentifierBackend(ModelBackend):
+    """
+    Authenticate by username, email address or contact number with a single
+    query and a single password hash.
+
+    Emails match case-insensitively through the indexed email_lookup column.
+    Contact numbers match exactly, so that the unique index on them is used,
+    where the earlier contact number backend compared them with iexact; they
+    hold digits, for which the two agree.
+    """
+
+    @timed("auth.authenticate")
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None:
             username = kwargs.get(CustomUser.USERNAME_FIELD)
         if username is None or password is None:
             return
-        try:
-            user = CustomUser.objects.get(Q(email__iexact=username))
-        except CustomUser.DoesNotExist:
+        user = self.get_user_by_identifier(username)
+        if user is None:
+            # Run the default password hasher once to keep the timing of
+            # unknown identifiers close to that of wrong passwords.
             CustomUser().set_password(password)
             return
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
 
-
-class ContactNumberBackend(ModelBackend):
-    def authenticate(self, request, username=None, password=None, **kwargs):
+    @timed("auth.aauthenticate")
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        """
+        authenticate() for async views, with the async ORM and the password
+        hashed in hashing_pool().
+        """
         if username is None:
             username = kwargs.get(CustomUser.USERNAME_FIELD)
         if username is None or password is None:
             return
-        try:
-            user = CustomUser.objects.get(Q(contact_number__iexact=username))
-        except CustomUser.DoesNotExist:
-            CustomUser().set_password(password)
+        user = await self.aget_user_by_identifier(username)
+        if user is None:
+            await run_hasher(make_password, password)
             return
-        if user.check_password(password) and self.user_can_authenticate(user):
+        upgrades = []
+        if not await run_hasher(
+            check_password, password, user.password, upgrades.append
+        ):
+            return
+        if upgrades:
+            # Rehashed with the current hasher, as check_password() would.
+            user.password = await run_hasher(make_password, password)
+            await CustomUser.objects.filter(pk=user.pk).aupdate(password=user.password)
+        if self.user_can_authenticate(user):
             return user
+
+    def identifier_query(self, identifier):
+        return (
+            Q(username=identifier)
+            | Q(email_lookup=identifier.casefold())
+            | Q(contact_number=identifier)
+        )
+
+    def best_match(self, users, identifier):
+        for match in (self.matches_username, self.matches_email, self.matches_contact):
+            for user in users:
+                if match(user, identifier):
+                    return user
+
+    def get_user_by_identifier(self, identifier):
+        users = list(CustomUser.objects.filter(self.identifier_query(identifier))[:3])
+        return self.best_match(users, identifier)
+
+    async def aget_user_by_identifier(self, identifier):
+        users = [
+            user
+            async for user in CustomUser.objects.filter(
+                self.identifier_query(identifier)
+            )[:3]
+        ]
+        return self.best_match(users, identifier)
+
+    @staticmethod
+    def matches_username(user, identifier):
+        return user.username == identifier
+
+    @staticmethod
+    def matches_email(user, identifier):
+        return user.email_lookup == identifier.casefold()
+
+    @staticmethod
+    def matches_contact(user, identifier):
+        return user.contact_number == identifier
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Fill in the case-folded email of users saved before logins used it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by("pk").only("email", "email_lookup")
+        last = 0
+        count = 0
+        while True:
+            batch = list(users.filter(pk__gt=last)[: options["batch_size"]])
+            if not batch:
+                break
+            last = batch[-1].pk
+            # Case folded here rather than with Lower(), which databases do
+            # not apply the way str.casefold() does.
+            stale = [
+                user for user in batch if user.email_lookup != user.email.casefold()
+            ]
+            for user in stale:
+                user.email_lookup = user.email.casefold()
+            with transaction.atomic():
+                CustomUser.objects.bulk_update(stale, ["email_lookup"])
+            count += len(stale)
+        self.stdout.write("Backfilled %d users." % count)
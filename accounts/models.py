@@ -11,6 +11,16 @@ class CustomUser(AbstractUser):
     name_suffix = models.CharField(_("name suffix"), max_length=8, blank=True)
     email = models.EmailField(_("email address"), unique=True)
     contact_number = models.CharField(_("contact number"), max_length=(16), unique=True)
+    # Case-folded copy of the email, so that case-insensitive logins can use
+    # an index instead of email__iexact.
+    email_lookup = models.CharField(max_length=254, db_index=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.email_lookup = self.email.casefold()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "email" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "email_lookup"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return " ".join([self.first_name, self.middle_name, self.last_name, self.name_suffix])
@@ -1,3 +1,109 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from accounts.models import CustomUser
+
 
 # Create your tests here.
+class DenyingBackend:
+    def authenticate(self, request, username=None, password=None):
+        raise PermissionDenied
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class IdentifierBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="juan",
+            email="Juan.Cruz@Example.com",
+            contact_number="09171234567",
+            password="password",
+        )
+        # Whose username is the email of the first user.
+        CustomUser.objects.create_user(
+            username="juan.cruz@example.com",
+            email="other@example.com",
+            contact_number="09170000000",
+            password="other",
+        )
+
+    def assertLogsIn(self, identifier, password, user):
+        encode = MD5PasswordHasher.encode
+        with mock.patch.object(
+            MD5PasswordHasher, "encode", autospec=True, side_effect=encode
+        ) as hashes:
+            self.assertEqual(authenticate(username=identifier, password=password), user)
+        self.assertEqual(hashes.call_count, 1)
+
+    def test_identifiers(self):
+        for identifier in ("juan", "JUAN.CRUZ@example.COM", "09171234567"):
+            with self.subTest(identifier=identifier):
+                self.assertLogsIn(identifier, "password", self.user)
+        self.assertLogsIn("juan.cruz@example.com", "password", None)
+        self.assertLogsIn("juan", "wrong", None)
+        self.assertLogsIn("nobody", "password", None)
+
+    def test_backfill_email_lookup(self):
+        CustomUser.objects.update(email_lookup="")
+        out = StringIO()
+        call_command("backfill_email_lookup", batch_size=1, stdout=out)
+        self.assertEqual(out.getvalue(), "Backfilled 2 users.\n")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email_lookup, "juan.cruz@example.com")
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoginViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="juan",
+            email="juan@example.com",
+            contact_number="09171234567",
+            password="password",
+        )
+
+    async def login(self, identifier, password):
+        return await self.async_client.post(
+            reverse("accounts:login"),
+            {"identifier": identifier, "password": password},
+            content_type="application/json",
+        )
+
+    async def test_login(self):
+        response = await self.login("JUAN@example.com", "password")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"user": self.user.pk})
+        response = await self.login("juan", "wrong")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_failed_logins_send_the_signal(self):
+        failures = []
+
+        def receiver(sender, credentials, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        response = await self.login("juan", "wrong")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(
+            failures, [{"username": "juan", "password": "********************"}]
+        )
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=[
+            "accounts.tests.DenyingBackend",
+            "accounts.backends.IdentifierBackend",
+        ]
+    )
+    async def test_permission_denied_ends_the_search(self):
+        response = await self.login("juan", "password")
+        self.assertEqual(response.status_code, 401)
@@ -1,3 +1,62 @@
-from django.shortcuts import render
+import inspect
+import json
+from asgiref.sync import sync_to_async
+from django.contrib import auth
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseNotAllowed, JsonResponse
 
-# Create your views here.
+
+async def authenticate(request, **credentials):
+    """
+    django.contrib.auth.authenticate() for async views, which Django 4.1 has
+    no aauthenticate() for. Backends with an aauthenticate() method are
+    awaited and the others run in a thread. As in authenticate(), a backend
+    raising PermissionDenied ends the search and a failed login sends
+    user_login_failed.
+    """
+    for backend, backend_path in auth._get_backends(return_tuples=True):
+        method = getattr(backend, "aauthenticate", None)
+        try:
+            inspect.signature(backend.authenticate).bind(request, **credentials)
+        except TypeError:
+            # This backend doesn't accept these credentials as arguments.
+            continue
+        try:
+            if method is not None:
+                user = await method(request, **credentials)
+            else:
+                user = await sync_to_async(backend.authenticate)(request, **credentials)
+        except PermissionDenied:
+            break
+        if user is not None:
+            user.backend = backend_path
+            return user
+    await sync_to_async(user_login_failed.send)(
+        sender=auth.__name__,
+        credentials=auth._clean_credentials(credentials),
+        request=request,
+    )
+
+
+async def login(request):
+    # Async, so that under ASGI a login waits on the database and the
+    # password hashing threads without holding a worker.
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    try:
+        data = json.loads(request.body)
+        identifier = data["identifier"]
+        password = data["password"]
+        if not isinstance(identifier, str) or not isinstance(password, str):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse(
+            {"errors": ["Expected a JSON object with an identifier and a password."]},
+            status=400,
+        )
+    user = await authenticate(request, username=identifier, password=password)
+    if user is None:
+        return JsonResponse({"errors": ["Invalid credentials."]}, status=401)
+    await sync_to_async(auth.login)(request, user)
+    return JsonResponse({"user": user.pk})
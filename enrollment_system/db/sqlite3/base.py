@@ -0,0 +1,48 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite with two more OPTIONS, named as in later Django versions:
+
+    * init_command, SQL run on every new connection, such as PRAGMAs.
+    * transaction_mode, how transactions begin. IMMEDIATE takes the write
+      lock at BEGIN, where the busy timeout applies, instead of failing
+      with "database is locked" when a read turns into a write.
+
+    Setting begin_immediate begins the next transaction with IMMEDIATE
+    where it would be deferred, which is how atomic_write() of
+    profiles.database takes the write lock on write paths only.
+    """
+
+    begin_immediate = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("init_command", None)
+        mode = params.pop("transaction_mode", None)
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                "The transaction_mode option must be one of %s."
+                % ", ".join(TRANSACTION_MODES)
+            )
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        init_command = self.settings_dict["OPTIONS"].get("init_command")
+        if init_command:
+            connection.executescript(init_command)
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict["OPTIONS"].get("transaction_mode")
+        if self.begin_immediate and (mode or "DEFERRED").upper() == "DEFERRED":
+            mode = "IMMEDIATE"
+        if mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute("BEGIN %s" % mode.upper())
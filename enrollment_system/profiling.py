@@ -0,0 +1,65 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import Counter, defaultdict
+
+# The time spent in functions decorated with @timed, added to the profile of
+# the current request if profiles.profiling set one, and to the per-process
+# totals of each span. Any app can time its functions with this module
+# without depending on the profiles app.
+current_profile = contextvars.ContextVar("request_profile", default=None)
+_lock = threading.Lock()
+_spans = defaultdict(Counter)
+
+
+def add_span(name, seconds):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_span(name, seconds)
+    with _lock:
+        totals = _spans[name]
+        totals["calls"] += 1
+        totals["ms"] += seconds * 1000
+        totals["max_ms"] = max(totals["max_ms"], seconds * 1000)
+
+
+def timed(name):
+    """Time every call of the decorated function or coroutine as ``name``."""
+
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    add_span(name, time.perf_counter() - started)
+
+        else:
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    add_span(name, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def span_totals():
+    """The totals of every span of this process."""
+    with _lock:
+        return {name: dict(totals) for name, totals in _spans.items()}
+
+
+def reset_spans():
+    with _lock:
+        _spans.clear()
@@ -14,8 +14,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+from profiles.views import profiling
 
 urlpatterns = [
+    path('admin/profiling/', admin.site.admin_view(profiling), name='profiling'),
     path('admin/', admin.site.urls),
+    path('accounts/', include('accounts.urls')),
+    path('profiles/', include('profiles.urls')),
+    path('api/', include('profiles.api_urls')),
 ]
@@ -1,5 +1,9 @@
-from django.contrib import admin
-from accounts.models import CustomUser
+from django.contrib import admin, messages
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from accounts.admin import identifier_search, is_autocomplete
+from .forms import CourseForm, StudentRecordFormSet
+from .jobs import enqueue, job_progress
 from .models import (
     Professor,
     Student,
@@ -13,41 +17,114 @@ from .models import (
     Schedule,
     Record,
     StudentRecord,
+    Transcript,
+    Job,
 )
+from .search import SEARCH_FIELDS, search
+
+
+# Relations followed by the __str__ of each model, so that changelists and
+# choice widgets do not run one query per row.
+STR_RELATIONS = {
+    Professor: ("user",),
+    Student: ("user",),
+    CurriculumCourse: ("curriculum", "course"),
+    Schedule: ("room",),
+    Record: ("advisor__user", "curriculum_course__course"),
+    StudentRecord: ("student__user",),
+    Transcript: ("student__user",),
+}
+
+
+class RelatedChoicesMixin:
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        relations = STR_RELATIONS.get(db_field.related_model)
+        if relations and hasattr(formfield, "queryset"):
+            formfield.queryset = formfield.queryset.select_related(*relations)
+        return formfield
+
+
+def shared_choices(formfield):
+    # Inline forms are deep copies of one form class, so a callable that
+    # caches its result makes every form of the formset render the choices
+    # from a single query.
+    iterator = formfield.choices
+    choices = []
+
+    def get_choices():
+        if not choices:
+            choices.extend(
+                (getattr(value, "value", value), label) for value, label in iterator
+            )
+        return choices
 
+    return get_choices
 
-# Register your models here.
-class ProfessorAdmin(admin.ModelAdmin):
-    def render_change_form(self, request, context, *args, **kwargs):
-        if kwargs["change"]:
-            context["adminform"].form.fields[
-                "user"
-            ].queryset = CustomUser.objects.filter(pk=context["object_id"])
-            return super(ProfessorAdmin, self).render_change_form(
-                request, context, *args, **kwargs
-            )
-        context["adminform"].form.fields["user"].queryset = CustomUser.objects.filter(
-            is_staff=True, is_superuser=False
-        ).exclude(id__in=Professor.objects.values("user"))
-        return super(ProfessorAdmin, self).render_change_form(
-            request, context, *args, **kwargs
+
+class RelatedInlineMixin(RelatedChoicesMixin):
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        shared = db_field.related_model is not self.parent_model and (
+            db_field.name not in self.get_autocomplete_fields(request)
+        )
+        if hasattr(formfield, "queryset") and shared:
+            formfield.choices = shared_choices(formfield)
+        return formfield
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related(*STR_RELATIONS.get(self.model, ()))
         )
 
 
-class StudentAdmin(admin.ModelAdmin):
-    def render_change_form(self, request, context, *args, **kwargs):
-        if kwargs["change"]:
-            context["adminform"].form.fields[
-                "user"
-            ].queryset = CustomUser.objects.filter(pk=context["object_id"])
-            return super(StudentAdmin, self).render_change_form(
-                request, context, *args, **kwargs
-            )
-        context["adminform"].form.fields["user"].queryset = CustomUser.objects.filter(
-            is_staff=False, is_superuser=False
-        ).exclude(pk__in=Student.objects.values("user"))
-        return super(StudentAdmin, self).render_change_form(
-            request, context, *args, **kwargs
+class IndexedSearchMixin:
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search(queryset, search_term), False
+
+
+# Register your models here.
+class ProfileAdmin(admin.ModelAdmin):
+    # Users are picked through the autocomplete of CustomUserAdmin, which
+    # only offers users of the right role that have no profile yet.
+    autocomplete_fields = ("user",)
+    search_fields = ("user__username", "user__last_name", "user__first_name")
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ("user",) + tuple(super().get_readonly_fields(request, obj))
+        return super().get_readonly_fields(request, obj)
+
+    def get_search_results(self, request, queryset, search_term):
+        if is_autocomplete(request):
+            queryset = queryset.select_related("user")
+            if search_term.strip():
+                queryset = queryset.filter(identifier_search(search_term, "user__"))
+            return queryset, False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class ProfessorAdmin(ProfileAdmin):
+    list_select_related = STR_RELATIONS[Professor]
+
+
+class StudentAdmin(ProfileAdmin):
+    list_select_related = STR_RELATIONS[Student]
+    actions = ("rebuild_summaries",)
+
+    @admin.action(description=_("Rebuild transcripts and timetables in the background"))
+    def rebuild_summaries(self, request, queryset):
+        students = list(queryset.values_list("pk", flat=True))
+        for name in ("rebuild_transcripts", "rebuild_timetables"):
+            enqueue(name, {"students": students}, created_by=request.user)
+        self.message_user(
+            request,
+            _("Queued the rebuild of %(count)d students.") % {"count": len(students)},
+            messages.SUCCESS,
         )
 
 
@@ -57,11 +134,13 @@ class DepartmentAdmin(admin.ModelAdmin):
 
 class ProgramAdmin(admin.ModelAdmin):
     list_display = ("title", "department")
+    list_select_related = ("department",)
     list_filter = ("department",)
     ordering = ("department", "title")
 
 
 class CourseAdmin(admin.ModelAdmin):
+    form = CourseForm
     list_display = ("code", "title", "units")
     search_fields = ("code", "title")
     ordering = ("code", "title")
@@ -78,7 +157,7 @@ class CourseAdmin(admin.ModelAdmin):
         )
 
 
-class CurriculumCourseInline(admin.TabularInline):
+class CurriculumCourseInline(RelatedInlineMixin, admin.TabularInline):
     model = CurriculumCourse
     extra = 1
 
@@ -87,12 +166,14 @@ class CurriculumAdmin(admin.ModelAdmin):
     fields = ("title", "program")
     inlines = (CurriculumCourseInline,)
     list_display = ("title", "program")
+    list_select_related = ("program",)
     list_filter = ("program",)
     ordering = ("program", "title")
 
 
-class CurriculumCourseAdmin(admin.ModelAdmin):
+class CurriculumCourseAdmin(RelatedChoicesMixin, admin.ModelAdmin):
     list_display = ("course", "year_level", "academic_term", "curriculum")
+    list_select_related = STR_RELATIONS[CurriculumCourse]
     search_fields = ("curriculum__title", "course__title")
     ordering = ("curriculum", "year_level", "academic_term", "course")
 
@@ -103,22 +184,20 @@ class SectionAdmin(admin.ModelAdmin):
 
 
 class RoomAdmin(admin.ModelAdmin):
+    list_display = ("number", "building", "capacity")
+    list_filter = ("building",)
     ordering = ("number",)
 
 
-class ScheduleAdmin(admin.ModelAdmin):
+class ScheduleAdmin(IndexedSearchMixin, RelatedChoicesMixin, admin.ModelAdmin):
     list_display = ("record", "room", "day", "start_time", "end_time")
-    list_filter = ("day", "record__academic_term", "record__academic_year",)
-    search_fields = (
-        "record__curriculum_course__curriculum__program__department__title",
-        "record__curriculum_course__curriculum__program__title",
-        "record__section__name",
-        "room__number",
-        "professor__user__first_name",
-        "professor__user__middle_name",
-        "professor__user__last_name",
-        "professor__user__name_suffix",
+    list_select_related = (
+        "record__advisor__user",
+        "record__curriculum_course__course",
+        "room",
     )
+    list_filter = ("day", "record__academic_term", "record__academic_year",)
+    search_fields = SEARCH_FIELDS[Schedule]
     ordering = (
         "-record__academic_year",
         "-record__academic_term",
@@ -129,24 +208,28 @@ class ScheduleAdmin(admin.ModelAdmin):
     )
 
 
-class ScheduleInline(admin.TabularInline):
+class ScheduleInline(RelatedInlineMixin, admin.TabularInline):
     model = Schedule
     extra = 1
 
 
-class StudentRecordInline(admin.TabularInline):
+class StudentRecordInline(RelatedInlineMixin, admin.TabularInline):
     model = StudentRecord
+    formset = StudentRecordFormSet
     extra = 1
 
 
-class RecordAdmin(admin.ModelAdmin):
+class RecordAdmin(IndexedSearchMixin, RelatedChoicesMixin, admin.ModelAdmin):
     fields = (
         "academic_year",
         "academic_term",
         "curriculum_course",
         "advisor",
         "section",
+        "capacity",
+        "enrolled_count",
     )
+    readonly_fields = ("enrolled_count",)
     inlines = (
         ScheduleInline,
         StudentRecordInline,
@@ -158,18 +241,14 @@ class RecordAdmin(admin.ModelAdmin):
         "academic_term",
         "academic_year",
     )
-    list_filter = ("academic_year", "academic_term")
-    search_fields = (
-        "curriculum_course__curriculum__program__department__title",
-        "curriculum_course__curriculum__program__title",
-        "curriculum_course__course__code",
-        "curriculum_course__course__title",
-        "advisor__user__first_name",
-        "advisor__user__middle_name",
-        "advisor__user__last_name",
-        "advisor__user__name_suffix",
-        "section__name",
+    list_select_related = (
+        "advisor__user",
+        "curriculum_course__curriculum",
+        "curriculum_course__course",
+        "section",
     )
+    list_filter = ("academic_year", "academic_term")
+    search_fields = SEARCH_FIELDS[Record]
     ordering = (
         "-academic_year",
         "-academic_term",
@@ -181,24 +260,15 @@ class RecordAdmin(admin.ModelAdmin):
     )
 
 
-class StudentRecordAdmin(admin.ModelAdmin):
+class StudentRecordAdmin(IndexedSearchMixin, RelatedChoicesMixin, admin.ModelAdmin):
     list_display = ("student", "record", "rating", "remark")
-    list_filter = ("record__academic_year", "record__academic_term")
-    search_fields = (
-        "student__user__first_name",
-        "student__user__middle_name",
-        "student__user__last_name",
-        "student__user__name_suffix",
-        "record__advisor__user__first_name",
-        "record__advisor__user__middle_name",
-        "record__advisor__user__last_name",
-        "record__advisor__user__name_suffix",
-        "record__curriculum_course__curriculum__program__department__title",
-        "record__curriculum_course__curriculum__program__title",
-        "record__curriculum_course__course__code",
-        "record__curriculum_course__course__title",
-        "record__section__name",
+    list_select_related = (
+        "student__user",
+        "record__advisor__user",
+        "record__curriculum_course__course",
     )
+    list_filter = ("record__academic_year", "record__academic_term")
+    search_fields = SEARCH_FIELDS[StudentRecord]
     ordering = (
         "student",
         "-record__academic_year",
@@ -207,6 +277,67 @@ class StudentRecordAdmin(admin.ModelAdmin):
     )
 
 
+class TranscriptAdmin(admin.ModelAdmin):
+    list_display = (
+        "student",
+        "weighted_rating",
+        "units_earned",
+        "units_attempted",
+        "passed",
+        "failed",
+        "dropped",
+        "incomplete",
+    )
+    list_select_related = STR_RELATIONS[Transcript]
+    search_fields = (
+        "student__user__first_name",
+        "student__user__last_name",
+    )
+    ordering = ("-weighted_rating", "-units_earned")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "status",
+        "progress",
+        "attempts",
+        "created_by",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status", "name")
+    list_select_related = ("created_by",)
+    ordering = ("-created_at",)
+    actions = ("requeue",)
+
+    @admin.display(description=_("progress"))
+    def progress(self, obj):
+        done, total = job_progress(obj)
+        if total:
+            return "%d / %d (%d%%)" % (done, total, 100 * done // total)
+        return done or "-"
+
+    @admin.action(description=_("Queue the selected failed jobs again"))
+    def requeue(self, request, queryset):
+        count = queryset.filter(status=Job.FAILED).update(
+            status=Job.QUEUED, attempts=0, worker="", run_after=timezone.now()
+        )
+        self.message_user(request, _("Queued %(count)d jobs again.") % {"count": count})
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(Professor, ProfessorAdmin)
 admin.site.register(Student, StudentAdmin)
 admin.site.register(Department, DepartmentAdmin)
@@ -219,3 +350,5 @@ admin.site.register(Room, RoomAdmin)
 admin.site.register(Schedule, ScheduleAdmin)
 admin.site.register(Record, RecordAdmin)
 admin.site.register(StudentRecord, StudentRecordAdmin)
+admin.site.register(Transcript, TranscriptAdmin)
+admin.site.register(Job, JobAdmin)
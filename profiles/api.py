@@ -0,0 +1,399 @@
+import hashlib
+from bisect import bisect_right
+from collections.abc import Mapping
+from datetime import datetime, time, timezone
+from functools import wraps
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+from accounts.models import CustomUser
+from profiles import occupancy
+from profiles.bitmaps import minutes_of
+from profiles.models import (
+    Course,
+    Curriculum,
+    CurriculumCourse,
+    Department,
+    Professor,
+    Program,
+    Record,
+    Room,
+    Schedule,
+    Section,
+    StudentTimetable,
+)
+from profiles.catalog import get_catalog
+from profiles.student_timetables import schedule_of
+from profiles.versions import table_versions
+
+# A read-only JSON API over the catalog and the schedules. Every endpoint
+# runs a fixed number of queries whatever the page size, with courses and
+# sections read from the catalog cache, pages through its rows after a
+# cursor, the last primary key seen, and answers conditional requests from
+# the versions of the tables it reads, without a query. The room endpoints
+# answer from the occupancy grids of occupancy.py instead of paging.
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+RECORD_FILTERS = {
+    "academic_year": ("academic_year", int),
+    "academic_term": ("academic_term", int),
+    "curriculum": ("curriculum_course__curriculum", int),
+    "course": ("curriculum_course__course__code", str),
+    "section": ("section__name", str),
+}
+SCHEDULE_FILTERS = {
+    "academic_year": ("record__academic_year", int),
+    "academic_term": ("record__academic_term", int),
+}
+
+
+def versioned(*models):
+    """
+    Make a view answer conditional GET requests from the versions of the
+    tables of ``models``, which must cover everything the view reads.
+    """
+
+    def versions(request):
+        if not hasattr(request, "_table_versions"):
+            request._table_versions = table_versions(models)
+        return request._table_versions
+
+    def etag(request, *args, **kwargs):
+        key = [request.get_full_path(), *map(str, versions(request))]
+        return hashlib.md5("|".join(key).encode(), usedforsecurity=False).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        return datetime.fromtimestamp(max(versions(request)) / 1e9, timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def parse_filters(filters, params):
+    """Lookups for the ``filters`` given in ``params``, or ValueError."""
+    lookups = {}
+    for name, (lookup, kind) in filters.items():
+        value = params.get(name)
+        if value not in (None, ""):
+            lookups[lookup] = kind(value)
+    return lookups
+
+
+def paginated(request, source, serialize, filters=None):
+    """
+    One page of ``source``, a queryset or a catalog snapshot, in primary key
+    order after the row given by the ``cursor`` parameter and narrowed by
+    ``filters``, which snapshots do not support.
+    """
+    try:
+        limit = int(request.GET.get("limit", PAGE_SIZE))
+        cursor = int(request.GET.get("cursor", 0))
+        lookups = parse_filters(filters or {}, request.GET)
+    except ValueError:
+        return JsonResponse(
+            {"errors": ["Invalid cursor, limit or filter."]}, status=400
+        )
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        return JsonResponse(
+            {"errors": ["Expected a limit from 1 to %d." % MAX_PAGE_SIZE]}, status=400
+        )
+    if isinstance(source, Mapping):
+        pks = list(source)
+        start = bisect_right(pks, cursor)
+        keys = pks[start : start + limit + 1]
+        rows = [source[pk] for pk in keys]
+    else:
+        rows = list(source.filter(pk__gt=cursor, **lookups).order_by("pk")[: limit + 1])
+        keys = [row.pk for row in rows]
+    following = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.GET.copy()
+        params["cursor"] = keys[limit - 1]
+        following = "%s?%s" % (request.path, params.urlencode())
+    return JsonResponse(
+        {"results": [serialize(row) for row in rows], "next": following}
+    )
+
+
+def schedule_data(schedule):
+    return {
+        "id": schedule.pk,
+        "day": schedule.day,
+        "start_time": schedule.start_time.isoformat("minutes"),
+        "end_time": schedule.end_time.isoformat("minutes"),
+        "room": schedule.room.number,
+        "professor": schedule.professor_id,
+    }
+
+
+def course_data(row):
+    return {
+        field: row[field]
+        for field in ("id", "code", "title", "units", "prerequisites", "corequisites")
+    }
+
+
+def curriculum_data(curriculum):
+    return {
+        "id": curriculum.pk,
+        "title": curriculum.title,
+        "program": {"id": curriculum.program_id, "title": curriculum.program.title},
+        "courses": [
+            {
+                "course": curriculum_course.course_id,
+                "code": curriculum_course.course.code,
+                "year_level": curriculum_course.year_level,
+                "academic_term": curriculum_course.academic_term,
+            }
+            for curriculum_course in curriculum.curriculumcourse_set.all()
+        ],
+    }
+
+
+def section_data(row):
+    return {field: row[field] for field in ("id", "name", "is_open")}
+
+
+def record_data(record):
+    course = record.curriculum_course.course
+    return {
+        "id": record.pk,
+        "academic_year": record.academic_year,
+        "academic_term": record.academic_term,
+        "curriculum": record.curriculum_course.curriculum_id,
+        "year_level": record.curriculum_course.year_level,
+        "course": {
+            "id": course.pk,
+            "code": course.code,
+            "title": course.title,
+            "units": course.units,
+        },
+        "section": {"id": record.section_id, "name": record.section.name},
+        "advisor": {
+            "id": record.advisor_id,
+            "first_name": record.advisor.user.first_name,
+            "last_name": record.advisor.user.last_name,
+        },
+        "capacity": record.capacity,
+        "enrolled_count": record.enrolled_count,
+        "schedules": [
+            schedule_data(schedule) for schedule in record.schedule_set.all()
+        ],
+    }
+
+
+def professor_schedule_data(schedule):
+    data = schedule_data(schedule)
+    data.update(
+        record=schedule.record_id,
+        academic_year=schedule.record.academic_year,
+        academic_term=schedule.record.academic_term,
+        course=schedule.record.curriculum_course.course.code,
+        title=schedule.record.curriculum_course.course.title,
+        section=schedule.record.section.name,
+    )
+    return data
+
+
+@require_GET
+@cache_control(no_cache=True)
+@versioned(Course, Course.prerequisites.through, Course.corequisites.through)
+def courses(request):
+    return paginated(request, get_catalog(Course), course_data)
+
+
+@require_GET
+@cache_control(no_cache=True)
+@versioned(Curriculum, Program, CurriculumCourse, Course)
+def curricula(request):
+    return paginated(
+        request,
+        Curriculum.objects.select_related("program").prefetch_related(
+            Prefetch(
+                "curriculumcourse_set",
+                queryset=CurriculumCourse.objects.select_related("course").order_by(
+                    "year_level", "academic_term", "course__code"
+                ),
+            )
+        ),
+        curriculum_data,
+        {"program": ("program", int)},
+    )
+
+
+@require_GET
+@cache_control(no_cache=True)
+@versioned(Section)
+def sections(request):
+    return paginated(request, get_catalog(Section), section_data)
+
+
+@require_GET
+@cache_control(no_cache=True)
+@versioned(
+    Record,
+    CurriculumCourse,
+    Course,
+    Section,
+    Professor,
+    CustomUser,
+    Schedule,
+    Room,
+)
+def records(request):
+    return paginated(
+        request,
+        Record.objects.select_related(
+            "curriculum_course__course", "section", "advisor__user"
+        ).prefetch_related(
+            Prefetch(
+                "schedule_set",
+                queryset=Schedule.objects.select_related("room").order_by(
+                    "day", "start_time"
+                ),
+            )
+        ),
+        record_data,
+        RECORD_FILTERS,
+    )
+
+
+@require_GET
+@cache_control(no_cache=True)
+@versioned(Schedule, Record, CurriculumCourse, Course, Section, Room)
+def professor_schedule(request, professor_id):
+    return paginated(
+        request,
+        Schedule.objects.filter(professor=professor_id).select_related(
+            "room", "record__curriculum_course__course", "record__section"
+        ),
+        professor_schedule_data,
+        SCHEDULE_FILTERS,
+    )
+
+
+def own_or_staff(view):
+    # Checked before the conditional request is answered, so that not even
+    # a 304 is given to anyone else.
+    @wraps(view)
+    def wrapper(request, student_id, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"errors": ["Authentication required."]}, status=401)
+        if not request.user.is_staff and request.user.pk != student_id:
+            return JsonResponse(
+                {"errors": ["Only the student or staff can see this schedule."]},
+                status=403,
+            )
+        return view(request, student_id, *args, **kwargs)
+
+    return wrapper
+
+
+@require_GET
+@own_or_staff
+@cache_control(private=True, no_cache=True)
+@versioned(StudentTimetable)
+def student_schedule(request, student_id):
+    term = [request.GET.get(key) for key in ("academic_year", "academic_term")]
+    if term != [None, None]:
+        try:
+            term = [int(value) for value in term]
+        except (TypeError, ValueError):
+            return JsonResponse(
+                {"errors": ["Expected both an academic year and an academic term."]},
+                status=400,
+            )
+    timetable = schedule_of(student_id, *term)
+    if timetable is None:
+        return JsonResponse({"errors": ["No schedule for this term."]}, status=404)
+    return JsonResponse(
+        {
+            "student": student_id,
+            "academic_year": timetable.academic_year,
+            "academic_term": timetable.academic_term,
+            "meetings": timetable.meetings,
+        }
+    )
+
+
+def clean_term(params):
+    """The academic year and term given in ``params``, or ValueError."""
+    try:
+        return int(params["academic_year"]), int(params["academic_term"])
+    except KeyError:
+        raise ValueError("No term.")
+
+
+@require_GET
+@cache_control(no_cache=True)
+@versioned(Schedule, Room)
+def free_rooms(request):
+    try:
+        term = clean_term(request.GET)
+        day = int(request.GET.get("day", ""))
+        start = minutes_of(time.fromisoformat(request.GET.get("start", "")))
+        end = minutes_of(time.fromisoformat(request.GET.get("end", "")), round_up=True)
+        min_capacity = request.GET.get("min_capacity")
+        min_capacity = int(min_capacity) if min_capacity else None
+    except ValueError:
+        return JsonResponse(
+            {
+                "errors": [
+                    "Expected an academic year and term, a day, and start and "
+                    "end times as HH:MM."
+                ]
+            },
+            status=400,
+        )
+    if day not in dict(Schedule.DAYS) or start >= end:
+        return JsonResponse(
+            {"errors": ["Expected a day from 1 to 7 and a start before the end."]},
+            status=400,
+        )
+    return JsonResponse(
+        {
+            "results": occupancy.free_rooms(
+                *term,
+                day,
+                start,
+                end,
+                min_capacity=min_capacity,
+                building=request.GET.get("building") or None,
+            )
+        }
+    )
+
+
+@require_GET
+@cache_control(no_cache=True)
+@versioned(Schedule, Room, CurriculumCourse, Curriculum, Program, Department)
+def room_utilization(request):
+    group = request.GET.get("group", "room")
+    try:
+        results = occupancy.utilization(*clean_term(request.GET), group=group)
+    except ValueError:
+        return JsonResponse(
+            {
+                "errors": [
+                    "Expected an academic year and term, and a group of room, "
+                    "building or department."
+                ]
+            },
+            status=400,
+        )
+    return JsonResponse({"group": group, "results": results})
+
+
+@require_GET
+@cache_control(no_cache=True)
+@versioned(Schedule, Room)
+def room_heatmap(request):
+    try:
+        term = clean_term(request.GET)
+    except ValueError:
+        return JsonResponse(
+            {"errors": ["Expected an academic year and term."]}, status=400
+        )
+    return JsonResponse(occupancy.heatmap(*term))
@@ -0,0 +1,23 @@
+from django.urls import path
+from profiles import api
+
+app_name = "api"
+urlpatterns = [
+    path("courses/", api.courses, name="courses"),
+    path("curricula/", api.curricula, name="curricula"),
+    path("sections/", api.sections, name="sections"),
+    path("records/", api.records, name="records"),
+    path(
+        "professors/<int:professor_id>/schedule/",
+        api.professor_schedule,
+        name="professor_schedule",
+    ),
+    path(
+        "students/<int:student_id>/schedule/",
+        api.student_schedule,
+        name="student_schedule",
+    ),
+    path("rooms/free/", api.free_rooms, name="free_rooms"),
+    path("rooms/utilization/", api.room_utilization, name="room_utilization"),
+    path("rooms/heatmap/", api.room_heatmap, name="room_heatmap"),
+]
@@ -0,0 +1,194 @@
+from collections import defaultdict, namedtuple
+from types import MappingProxyType
+from django.db.models import Count
+from profiles.models import Curriculum, CurriculumCourse, Student, StudentRecord
+from profiles.prerequisites import get_graph
+
+# Everything an audit needs to know about a curriculum, built once per
+# version of the curriculum and prerequisite graph and never changed after.
+# Course sets are integer bitsets indexed by position in ``courses``.
+Plan = namedtuple(
+    "Plan",
+    [
+        "curriculum",
+        "version",
+        "graph",
+        "courses",
+        "codes",
+        "position",
+        "terms",
+        "required",
+        "external",
+        "unit_tables",
+        "all",
+    ],
+)
+Audit = namedtuple(
+    "Audit",
+    [
+        "student",
+        "curriculum",
+        "units_required",
+        "units_earned",
+        "units_remaining",
+        "missing",
+        "blocked",
+        "eligible",
+    ],
+)
+
+_plans = {}
+
+
+def build_plan(curriculum_id, version, graph):
+    rows = list(
+        CurriculumCourse.objects.filter(curriculum=curriculum_id)
+        .order_by("year_level", "academic_term", "course__code")
+        .values_list(
+            "course", "course__code", "course__units", "year_level", "academic_term"
+        )
+    )
+    courses = tuple(row[0] for row in rows)
+    position = {course: index for index, course in enumerate(courses)}
+    terms = defaultdict(int)
+    for index, (course, code, units, year_level, academic_term) in enumerate(rows):
+        terms[(year_level, academic_term)] |= 1 << index
+    required = []
+    external = []
+    for course in courses:
+        prerequisites = graph.prerequisites_of(course) if course in graph.index else ()
+        mask = 0
+        for prerequisite in prerequisites:
+            if prerequisite in position:
+                mask |= 1 << position[prerequisite]
+        required.append(mask)
+        external.append(frozenset(set(prerequisites) - position.keys()))
+    # The units of any set of courses are summed eight courses at a time
+    # from a table of the 256 subsets of each group of eight.
+    unit_tables = []
+    for start in range(0, len(rows), 8):
+        units = [row[2] for row in rows[start : start + 8]]
+        table = [0.0] * 256
+        for subset in range(1, 256):
+            low = subset & -subset
+            bit = low.bit_length() - 1
+            table[subset] = table[subset ^ low] + (
+                units[bit] if bit < len(units) else 0
+            )
+        unit_tables.append(tuple(table))
+    return Plan(
+        curriculum=curriculum_id,
+        version=version,
+        graph=graph,
+        courses=courses,
+        codes=tuple(row[1] for row in rows),
+        position=MappingProxyType(position),
+        terms=tuple(sorted(terms.items())),
+        required=tuple(required),
+        external=tuple(external),
+        unit_tables=tuple(unit_tables),
+        all=(1 << len(courses)) - 1,
+    )
+
+
+def get_plans(curriculum_ids):
+    """The current plans of ``curriculum_ids``, building the stale ones."""
+    graph = get_graph()
+    plans = {}
+    for curriculum, version in Curriculum.objects.filter(
+        pk__in=curriculum_ids
+    ).values_list("pk", "version"):
+        plan = _plans.get(curriculum)
+        if plan is None or plan.version != version or plan.graph is not graph:
+            plan = _plans[curriculum] = build_plan(curriculum, version, graph)
+        plans[curriculum] = plan
+    return plans
+
+
+def units_of(plan, mask):
+    units = 0.0
+    for table in plan.unit_tables:
+        units += table[mask & 255]
+        mask >>= 8
+    return units
+
+
+def positions(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def audit_plan(plan, student, passed):
+    """Audit ``student`` with the course ids in ``passed`` against ``plan``."""
+    passed_mask = 0
+    for course in passed:
+        index = plan.position.get(course)
+        if index is not None:
+            passed_mask |= 1 << index
+    missing = plan.all & ~passed_mask
+    blocked = [
+        plan.codes[index]
+        for index in positions(missing)
+        if plan.required[index] & ~passed_mask or not plan.external[index] <= passed
+    ]
+    units_required = units_of(plan, plan.all)
+    units_earned = units_of(plan, plan.all & passed_mask)
+    return Audit(
+        student=student,
+        curriculum=plan.curriculum,
+        units_required=units_required,
+        units_earned=units_earned,
+        units_remaining=units_required - units_earned,
+        missing={
+            term: [plan.codes[index] for index in positions(mask & missing)]
+            for term, mask in plan.terms
+            if mask & missing
+        },
+        blocked=blocked,
+        eligible=not missing,
+    )
+
+
+def curricula_of(student_ids):
+    """
+    Map each student to their curriculum, or for students without one to
+    the curriculum most of their records belong to.
+    """
+    curricula = dict(
+        Student.objects.filter(pk__in=student_ids).values_list("pk", "curriculum")
+    )
+    unknown = [student for student, curriculum in curricula.items() if not curriculum]
+    if unknown:
+        counts = (
+            StudentRecord.objects.filter(student__in=unknown)
+            .values_list("student", "record__curriculum_course__curriculum")
+            .annotate(records=Count("pk"))
+            .order_by("student", "records")
+        )
+        for student, curriculum, records in counts:
+            curricula[student] = curriculum
+    return curricula
+
+
+def audit_students(student_ids, batch_size=2000):
+    """
+    Audit every student in ``student_ids`` against their curriculum, with
+    one query for the curricula, one for the passed courses and one per
+    stale plan. Students with no curriculum are left out.
+    """
+    curricula = curricula_of(student_ids)
+    plans = get_plans({curriculum for curriculum in curricula.values() if curriculum})
+    passed = defaultdict(set)
+    for student, course in (
+        StudentRecord.objects.filter(student__in=student_ids, remark="PSD")
+        .values_list("student", "record__curriculum_course__course")
+        .iterator(chunk_size=batch_size)
+    ):
+        passed[student].add(course)
+    return {
+        student: audit_plan(plans[curriculum], student, passed[student])
+        for student, curriculum in curricula.items()
+        if curriculum in plans
+    }
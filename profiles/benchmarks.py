@@ -0,0 +1,23 @@
+import statistics
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize(latencies, queries=None):
+    """Summarize latencies in milliseconds, and optional query counts."""
+    summary = {
+        "runs": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else None,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": max(latencies, default=None),
+    }
+    if queries is not None:
+        summary["queries"] = max(queries, default=None)
+    return summary
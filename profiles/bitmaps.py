@@ -0,0 +1,55 @@
+from datetime import time
+
+# The week is a row of five minute slots, Monday 00:00 first, so that a set
+# of meetings is an int and two sets clash when their bitwise and is not 0.
+# Schedules start and end on slot boundaries (see Schedule.clean()), so their
+# masks clash exactly when their times overlap. Other times, such as those
+# of a room search, are widened to the enclosing slots.
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+
+def minutes_of(value, round_up=False):
+    minutes = value.hour * 60 + value.minute
+    if round_up and (value.second or value.microsecond):
+        minutes += 1
+    return minutes
+
+
+def on_slot_boundary(value):
+    return not (value.minute % SLOT_MINUTES or value.second or value.microsecond)
+
+
+def time_of(minutes):
+    return time(*divmod(minutes, 60))
+
+
+def span_mask(day, start, end):
+    """Mask of ``day`` from ``start`` to ``end``, in minutes after midnight."""
+    offset = (day - 1) * SLOTS_PER_DAY
+    first = offset + start // SLOT_MINUTES
+    last = offset + -(-end // SLOT_MINUTES)
+    return ((1 << (last - first)) - 1) << first
+
+
+def schedule_mask(schedule):
+    return span_mask(
+        schedule.day,
+        minutes_of(schedule.start_time),
+        minutes_of(schedule.end_time, round_up=True),
+    )
+
+
+def schedules_mask(schedules):
+    mask = 0
+    for schedule in schedules:
+        mask |= schedule_mask(schedule)
+    return mask
+
+
+def to_bytes(mask):
+    return mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+
+def from_bytes(data):
+    return int.from_bytes(bytes(data), "little")
@@ -0,0 +1,121 @@
+from collections import Counter
+from types import MappingProxyType
+from django.conf import settings
+from django.core.cache import caches
+from profiles.models import (
+    Course,
+    Curriculum,
+    CurriculumCourse,
+    Department,
+    Program,
+    Room,
+    Section,
+)
+from profiles.versions import table_versions
+
+# Models that change a few times per term but are read on most requests.
+# Each process keeps their snapshots under keys made of the versions of the
+# tables they are built from, which signals bump on every change, so a
+# process never reads a snapshot older than the tables. CATALOG_CACHE may
+# name a cache, such as a file-based one, that the processes of a host
+# share, so that only one of them builds each snapshot.
+CATALOG_MODELS = (
+    Department,
+    Program,
+    Course,
+    Curriculum,
+    CurriculumCourse,
+    Room,
+    Section,
+)
+
+stats = Counter()
+_snapshots = {}
+
+
+def catalog_cache():
+    """The cache named by CATALOG_CACHE, or None."""
+    alias = getattr(settings, "CATALOG_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def tables_of(model):
+    return [
+        model,
+        *[
+            field.remote_field.through
+            for field in model._meta.many_to_many
+            if field.remote_field.through._meta.auto_created
+        ],
+    ]
+
+
+def build_snapshot(model):
+    """
+    Every row of ``model`` as a dict of its field values by primary key,
+    with the related primary keys of each automatic many-to-many field.
+    """
+    rows = {
+        row[model._meta.pk.attname]: row
+        for row in model.objects.order_by("pk").values()
+    }
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if not through._meta.auto_created:
+            continue
+        for row in rows.values():
+            row[field.name] = []
+        for owner, related in through.objects.order_by("pk").values_list(
+            field.m2m_column_name(), field.m2m_reverse_name()
+        ):
+            rows[owner][field.name].append(related)
+    return rows
+
+
+def get_catalog(model):
+    """
+    A read-only snapshot of ``model`` from build_snapshot(), taken from this
+    process, then from the catalog cache if there is one, then from the
+    database. Its rows must not be changed.
+    """
+    label = model._meta.label_lower
+    key = "catalog:%s:%s" % (
+        label,
+        "-".join(map(str, table_versions(tables_of(model)))),
+    )
+    cached = _snapshots.get(label)
+    if cached is not None and cached[0] == key:
+        stats[label, "hits"] += 1
+        return cached[1]
+    shared = catalog_cache()
+    rows = None if shared is None else shared.get(key)
+    if rows is None:
+        stats[label, "misses"] += 1
+        rows = build_snapshot(model)
+        if shared is not None:
+            shared.set(key, rows, timeout=None)
+    else:
+        stats[label, "hits"] += 1
+    snapshot = MappingProxyType(rows)
+    _snapshots[label] = (key, snapshot)
+    return snapshot
+
+
+def catalog_stats():
+    """The hits, misses and hit ratio of each catalog model in this process."""
+    result = {}
+    for model in CATALOG_MODELS:
+        label = model._meta.label_lower
+        hits, misses = stats[label, "hits"], stats[label, "misses"]
+        result[label] = {
+            "hits": hits,
+            "misses": misses,
+            "ratio": hits / (hits + misses) if hits + misses else None,
+        }
+    return result
+
+
+def clear_catalog():
+    """Forget the snapshots of this process and its counters."""
+    _snapshots.clear()
+    stats.clear()
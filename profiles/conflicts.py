@@ -0,0 +1,113 @@
+from collections import defaultdict, namedtuple
+from django.db.models import Q
+from enrollment_system.profiling import timed
+from profiles.models import Schedule
+
+Conflict = namedtuple("Conflict", ["kind", "schedule", "other"])
+
+CONFLICT_KINDS = ("room", "professor", "section")
+
+
+def term_of(schedule):
+    return (schedule.record.academic_year, schedule.record.academic_term)
+
+
+def resources_of(schedule):
+    return (
+        ("room", schedule.room_id),
+        ("professor", schedule.professor_id),
+        ("section", schedule.record.section_id),
+    )
+
+
+def sweep_overlaps(intervals):
+    """Yield every overlapping pair from (start, end, item) tuples."""
+    active = []
+    for start, end, item in sorted(intervals, key=lambda i: (i[0], i[1])):
+        active = [interval for interval in active if interval[1] > start]
+        for interval in active:
+            yield interval[2], item
+        active.append((start, end, item))
+
+
+def existing_schedules(schedules):
+    """Fetch the saved schedules that may overlap ``schedules`` in one query."""
+    days_by_term = defaultdict(set)
+    resources = defaultdict(set)
+    for schedule in schedules:
+        days_by_term[term_of(schedule)].add(schedule.day)
+        for kind, pk in resources_of(schedule):
+            resources[kind].add(pk)
+    if not days_by_term:
+        return []
+    terms = Q()
+    for (academic_year, academic_term), days in days_by_term.items():
+        terms |= Q(
+            record__academic_year=academic_year,
+            record__academic_term=academic_term,
+            day__in=days,
+        )
+    return (
+        Schedule.objects.filter(terms)
+        .filter(
+            Q(room__in=resources["room"])
+            | Q(professor__in=resources["professor"])
+            | Q(record__section__in=resources["section"])
+        )
+        .filter(
+            start_time__lt=max(schedule.end_time for schedule in schedules),
+            end_time__gt=min(schedule.start_time for schedule in schedules),
+        )
+        .exclude(pk__in=[schedule.pk for schedule in schedules if schedule.pk])
+        .select_related("record")
+        .only(
+            "room",
+            "professor",
+            "day",
+            "start_time",
+            "end_time",
+            "record__academic_year",
+            "record__academic_term",
+            "record__section",
+        )
+    )
+
+
+@timed("conflicts.check_schedules")
+def check_schedules(schedules, existing=None):
+    """
+    Return every room, professor and section conflict of the proposed
+    ``schedules`` against the saved ones and against each other.
+
+    Each proposed schedule must have its ``record`` set. Saved schedules are
+    fetched with a single query unless ``existing`` is given. For conflicts
+    among the proposed schedules, ``schedule`` is the one that comes later in
+    ``schedules`` and ``other`` the earlier one.
+    """
+    schedules = list(schedules)
+    if existing is None:
+        existing = existing_schedules(schedules)
+    order = {id(schedule): index for index, schedule in enumerate(schedules)}
+    groups = defaultdict(list)
+    for schedule in list(existing) + schedules:
+        term = term_of(schedule)
+        for kind, pk in resources_of(schedule):
+            groups[(term, schedule.day, kind, pk)].append(
+                (schedule.start_time, schedule.end_time, schedule)
+            )
+    conflicts = []
+    for (term, day, kind, pk), intervals in groups.items():
+        if len(intervals) < 2:
+            continue
+        for first, second in sweep_overlaps(intervals):
+            first_order = order.get(id(first))
+            second_order = order.get(id(second))
+            if first_order is None and second_order is None:
+                continue
+            if first_order is None or (
+                second_order is not None and first_order < second_order
+            ):
+                conflicts.append(Conflict(kind, second, first))
+            else:
+                conflicts.append(Conflict(kind, first, second))
+    return conflicts
@@ -0,0 +1,127 @@
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from django.db import OperationalError, connections, transaction
+
+# Counters of this process: connections opened, and for writes, how often
+# and how long they waited for a lock or gave up. SQLite waits for the
+# write lock in the BEGIN IMMEDIATE of atomic_write(), PostgreSQL in
+# whichever statement needs a locked row.
+LOCK_STATEMENTS = ("BEGIN IMMEDIATE", "BEGIN EXCLUSIVE")
+# Waits shorter than this are the statement's own run time, not a wait.
+LOCK_WAIT_THRESHOLD_MS = 1.0
+
+metrics = Counter()
+_lock = threading.Lock()
+_wrappers = weakref.WeakSet()
+
+
+def is_lock_error(error):
+    cause = error.__cause__
+    return "locked" in str(error) or getattr(cause, "pgcode", None) in (
+        "55P03",  # lock_not_available
+        "40P01",  # deadlock_detected
+    )
+
+
+def record(**counts):
+    with _lock:
+        metrics.update(counts)
+        if "lock_wait_ms" in counts:
+            metrics["max_lock_wait_ms"] = max(
+                metrics["max_lock_wait_ms"], counts["lock_wait_ms"]
+            )
+
+
+@contextmanager
+def atomic_write(using=None):
+    """
+    transaction.atomic() for a block that writes. On SQLite the outermost
+    block begins with BEGIN IMMEDIATE, waiting up to the busy timeout for
+    the write lock instead of failing with "database is locked" when its
+    first write meets another writer. Other databases are unaffected.
+    """
+    connection = transaction.get_connection(using)
+    connection.begin_immediate = not connection.in_atomic_block
+    try:
+        with transaction.atomic(using=using):
+            connection.begin_immediate = False
+            yield
+    finally:
+        connection.begin_immediate = False
+
+
+def time_locks(execute, sql, params, many, context):
+    waits = sql.upper().startswith(LOCK_STATEMENTS)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    except OperationalError as error:
+        if is_lock_error(error):
+            record(lock_errors=1)
+        raise
+    finally:
+        waited = (time.perf_counter() - started) * 1000
+        if waits and waited >= LOCK_WAIT_THRESHOLD_MS:
+            record(lock_waits=1, lock_wait_ms=waited)
+
+
+def connection_opened(sender, connection, **kwargs):
+    record(connections_opened=1)
+    if connection not in _wrappers:
+        _wrappers.add(connection)
+        # First, so that popping an execute_wrapper() block cannot remove it.
+        connection.execute_wrappers.insert(0, time_locks)
+
+
+def database_metrics():
+    """The counters of this process, with the connections open now."""
+    with _lock:
+        result = dict(metrics)
+    result["connections_open"] = sum(
+        1 for wrapper in list(_wrappers) if wrapper.connection is not None
+    )
+    for key in ("lock_wait_ms", "max_lock_wait_ms"):
+        if key in result:
+            result[key] = round(result[key], 3)
+    return result
+
+
+def reset_metrics():
+    with _lock:
+        metrics.clear()
+
+
+def database_settings(alias="default"):
+    """The settings in effect on the connection, as the server reports them."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            names = (
+                "journal_mode",
+                "synchronous",
+                "mmap_size",
+                "busy_timeout",
+                "temp_store",
+            )
+            result = {}
+            for name in names:
+                cursor.execute("PRAGMA %s" % name)
+                result[name] = cursor.fetchone()[0]
+            return result
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT name, setting FROM pg_settings WHERE name IN "
+                "('max_connections', 'lock_timeout', 'deadlock_timeout')"
+            )
+            result = dict(cursor.fetchall())
+            cursor.execute(
+                "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()"
+            )
+            result["server_connections"] = cursor.fetchone()[0]
+            cursor.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+            result["waiting_locks"] = cursor.fetchone()[0]
+            return result
+    return {}
@@ -0,0 +1,230 @@
+from collections import Counter, defaultdict
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils.translation import gettext_lazy as _
+from enrollment_system.profiling import timed
+from profiles.bitmaps import from_bytes
+from profiles.database import atomic_write
+from profiles.models import Record, Schedule, Student, StudentRecord, StudentTimetable
+from profiles.search import index_objects
+from profiles.student_timetables import find_clash, meeting_mask, refresh_timetables
+from profiles.versions import touch
+
+
+def take_seat(record_id):
+    # A single conditional UPDATE, so concurrent requests can never oversell
+    # a record the way a count-then-insert check would.
+    return Record.objects.filter(
+        Q(capacity__isnull=True) | Q(enrolled_count__lt=F("capacity")),
+        pk=record_id,
+    ).update(enrolled_count=F("enrolled_count") + 1)
+
+
+def release_seat(record_id):
+    return Record.objects.filter(pk=record_id, enrolled_count__gt=0).update(
+        enrolled_count=F("enrolled_count") - 1
+    )
+
+
+@timed("enrollment.enroll")
+def enroll(student, record_ids):
+    """
+    Enroll ``student`` into every record in ``record_ids`` or none of them.
+
+    Raise ValidationError if a record is full, missing, clashes with the
+    student's timetable or another of the records, or already has the
+    student enrolled.
+    """
+    record_ids = sorted(set(record_ids))
+    if not record_ids:
+        raise ValidationError(_("No records were given."), code="empty")
+    duplicate = ValidationError(
+        _("The student is already enrolled in one of the records."),
+        code="duplicate",
+    )
+    try:
+        with atomic_write():
+            # Checked first, as a record the student already has would
+            # otherwise be reported as a clash with itself.
+            if StudentRecord.objects.filter(
+                student=student, record__in=record_ids
+            ).exists():
+                raise duplicate
+            clash = find_clash(student, record_ids)
+            if clash is not None:
+                raise ValidationError(
+                    _("Record %(record)s clashes with the student's schedule."),
+                    code="clash",
+                    params={"record": clash},
+                )
+            # Seats are taken in primary key order so that concurrent
+            # enrollments lock rows in the same order and cannot deadlock.
+            for record_id in record_ids:
+                if not take_seat(record_id):
+                    if Record.objects.filter(pk=record_id).exists():
+                        raise ValidationError(
+                            _("Record %(record)s is already full."),
+                            code="full",
+                            params={"record": record_id},
+                        )
+                    raise ValidationError(
+                        _("Record %(record)s does not exist."),
+                        code="invalid",
+                        params={"record": record_id},
+                    )
+            student_records = StudentRecord.objects.bulk_create(
+                [
+                    StudentRecord(record_id=record_id, student=student)
+                    for record_id in record_ids
+                ]
+            )
+            touch(Record)
+            refresh_timetables([student.pk])
+            transaction.on_commit(
+                lambda: index_objects(
+                    StudentRecord.objects.filter(
+                        pk__in=[student_record.pk for student_record in student_records]
+                    )
+                )
+            )
+            return student_records
+    except IntegrityError:
+        # A concurrent enrollment of the same student, unless the error
+        # comes from another constraint.
+        if StudentRecord.objects.filter(
+            student=student, record__in=record_ids
+        ).exists():
+            raise duplicate
+        raise
+
+
+@timed("enrollment.enroll_block")
+def enroll_block(
+    section, students, academic_year, academic_term, batch_size=1000, progress=None
+):
+    """
+    Enroll every student of ``students``, a cohort of students or their ids,
+    into every record of the block ``section`` in the given term, in one
+    transaction. Student records that exist are skipped. ``progress`` is
+    called with the number of student records created so far and the total
+    after each batch.
+
+    Return the number of student records created, or raise ValidationError
+    if the section is open or has no records in the term, a student does
+    not exist, a record would be overfilled, or the section's schedules
+    clash with a student's timetable.
+    """
+    if section.is_open:
+        raise ValidationError(
+            _("Only block sections can be enrolled as a block."), code="open"
+        )
+    student_ids = list(
+        dict.fromkeys(getattr(student, "pk", student) for student in students)
+    )
+    records = Record.objects.filter(
+        section=section, academic_year=academic_year, academic_term=academic_term
+    )
+    with atomic_write():
+        record_ids = list(records.order_by("pk").values_list("pk", flat=True))
+        if not record_ids:
+            raise ValidationError(
+                _("Section %(section)s has no records in this term."),
+                code="empty",
+                params={"section": section},
+            )
+        # Locked like find_clash() does, until the timetables are refreshed.
+        known = set(
+            Student.objects.select_for_update()
+            .filter(pk__in=student_ids)
+            .values_list("pk", flat=True)
+        )
+        missing = [pk for pk in student_ids if pk not in known]
+        if missing:
+            raise ValidationError(
+                _("Students %(students)s do not exist."),
+                code="invalid",
+                params={"students": ", ".join(map(str, missing[:10]))},
+            )
+        existing = set(
+            StudentRecord.objects.filter(record__in=record_ids).values_list(
+                "record", "student"
+            )
+        )
+        pairs = [
+            (record, student)
+            for student in student_ids
+            for record in record_ids
+            if (record, student) not in existing
+        ]
+        check_block_clashes(record_ids, pairs, academic_year, academic_term)
+        seats = Counter(record for record, student in pairs)
+        # Like take_seat(), one conditional UPDATE per record.
+        for record, count in sorted(seats.items()):
+            if not Record.objects.filter(
+                Q(capacity__isnull=True) | Q(capacity__gte=F("enrolled_count") + count),
+                pk=record,
+            ).update(enrolled_count=F("enrolled_count") + count):
+                raise ValidationError(
+                    _("Record %(record)s has no room for %(count)s more students."),
+                    code="full",
+                    params={"record": record, "count": count},
+                )
+        for start in range(0, len(pairs), batch_size):
+            StudentRecord.objects.bulk_create(
+                [
+                    StudentRecord(record_id=record, student_id=student)
+                    for record, student in pairs[start : start + batch_size]
+                ]
+            )
+            if progress is not None:
+                progress(min(start + batch_size, len(pairs)), len(pairs))
+        if pairs:
+            touch(Record)
+            refresh_timetables(
+                sorted({student for record, student in pairs}), batch_size=batch_size
+            )
+            transaction.on_commit(
+                lambda: index_objects(
+                    StudentRecord.objects.filter(record__in=record_ids),
+                    batch_size=batch_size,
+                )
+            )
+    return len(pairs)
+
+
+def check_block_clashes(record_ids, pairs, academic_year, academic_term):
+    """
+    Raise ValidationError if the schedules that ``pairs`` of (record,
+    student) would add overlap each other or the students' timetables.
+    """
+    masks = defaultdict(int)
+    for record, *meeting in Schedule.objects.filter(record__in=record_ids).values_list(
+        "record", "day", "start_time", "end_time"
+    ):
+        masks[record] |= meeting_mask(*meeting)
+    added = defaultdict(int)
+    clashing = set()
+    for record, student in pairs:
+        if added[student] & masks[record]:
+            clashing.add(student)
+        added[student] |= masks[record]
+    for student, slots in StudentTimetable.objects.filter(
+        student__in=list(added),
+        academic_year=academic_year,
+        academic_term=academic_term,
+    ).values_list("student", "slots"):
+        if added[student] & from_bytes(slots):
+            clashing.add(student)
+    if clashing:
+        raise ValidationError(
+            _(
+                "The section's schedules clash with the timetables of %(count)s "
+                "students, such as %(students)s."
+            ),
+            code="clash",
+            params={
+                "count": len(clashing),
+                "students": ", ".join(map(str, sorted(clashing)[:10])),
+            },
+        )
@@ -0,0 +1,155 @@
+import csv
+import io
+import tempfile
+from collections import namedtuple
+from datetime import time
+from django.utils.text import slugify
+from profiles.models import Schedule, StudentRecord
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# Exports read plain values with .values_list() and .iterator(), so that no
+# model instance is built and memory does not grow with the number of rows.
+Export = namedtuple("Export", ["model", "columns", "ordering", "filters"])
+
+RECORD_COLUMNS = [
+    ("record", "record"),
+    ("academic_year", "record__academic_year"),
+    ("academic_term", "record__academic_term"),
+    ("program", "record__curriculum_course__curriculum__program__title"),
+    ("course_code", "record__curriculum_course__course__code"),
+    ("course_title", "record__curriculum_course__course__title"),
+    ("units", "record__curriculum_course__course__units"),
+    ("section", "record__section__name"),
+    ("professor_last_name", "record__advisor__user__last_name"),
+    ("professor_first_name", "record__advisor__user__first_name"),
+]
+STUDENT_COLUMNS = [
+    ("student_username", "student__user__username"),
+    ("student_last_name", "student__user__last_name"),
+    ("student_first_name", "student__user__first_name"),
+    ("student_middle_name", "student__user__middle_name"),
+]
+RECORD_FILTERS = {
+    "academic_year": "record__academic_year",
+    "academic_term": "record__academic_term",
+    "section": "record__section__name",
+    "course": "record__curriculum_course__course__code",
+}
+NUMERIC_FILTERS = ("academic_year", "academic_term")
+RECORD_ORDERING = [
+    "record__academic_year",
+    "record__academic_term",
+    "record__curriculum_course__course__code",
+    "record__section__name",
+]
+
+EXPORTS = {
+    "grades": Export(
+        StudentRecord,
+        STUDENT_COLUMNS + RECORD_COLUMNS + [("rating", "rating"), ("remark", "remark")],
+        ["student__user__username"] + RECORD_ORDERING,
+        RECORD_FILTERS,
+    ),
+    "class-lists": Export(
+        StudentRecord,
+        RECORD_COLUMNS + STUDENT_COLUMNS,
+        RECORD_ORDERING
+        + ["student__user__last_name", "student__user__first_name", "student"],
+        RECORD_FILTERS,
+    ),
+    "schedules": Export(
+        Schedule,
+        RECORD_COLUMNS
+        + [
+            ("day", "day"),
+            ("start_time", "start_time"),
+            ("end_time", "end_time"),
+            ("room", "room__number"),
+            ("schedule_professor", "professor__user__username"),
+        ],
+        RECORD_ORDERING + ["day", "start_time"],
+        RECORD_FILTERS,
+    ),
+}
+FORMATS = ("csv", "xlsx")
+
+
+def clean_filters(export, params):
+    """
+    Pick the filters of ``export`` out of ``params``. Raise ValueError for
+    a year or term that is not a number.
+    """
+    filters = {}
+    for name in export.filters:
+        value = params.get(name)
+        if value in (None, ""):
+            continue
+        filters[name] = int(value) if name in NUMERIC_FILTERS else value
+    return filters
+
+
+def export_filename(name, filters, extension):
+    """
+    The file name of export ``name`` narrowed by ``filters``, with each part
+    slugified, as section and course filters are free text.
+    """
+    parts = [slugify(str(part)) for part in [name, *filters.values()]]
+    return "%s.%s" % ("-".join(part for part in parts if part), extension)
+
+
+def export_rows(export, filters=None, chunk_size=2000):
+    """
+    Return an iterator over the header and then every row of ``export``,
+    narrowed by ``filters`` from clean_filters().
+    """
+    rows = (
+        export.model.objects.filter(
+            **{export.filters[name]: value for name, value in (filters or {}).items()}
+        )
+        .order_by(*export.ordering)
+        .values_list(*[lookup for header, lookup in export.columns])
+        .iterator(chunk_size=chunk_size)
+    )
+    yield [header for header, lookup in export.columns]
+    for row in rows:
+        yield [
+            value.isoformat("minutes") if isinstance(value, time) else value
+            for value in row
+        ]
+
+
+def csv_chunks(rows, size=64 * 1024):
+    """Encode ``rows`` as CSV text in chunks of about ``size`` characters."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_xlsx(rows, file, title="export"):
+    """Write ``rows`` to ``file`` with openpyxl's constant memory writer."""
+    if openpyxl is None:
+        raise ImportError("XLSX exports require openpyxl.")
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(file)
+
+
+def xlsx_file(rows, title="export"):
+    """An XLSX workbook of ``rows`` in a temporary file, rewound."""
+    file = tempfile.TemporaryFile()
+    write_xlsx(rows, file, title)
+    file.seek(0)
+    return file
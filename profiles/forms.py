@@ -0,0 +1,61 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from profiles.models import Course
+from profiles.prerequisites import get_graph
+
+
+class CourseForm(forms.ModelForm):
+    class Meta:
+        model = Course
+        fields = "__all__"
+
+    def clean_prerequisites(self):
+        prerequisites = self.cleaned_data["prerequisites"]
+        if self.instance.pk and get_graph().creates_cycle(
+            self.instance.pk, {course.pk for course in prerequisites}
+        ):
+            raise ValidationError(
+                _("These prerequisites would make the course a prerequisite of itself.")
+            )
+        return prerequisites
+
+
+class StudentRecordFormSet(forms.BaseInlineFormSet):
+    """The student records of a record, which must fit in its capacity."""
+
+    def clean(self):
+        super().clean()
+        record = self.instance
+        if record.capacity is None:
+            return
+        added = sum(
+            1
+            for form in self.forms
+            if form.instance.pk is None
+            and form.has_changed()
+            and not self._should_delete_form(form)
+        )
+        removed = sum(1 for form in self.deleted_forms if form.instance.pk is not None)
+        if added and record.enrolled_count - removed + added > record.capacity:
+            raise ValidationError(
+                _("The record has no room for %(count)s more students."),
+                code="full",
+                params={"count": added},
+            )
+
+
+class ProfilingForm(forms.Form):
+    rate = forms.FloatField(
+        label=_("sampling rate"),
+        min_value=0,
+        max_value=1,
+        help_text=_("Fraction of requests to run under cProfile, 0 to stop."),
+    )
+    minutes = forms.IntegerField(
+        label=_("minutes"),
+        min_value=1,
+        max_value=24 * 60,
+        initial=15,
+        help_text=_("Stop sampling after this many minutes."),
+    )
@@ -0,0 +1,99 @@
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from profiles.database import atomic_write
+from profiles.models import StudentRecord
+from profiles.transcripts import refresh_transcripts
+
+# Remarks that are given instead of a rating, which is then 0.
+REMARK_GRADES = ("DRP", "INC")
+PASSING_RATING = 75
+
+
+def parse_grade(value):
+    """
+    Return the (rating, remark) pair of a grade, which is a rating from 1 to
+    100, DRP, INC, or blank to clear it. The remark of a rating is derived
+    as the "rating match with remark" constraint requires.
+    """
+    if value is None or value == "":
+        return None, None
+    if isinstance(value, str):
+        value = value.strip().upper()
+        if value in REMARK_GRADES:
+            return 0, value
+    try:
+        rating = float(value)
+    except (TypeError, ValueError):
+        rating = None
+    if isinstance(value, bool) or rating is None or not 0 < rating <= 100:
+        raise ValidationError(
+            _("%(value)s is not a rating from 1 to 100, DRP or INC."),
+            code="invalid",
+            params={"value": value},
+        )
+    return rating, "PSD" if rating >= PASSING_RATING else "FLD"
+
+
+def apply_grades(grades, batch_size=1000):
+    """
+    Grade many student records at once. ``grades`` maps (record id, student
+    id) pairs to grades. Every grade is checked before anything is written,
+    then the changed student records are saved with bulk_update and the
+    transcripts of their students refreshed, in one transaction.
+
+    Return the changed student records, or raise ValidationError listing
+    every invalid grade and every student not enrolled in the record.
+    """
+    errors = []
+    parsed = {}
+    for (record, student), value in grades.items():
+        try:
+            parsed[(record, student)] = parse_grade(value)
+        except ValidationError as error:
+            errors.append(
+                ValidationError(
+                    _("Student %(student)s of record %(record)s: %(error)s"),
+                    code="invalid",
+                    params={
+                        "student": student,
+                        "record": record,
+                        "error": error.messages[0],
+                    },
+                )
+            )
+    records = sorted({record for record, student in parsed})
+    student_records = {}
+    for start in range(0, len(records), batch_size):
+        for student_record in StudentRecord.objects.filter(
+            record__in=records[start : start + batch_size]
+        ).only("record", "student", "rating", "remark"):
+            key = (student_record.record_id, student_record.student_id)
+            if key in parsed:
+                student_records[key] = student_record
+    for record, student in parsed.keys() - student_records.keys():
+        errors.append(
+            ValidationError(
+                _("Student %(student)s is not enrolled in record %(record)s."),
+                code="missing",
+                params={"student": student, "record": record},
+            )
+        )
+    if errors:
+        raise ValidationError(errors)
+
+    changed = []
+    for key, student_record in student_records.items():
+        rating, remark = parsed[key]
+        if (student_record.rating, student_record.remark) != (rating, remark):
+            student_record.rating = rating
+            student_record.remark = remark
+            changed.append(student_record)
+    with atomic_write():
+        StudentRecord.objects.bulk_update(
+            changed, ["rating", "remark"], batch_size=batch_size
+        )
+        refresh_transcripts(
+            {student_record.student_id for student_record in changed},
+            batch_size=batch_size,
+        )
+    return changed
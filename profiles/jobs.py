@@ -0,0 +1,355 @@
+import io
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.models import F, Q
+from django.utils import timezone
+from profiles import enrollment, workers
+from profiles.exports import EXPORTS, clean_filters, export_filename
+from profiles.models import Job, Section
+
+# A job queue kept in the Job table, so that long registrar operations run
+# in worker processes (see the run_jobs command) instead of in requests,
+# with no broker but the database. Workers claim a queued job with one
+# conditional UPDATE, so two workers never run the same job. A job that
+# raises is queued again after a growing delay until it runs out of
+# attempts, except for invalid input, which fails at once. A thread of each
+# worker stamps the heartbeat_at of its running jobs, and a running job
+# without a recent heartbeat lost its worker and is retried like a job that
+# raised. Progress is kept in the default cache, which every process
+# shares, since a job's own transaction hides its writes until it ends.
+PROGRESS_KEY = "job-progress:%d"
+# Errors of invalid input, which no retry can fix.
+PERMANENT_ERRORS = (
+    CommandError,
+    ValidationError,
+    ObjectDoesNotExist,
+    KeyError,
+    TypeError,
+    ValueError,
+)
+
+JOBS = {}
+
+
+def job(name):
+    """Register the decorated function as the job ``name``."""
+
+    def decorator(function):
+        JOBS[name] = function
+        return function
+
+    return decorator
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(name, arguments=None, created_by=None, max_attempts=None):
+    """
+    Queue the job ``name`` and return it. The job is a row of the caller's
+    transaction, if there is one, so workers only see it once that commits.
+    """
+    if name not in JOBS:
+        raise ValueError("Unknown job %r." % name)
+    return Job.objects.create(
+        name=name,
+        arguments=arguments or {},
+        created_by=created_by,
+        max_attempts=max_attempts or setting("JOBS_MAX_ATTEMPTS", 3),
+    )
+
+
+class Run:
+    """What a job function is given besides its arguments."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def progress(self, done, total=None):
+        cache.set(PROGRESS_KEY % self.job_id, (done, total), timeout=86400)
+
+
+def job_progress(job):
+    """The (done, total) progress of ``job``, from the cache while it runs."""
+    if job.status == job.RUNNING:
+        return cache.get(PROGRESS_KEY % job.pk, (job.progress_done, job.progress_total))
+    return job.progress_done, job.progress_total
+
+
+def claim(worker):
+    """Mark the next due job as run by ``worker`` and return its id, or None."""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by(
+        "run_after", "pk"
+    )
+    for pk in due.values_list("pk", flat=True)[:10]:
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            worker=worker,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            heartbeat_at=now,
+        ):
+            return pk
+    return None
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=setting("JOBS_RETRY_DELAY", 60) * 2 ** (attempts - 1))
+
+
+def run_job(pk):
+    """Run the claimed job ``pk`` and record how it ended."""
+    job = Job.objects.get(pk=pk)
+    try:
+        result = JOBS[job.name](Run(pk), **job.arguments)
+    except Exception as error:
+        now = timezone.now()
+        changes = {"error": traceback.format_exc()}
+        if isinstance(error, PERMANENT_ERRORS) or job.attempts >= job.max_attempts:
+            changes.update(status=Job.FAILED, finished_at=now)
+        else:
+            changes.update(
+                status=Job.QUEUED, worker="", run_after=now + retry_delay(job.attempts)
+            )
+    else:
+        changes = {
+            "status": Job.SUCCEEDED,
+            "result": result,
+            "error": "",
+            "finished_at": timezone.now(),
+        }
+    changes["progress_done"], changes["progress_total"] = job_progress(job)
+    Job.objects.filter(pk=pk).update(**changes)
+    cache.delete(PROGRESS_KEY % pk)
+    return changes["status"] == Job.SUCCEEDED
+
+
+def requeue(jobs, error):
+    """
+    Queue the running ``jobs``, a queryset, again after the delay of their
+    attempts, like run_job() does with a job that raised, or fail those out
+    of attempts. Return how many jobs were queued or failed.
+    """
+    now = timezone.now()
+    jobs = jobs.filter(status=Job.RUNNING)
+    count = jobs.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, error=error, finished_at=now, heartbeat_at=None
+    )
+    for attempts in set(jobs.values_list("attempts", flat=True)):
+        count += jobs.filter(attempts=attempts).update(
+            status=Job.QUEUED,
+            error=error,
+            worker="",
+            run_after=now + retry_delay(attempts),
+            heartbeat_at=None,
+        )
+    return count
+
+
+def release(pk):
+    """Queue the claimed job ``pk`` again, as if it had not been claimed."""
+    Job.objects.filter(pk=pk, status=Job.RUNNING).update(
+        status=Job.QUEUED, worker="", attempts=F("attempts") - 1, heartbeat_at=None
+    )
+
+
+def requeue_stale():
+    """
+    Queue again the running jobs whose worker stopped sending heartbeats.
+    A job that kills its worker counts an attempt each time, so it fails
+    once it runs out of them instead of killing workers forever.
+    """
+    stale_after = timedelta(seconds=setting("JOBS_STALE_AFTER", 300))
+    return requeue(
+        Job.objects.filter(
+            Q(heartbeat_at__isnull=True)
+            | Q(heartbeat_at__lt=timezone.now() - stale_after)
+        ),
+        "The worker stopped sending heartbeats.",
+    )
+
+
+class Heartbeat(threading.Thread):
+    """Tell other workers, every ``interval`` seconds, which jobs are alive."""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.jobs = set()
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.beat()
+                except DatabaseError:
+                    # On SQLite a beat can time out behind the write
+                    # transaction of a job; the next one tries again.
+                    pass
+        finally:
+            connection.close()
+
+    def beat(self):
+        jobs = list(self.jobs)
+        if jobs:
+            Job.objects.filter(pk__in=jobs, status=Job.RUNNING).update(
+                heartbeat_at=timezone.now()
+            )
+
+
+def work(concurrency=1, once=False, poll=1.0, log=None):
+    """
+    Run queued jobs, ``concurrency`` at a time in a pool of processes, or
+    in this process when it is 1. Stop once the queue is empty if ``once``.
+    """
+    worker = "%s:%d" % (socket.gethostname(), os.getpid())
+    log = log or (lambda message: None)
+    requeue_stale()
+    heartbeat = Heartbeat(max(1, setting("JOBS_STALE_AFTER", 300) // 10))
+    heartbeat.start()
+    pool = start_pool(concurrency) if concurrency > 1 else None
+    broken = False
+    running = {}
+
+    def finish(pk, succeeded):
+        heartbeat.jobs.discard(pk)
+        log("Job %d %s." % (pk, "succeeded" if succeeded else "failed"))
+
+    try:
+        while True:
+            if broken and not running:
+                pool.shutdown(wait=False)
+                pool = start_pool(concurrency)
+                broken = False
+            claimed = False
+            while len(running) < concurrency:
+                pk = claim(worker)
+                if pk is None:
+                    break
+                claimed = True
+                heartbeat.jobs.add(pk)
+                log("Started job %d." % pk)
+                if pool is None:
+                    finish(pk, run_job(pk))
+                    continue
+                try:
+                    running[pool.submit(workers.run_job, pk)] = pk
+                except BrokenProcessPool:
+                    # The futures of the running jobs tell which died.
+                    release(pk)
+                    heartbeat.jobs.discard(pk)
+                    log("Released job %d." % pk)
+                    broken = True
+                    break
+            if running:
+                done = wait(running, timeout=poll, return_when=FIRST_COMPLETED).done
+                for future in done:
+                    pk = running.pop(future)
+                    try:
+                        succeeded = future.result()
+                    except BrokenProcessPool:
+                        # A process of the pool died, running this job or
+                        # another, and the pool stopped every process.
+                        requeue(Job.objects.filter(pk=pk), "The worker process died.")
+                        broken = True
+                        succeeded = False
+                    except Exception:
+                        # The job's process could not record how it ended,
+                        # so the job stays running until a worker finds it
+                        # stale.
+                        succeeded = False
+                    finish(pk, succeeded)
+            elif not claimed:
+                if once:
+                    return
+                time.sleep(poll)
+                requeue_stale()
+    finally:
+        heartbeat.stopped.set()
+        if pool is not None:
+            pool.shutdown()
+
+
+def start_pool(concurrency):
+    # Spawned, so that no process inherits a database connection.
+    return ProcessPoolExecutor(
+        concurrency,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=workers.setup,
+    )
+
+
+def run_command(name, *args, **options):
+    output = io.StringIO()
+    call_command(name, *args, stdout=output, stderr=output, **options)
+    return {"output": output.getvalue()[-10000:]}
+
+
+def output_path(run, filename):
+    directory = Path(setting("JOBS_DIR", "jobs"))
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / ("%d-%s" % (run.job_id, filename))
+
+
+@job("import_grades")
+def import_grades(run, path, dry_run=False):
+    return run_command("import_grades", path, dry_run=dry_run)
+
+
+@job("import_schedules")
+def import_schedules(run, path):
+    return run_command("import_schedules", path)
+
+
+@job("rebuild_transcripts")
+def rebuild_transcripts(run, students=()):
+    return run_command("rebuild_transcripts", *map(str, students))
+
+
+@job("rebuild_timetables")
+def rebuild_timetables(run, students=()):
+    return run_command("rebuild_timetables", *map(str, students))
+
+
+@job("export_records")
+def export_records(run, export, format="csv", **filters):
+    filename = export_filename(export, clean_filters(EXPORTS[export], filters), format)
+    path = output_path(run, filename)
+    run_command("export_records", export, format=format, output=str(path), **filters)
+    return {"file": path.name}
+
+
+@job("enroll_block")
+def enroll_block(run, section, academic_year, academic_term, students):
+    created = enrollment.enroll_block(
+        Section.objects.get(pk=section),
+        students,
+        academic_year,
+        academic_term,
+        progress=run.progress,
+    )
+    return {"created": created}
+
+
+@job("rollover_term")
+def rollover_term(run, source_year, source_term, target_year, target_term):
+    return run_command(
+        "rollover_term",
+        *map(str, (source_year, source_term, target_year, target_term)),
+    )
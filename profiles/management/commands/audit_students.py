@@ -0,0 +1,84 @@
+import csv
+import time
+from django.core.management.base import BaseCommand
+from profiles.audits import audit_students
+from profiles.models import Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Audit students against their curricula and report the units they "
+        "still need, their missing and blocked courses, and whether they can "
+        "graduate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("students", nargs="*", type=int)
+        parser.add_argument(
+            "--curriculum", type=int, action="append", help="Curriculum id."
+        )
+        parser.add_argument(
+            "--eligible",
+            action="store_true",
+            help="Only report the students who can graduate.",
+        )
+        parser.add_argument("--output", help="Write the report to this CSV file.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        students = Student.objects.all()
+        if options["students"]:
+            students = students.filter(pk__in=options["students"])
+        if options["curriculum"]:
+            students = students.filter(curriculum__in=options["curriculum"])
+        started = time.perf_counter()
+        audits = audit_students(students.values("pk"), batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        if options["eligible"]:
+            audits = {
+                student: audit for student, audit in audits.items() if audit.eligible
+            }
+        usernames = dict(
+            Student.objects.filter(pk__in=list(audits)).values_list(
+                "pk", "user__username"
+            )
+        )
+        rows = [
+            (
+                student,
+                usernames.get(student),
+                audit.curriculum,
+                audit.units_required,
+                audit.units_earned,
+                audit.units_remaining,
+                sum(len(courses) for courses in audit.missing.values()),
+                len(audit.blocked),
+                audit.eligible,
+            )
+            for student, audit in sorted(audits.items())
+        ]
+        if options["output"]:
+            with open(options["output"], "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(
+                    [
+                        "student",
+                        "username",
+                        "curriculum",
+                        "units_required",
+                        "units_earned",
+                        "units_remaining",
+                        "missing",
+                        "blocked",
+                        "eligible",
+                    ]
+                )
+                writer.writerows(rows)
+        self.stdout.write(
+            "Audited %d students in %.2f seconds, %d can graduate."
+            % (
+                len(audits) if not options["eligible"] else len(rows),
+                elapsed,
+                sum(1 for row in rows if row[-1]),
+            )
+        )
@@ -0,0 +1,113 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from profiles.conflicts import existing_schedules
+from profiles.models import (
+    CurriculumCourse,
+    Record,
+    Schedule,
+    StudentRecord,
+)
+
+INDEXED_MODELS = (CurriculumCourse, Record, Schedule, StudentRecord)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot record, schedule and student record queries and show "
+        "their query plans without and with the composite indexes. The "
+        "indexes are dropped and recreated, so run it on a seeded copy of the "
+        "database rather than on a live one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--no-plans", action="store_true", help="Only print the timings."
+        )
+
+    def handle(self, *args, **options):
+        schedule = Schedule.objects.select_related("record").order_by("pk").first()
+        student_record = (
+            StudentRecord.objects.select_related("record").order_by("pk").first()
+        )
+        if schedule is None or student_record is None:
+            raise CommandError(
+                "Seed the database with schedules and student records first."
+            )
+        queries = self.queries(schedule, student_record)
+
+        before = self.measure(queries, options, drop_indexes=True)
+        after = self.measure(queries, options, drop_indexes=False)
+        self.stdout.write("%-28s %12s %12s" % ("query", "before (ms)", "after (ms)"))
+        for name in queries:
+            self.stdout.write("%-28s %12.3f %12.3f" % (name, before[name], after[name]))
+
+    def queries(self, schedule, student_record):
+        return {
+            "room overlap": lambda: Schedule.objects.filter(
+                room=schedule.room_id,
+                day=schedule.day,
+                start_time__lt=schedule.end_time,
+                end_time__gt=schedule.start_time,
+            ),
+            "professor overlap": lambda: Schedule.objects.filter(
+                professor=schedule.professor_id,
+                day=schedule.day,
+                start_time__lt=schedule.end_time,
+                end_time__gt=schedule.start_time,
+            ),
+            "conflict check": lambda: existing_schedules([schedule]),
+            "records of a term": lambda: Record.objects.filter(
+                academic_year=schedule.record.academic_year,
+                academic_term=schedule.record.academic_term,
+            ).order_by("-academic_year", "-academic_term"),
+            "section records of a term": lambda: Record.objects.filter(
+                section=schedule.record.section_id,
+                academic_year=schedule.record.academic_year,
+                academic_term=schedule.record.academic_term,
+            ),
+            "student records of a year": lambda: StudentRecord.objects.filter(
+                student=student_record.student_id,
+                record__academic_year=student_record.record.academic_year,
+            ),
+            "curriculum layout": lambda: CurriculumCourse.objects.filter(
+                curriculum=schedule.record.curriculum_course.curriculum_id
+            ).order_by("year_level", "academic_term"),
+        }
+
+    def measure(self, queries, options, drop_indexes):
+        schema_editor = connection.schema_editor()
+        indexes = [
+            (model, index) for model in INDEXED_MODELS for index in model._meta.indexes
+        ]
+        if drop_indexes:
+            with connection.cursor() as cursor:
+                for model, index in indexes:
+                    cursor.execute(str(index.remove_sql(model, schema_editor)))
+        try:
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    "Without composite indexes"
+                    if drop_indexes
+                    else "With composite indexes"
+                )
+            )
+            timings = {}
+            for name, query in queries.items():
+                list(query())
+                samples = []
+                for repeat in range(options["repeat"]):
+                    started = time.perf_counter()
+                    list(query())
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[name] = statistics.median(samples)
+                if not options["no_plans"]:
+                    self.stdout.write("%s:\n%s\n" % (name, query().explain()))
+            return timings
+        finally:
+            if drop_indexes:
+                with connection.cursor() as cursor:
+                    for model, index in indexes:
+                        cursor.execute(str(index.create_sql(model, schema_editor)))
@@ -0,0 +1,230 @@
+import asyncio
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from profiles.benchmarks import summarize
+from profiles.models import Student, StudentTimetable
+
+CSRF_TOKEN = "benchmarkbenchmarkbenchmarkbench"
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the schedule lookup or the login to many concurrent slow "
+        "clients, first from a pool of WSGI worker threads and then from one "
+        "ASGI event loop, and print the throughput and latency of each as "
+        "JSON. A slow client takes --delay seconds to send its request, "
+        "which a WSGI worker waits out while an ASGI worker serves others."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--endpoint", choices=("schedule", "login"), default="schedule"
+        )
+        parser.add_argument("--clients", type=int, default=100)
+        parser.add_argument(
+            "--requests", type=int, default=5, help="Requests made by each client."
+        )
+        parser.add_argument("--delay", type=float, default=0.1)
+        parser.add_argument(
+            "--workers", type=int, default=8, help="WSGI worker threads."
+        )
+        parser.add_argument(
+            "--password",
+            default="enrollment",
+            help="Password of the seeded accounts, for the login.",
+        )
+        parser.add_argument("--output", help="Write the report to this file.")
+
+    def handle(self, *args, **options):
+        if settings.DATABASES["default"]["NAME"] == ":memory:":
+            raise CommandError("Run against a database file or server.")
+        students = list(
+            Student.objects.filter(
+                pk__in=StudentTimetable.objects.values("student")
+            ).select_related("user")[: options["clients"]]
+        )
+        if len(students) < options["clients"]:
+            raise CommandError("Seed the database first, see seed_university.")
+        self.delay = options["delay"]
+        self.requests = self.build_requests(students, options)
+        try:
+            results = {
+                "wsgi": self.run_wsgi(options["workers"]),
+                "asgi": asyncio.run(self.run_asgi()),
+            }
+        finally:
+            Session.objects.filter(pk__in=self.sessions).delete()
+        report = {
+            "endpoint": options["endpoint"],
+            "clients": options["clients"],
+            "requests_per_client": options["requests"],
+            "delay_s": options["delay"],
+            "wsgi_workers": options["workers"],
+            "results": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        self.stdout.write(output)
+
+    def build_requests(self, students, options):
+        """The (method, path, headers, body) requests of each client."""
+        self.sessions = []
+        requests = []
+        for student in students:
+            if options["endpoint"] == "schedule":
+                client = Client()
+                client.force_login(student.user)
+                session = client.cookies[settings.SESSION_COOKIE_NAME].value
+                self.sessions.append(session)
+                request = (
+                    "GET",
+                    reverse("profiles:my_schedule"),
+                    {"cookie": "%s=%s" % (settings.SESSION_COOKIE_NAME, session)},
+                    b"",
+                )
+            else:
+                request = (
+                    "POST",
+                    reverse("accounts:login"),
+                    {
+                        "cookie": "%s=%s" % (settings.CSRF_COOKIE_NAME, CSRF_TOKEN),
+                        "x-csrftoken": CSRF_TOKEN,
+                        "content-type": "application/json",
+                    },
+                    json.dumps(
+                        {
+                            "identifier": student.user.username,
+                            "password": options["password"],
+                        }
+                    ).encode(),
+                )
+            requests.append([request] * options["requests"])
+        return requests
+
+    def result(self, statuses, latencies, elapsed):
+        summary = summarize(latencies)
+        summary["elapsed_s"] = round(elapsed, 3)
+        summary["requests_per_s"] = round(len(latencies) / elapsed, 1)
+        summary["statuses"] = {
+            str(status): statuses.count(status) for status in sorted(set(statuses))
+        }
+        return summary
+
+    def run_wsgi(self, workers):
+        application = get_wsgi_application()
+
+        def serve(request):
+            method, path, headers, body = request
+            # A sync worker is busy from the moment it accepts a connection,
+            # so it waits for the whole of the slow client's request.
+            time.sleep(self.delay)
+            environ = {
+                "REQUEST_METHOD": method,
+                "PATH_INFO": path,
+                "QUERY_STRING": "",
+                "SERVER_NAME": "localhost",
+                "SERVER_PORT": "80",
+                "SERVER_PROTOCOL": "HTTP/1.1",
+                "CONTENT_LENGTH": str(len(body)),
+                "wsgi.input": io.BytesIO(body),
+                "wsgi.errors": sys.stderr,
+                "wsgi.url_scheme": "http",
+                "wsgi.multithread": True,
+                "wsgi.multiprocess": False,
+                "wsgi.run_once": False,
+            }
+            for name, value in headers.items():
+                key = name.upper().replace("-", "_")
+                if key != "CONTENT_TYPE":
+                    key = "HTTP_" + key
+                environ[key] = value
+            status = []
+            response = application(
+                environ, lambda line, headers, *args: status.append(int(line[:3]))
+            )
+            b"".join(response)
+            response.close()
+            return status[0]
+
+        pool = ThreadPoolExecutor(workers, thread_name_prefix="wsgi-worker")
+        statuses = []
+        latencies = []
+        lock = threading.Lock()
+
+        def client(requests):
+            for request in requests:
+                started = time.perf_counter()
+                status = pool.submit(serve, request).result()
+                with lock:
+                    statuses.append(status)
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(len(self.requests)) as clients:
+            list(clients.map(client, self.requests))
+        elapsed = time.perf_counter() - started
+        pool.shutdown()
+        connections.close_all()
+        return self.result(statuses, latencies, elapsed)
+
+    async def run_asgi(self):
+        application = get_asgi_application()
+        statuses = []
+        latencies = []
+
+        async def serve(request):
+            method, path, headers, body = request
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": method,
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": b"",
+                "root_path": "",
+                "headers": [(b"host", b"localhost")]
+                + [(name.encode(), value.encode()) for name, value in headers.items()],
+                "client": ("127.0.0.1", 0),
+                "server": ("localhost", 80),
+            }
+
+            async def receive():
+                # The request arrives slowly, but only this task waits for it.
+                await asyncio.sleep(self.delay)
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            status = []
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+
+            await application(scope, receive, send)
+            return status[0]
+
+        async def client(requests):
+            for request in requests:
+                started = time.perf_counter()
+                statuses.append(await serve(request))
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[client(requests) for requests in self.requests])
+        elapsed = time.perf_counter() - started
+        return self.result(statuses, latencies, elapsed)
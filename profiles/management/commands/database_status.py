@@ -0,0 +1,23 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from profiles.database import database_metrics, database_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the database profile, the settings in effect on a new "
+        "connection and this process's connection and lock wait counters "
+        "as JSON."
+    )
+
+    def handle(self, *args, **options):
+        report = {
+            "profile": getattr(settings, "DATABASE_PROFILE", None),
+            "vendor": connection.vendor,
+            "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+            "settings": database_settings(),
+            "metrics": database_metrics(),
+        }
+        self.stdout.write(json.dumps(report, indent=2, default=str))
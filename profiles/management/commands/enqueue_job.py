@@ -0,0 +1,28 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from profiles.jobs import JOBS, enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue a background job for the run_jobs workers, with its arguments "
+        "given as name=value pairs whose values are read as JSON when they "
+        "can be, as in students=[1,2,3]."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("job", choices=sorted(JOBS))
+        parser.add_argument("arguments", nargs="*", metavar="name=value")
+
+    def handle(self, *args, **options):
+        arguments = {}
+        for pair in options["arguments"]:
+            name, separator, value = pair.partition("=")
+            if not separator:
+                raise CommandError("Expected name=value, not %r." % pair)
+            try:
+                arguments[name] = json.loads(value)
+            except ValueError:
+                arguments[name] = value
+        job = enqueue(options["job"], arguments)
+        self.stdout.write("Queued job %d." % job.pk)
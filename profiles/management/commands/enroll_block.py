@@ -0,0 +1,70 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from profiles.enrollment import enroll_block
+from profiles.management.commands.import_schedules import read_rows
+from profiles.models import Section, Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Enroll a cohort of students into every record of a block section in "
+        "a term. The cohort is the students of a curriculum, or those listed "
+        "by student_username in a CSV, JSON or JSON lines file. Students "
+        "already enrolled in a record are skipped, and nothing is written if "
+        "a record would be overfilled or a schedule clashes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("section", help="Name of the block section.")
+        parser.add_argument("academic_year", type=int)
+        parser.add_argument("academic_term", type=int)
+        cohort = parser.add_mutually_exclusive_group(required=True)
+        cohort.add_argument("--curriculum", type=int, help="Curriculum id.")
+        cohort.add_argument("--students", help="File of student usernames.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            section = Section.objects.get(name=options["section"])
+        except Section.DoesNotExist:
+            raise CommandError("No section named %r." % options["section"])
+        if options["curriculum"] is not None:
+            students = list(
+                Student.objects.filter(curriculum=options["curriculum"]).values_list(
+                    "pk", flat=True
+                )
+            )
+        else:
+            try:
+                usernames = {
+                    str(row.get("student_username", ""))
+                    for row in read_rows(options["students"])
+                }
+            except (OSError, ValueError) as error:
+                raise CommandError(error)
+            students = list(
+                Student.objects.filter(user__username__in=usernames).values_list(
+                    "pk", flat=True
+                )
+            )
+            if len(students) < len(usernames):
+                raise CommandError(
+                    "%d usernames are not students." % (len(usernames) - len(students))
+                )
+        try:
+            count = enroll_block(
+                section,
+                students,
+                options["academic_year"],
+                options["academic_term"],
+                batch_size=options["batch_size"],
+                progress=self.progress,
+            )
+        except ValidationError as error:
+            raise CommandError(" ".join(error.messages))
+        self.stdout.write(
+            "Created %d student records for %d students." % (count, len(students))
+        )
+
+    def progress(self, done, total):
+        self.stdout.write("%d of %d student records." % (done, total))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from profiles.exports import (
+    EXPORTS,
+    FORMATS,
+    clean_filters,
+    csv_chunks,
+    export_rows,
+    openpyxl,
+    write_xlsx,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Export grades, class lists or schedules as CSV or XLSX, reading the "
+        "rows in chunks so that memory stays flat for any number of rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("export", choices=sorted(EXPORTS))
+        parser.add_argument("--academic-year")
+        parser.add_argument("--academic-term")
+        parser.add_argument("--section", help="Section name.")
+        parser.add_argument("--course", help="Course code.")
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument(
+            "--output", help="Write to this file instead of the standard output."
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options["export"]]
+        try:
+            filters = clean_filters(export, options)
+        except ValueError:
+            raise CommandError("The academic year and term must be numbers.")
+        rows = export_rows(export, filters, chunk_size=options["chunk_size"])
+        if options["format"] == "xlsx":
+            if openpyxl is None:
+                raise CommandError("XLSX exports require openpyxl.")
+            if not options["output"]:
+                raise CommandError("XLSX exports need an --output file.")
+            with open(options["output"], "wb") as file:
+                write_xlsx(rows, file, options["export"])
+        elif options["output"]:
+            with open(options["output"], "w", newline="") as file:
+                file.writelines(csv_chunks(rows))
+        else:
+            for chunk in csv_chunks(rows):
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,155 @@
+import csv
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_time
+from profiles.bitmaps import minutes_of
+from profiles.conflicts import check_schedules
+from profiles.database import atomic_write
+from profiles.models import Record, Schedule
+from profiles.occupancy import touch_terms
+from profiles.search import index_objects
+from profiles.student_timetables import deferred_refresh, queue_refresh
+from profiles.timetable import build_schedules, load_problem, search
+from profiles.versions import touch
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate conflict-free schedules for the records of a term that have "
+        "none yet, meeting the weekly hours of each course's units, around "
+        "the schedules already saved for that term."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("academic_year", type=int)
+        parser.add_argument("academic_term", type=int)
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Reschedule every record of the term, replacing its schedules.",
+        )
+        parser.add_argument(
+            "--days", type=int, default=6, help="Teaching days, from Monday."
+        )
+        parser.add_argument("--day-start", default="07:00")
+        parser.add_argument("--day-end", default="21:00")
+        parser.add_argument(
+            "--step", type=int, default=30, help="Minutes between start times."
+        )
+        parser.add_argument("--restarts", type=int, default=1)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Run the restarts in this many processes.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--max-ejections", type=int)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--report", help="Write the records left unplaced to this CSV file."
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Search for a timetable without writing any schedule.",
+        )
+
+    def handle(self, *args, **options):
+        day_start = parse_time(options["day_start"])
+        day_end = parse_time(options["day_end"])
+        if day_start is None or day_end is None or day_start >= day_end:
+            raise CommandError("Invalid teaching hours.")
+        if not 1 <= options["days"] <= 7 or options["step"] < 1:
+            raise CommandError("Invalid days or step.")
+        records = Record.objects.filter(
+            academic_year=options["academic_year"],
+            academic_term=options["academic_term"],
+        )
+        if not options["replace"]:
+            records = records.filter(schedule__isnull=True)
+
+        started = time.perf_counter()
+        problem = load_problem(
+            records,
+            days=options["days"],
+            day_start=minutes_of(day_start),
+            day_end=minutes_of(day_end),
+            step=options["step"],
+        )
+        if not problem.tasks:
+            raise CommandError("There are no records to schedule.")
+        if not problem.rooms:
+            raise CommandError("There are no rooms.")
+        solution = search(
+            problem,
+            restarts=options["restarts"],
+            workers=options["workers"],
+            seed=options["seed"],
+            max_ejections=options["max_ejections"],
+        )
+        elapsed = time.perf_counter() - started
+
+        schedules = build_schedules(solution)
+        if not options["dry_run"]:
+            with atomic_write(), deferred_refresh():
+                if options["replace"]:
+                    Schedule.objects.filter(
+                        record__in=[task.record for task in problem.tasks]
+                    ).delete()
+                if check_schedules(schedules):
+                    raise CommandError(
+                        "The term's schedules changed during the search, run it again."
+                    )
+                Schedule.objects.bulk_create(
+                    schedules, batch_size=options["batch_size"]
+                )
+                index_objects(
+                    Schedule.objects.filter(
+                        pk__in=[schedule.pk for schedule in schedules]
+                    )
+                )
+                queue_refresh(record_ids={schedule.record_id for schedule in schedules})
+                touch(Schedule)
+                touch_terms([(options["academic_year"], options["academic_term"])])
+        self.write_report(solution.unplaced, options["report"])
+        self.stdout.write(
+            "%s %d of %d records with %d schedules in %.1f seconds "
+            "(seed %d, %d ejections), %d unplaced."
+            % (
+                "Would place" if options["dry_run"] else "Placed",
+                len(solution.placements),
+                len(problem.tasks),
+                len(schedules),
+                elapsed,
+                solution.seed,
+                solution.ejections,
+                len(solution.unplaced),
+            )
+        )
+
+    def write_report(self, unplaced, path):
+        if not unplaced:
+            return
+        rows = [
+            (
+                record.pk,
+                record.curriculum_course.course.code,
+                record.section.name,
+                record.advisor.user.username,
+            )
+            for record in Record.objects.filter(pk__in=unplaced)
+            .select_related("curriculum_course__course", "section", "advisor__user")
+            .order_by("pk")
+        ]
+        if path:
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(["record", "course", "section", "professor"])
+                writer.writerows(rows)
+            return
+        for record, course, section, professor in rows:
+            self.stderr.write(
+                "record #%s: %s %s of %s was not placed."
+                % (record, course, section, professor)
+            )
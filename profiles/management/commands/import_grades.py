@@ -0,0 +1,76 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from profiles.database import atomic_write
+from profiles.grading import REMARK_GRADES, apply_grades
+from profiles.management.commands.import_schedules import read_rows
+from profiles.models import Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Grade student records from a CSV, JSON or JSON lines file. Each row "
+        "needs record (id), student_username and grade, which is a rating "
+        "from 1 to 100, DRP, INC or blank, or the rating and remark columns "
+        "of a grades export. Remarks are derived from the ratings. Nothing "
+        "is written if any row is invalid."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Check the grades without writing them.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            rows = list(enumerate(read_rows(options["path"]), start=1))
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        students = dict(
+            Student.objects.filter(
+                user__username__in={
+                    str(row.get("student_username", "")) for line, row in rows
+                }
+            ).values_list("user__username", "pk")
+        )
+        grades = {}
+        problems = []
+        for line, row in rows:
+            student = students.get(str(row.get("student_username", "")))
+            record = str(row.get("record", ""))
+            if student is None or not record.isdigit():
+                problems.append("line %s: unknown record or student." % line)
+            elif (int(record), student) in grades:
+                problems.append("line %s: the student is graded twice." % line)
+            else:
+                grades[(int(record), student)] = self.grade_of(row)
+        try:
+            with atomic_write():
+                changed = apply_grades(grades, batch_size=options["batch_size"])
+                if options["dry_run"] or problems:
+                    transaction.set_rollback(True)
+        except ValidationError as error:
+            problems.extend(error.messages)
+        if problems:
+            for problem in problems:
+                self.stderr.write(problem)
+            raise CommandError("No grades were saved, %d problems." % len(problems))
+        self.stdout.write(
+            "%s %d of %d grades."
+            % (
+                "Would change" if options["dry_run"] else "Changed",
+                len(changed),
+                len(grades),
+            )
+        )
+
+    def grade_of(self, row):
+        if "grade" in row:
+            return row["grade"]
+        if row.get("remark") in REMARK_GRADES:
+            return row["remark"]
+        return row.get("rating")
@@ -0,0 +1,278 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils.dateparse import parse_time
+from profiles.bitmaps import SLOT_MINUTES, on_slot_boundary
+from profiles.conflicts import (
+    check_schedules,
+    existing_schedules,
+    resources_of,
+    term_of,
+)
+from profiles.database import atomic_write
+from profiles.models import Professor, Record, Room, Schedule
+from profiles.occupancy import touch_terms
+from profiles.search import index_objects
+from profiles.student_timetables import deferred_refresh, queue_refresh
+from profiles.versions import touch
+
+
+def read_rows(path):
+    with open(path, newline="") as file:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(file)
+            return
+        first = file.read(1)
+        while first.isspace():
+            first = file.read(1)
+        file.seek(0)
+        if first == "[":
+            yield from json.load(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_batches(path, batch_size):
+    """The (line, row) pairs of the file at ``path``, ``batch_size`` at a time."""
+    rows = enumerate(read_rows(path), start=1)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def resource_keys(schedule):
+    term = term_of(schedule)
+    return [(term, schedule.day, *resource) for resource in resources_of(schedule)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Import schedules from a CSV, JSON or JSON lines file. Each row needs "
+        "academic_year, academic_term, course (code), section (name), room "
+        "(number), professor (username), day, start_time and end_time, and "
+        "optionally curriculum (title). Conflicting rows are reported instead "
+        "of imported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--report", help="Write the conflict report to this CSV file."
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Check the rows without writing any schedule.",
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        self.terms = set()
+        self.records = {}
+        self.rooms = {}
+        self.professors = {}
+        self.problems = []
+        # The line of each accepted schedule not saved yet, and for a dry
+        # run, which saves none, the accepted schedules by the resources
+        # they take, so that later batches are checked against them.
+        self.unsaved = {}
+        self.pending = defaultdict(list)
+        batches = read_batches(options["path"], options["batch_size"])
+        total = imported = 0
+        with atomic_write(), deferred_refresh():
+            while True:
+                try:
+                    batch = next(batches, None)
+                except (OSError, ValueError) as error:
+                    raise CommandError(error)
+                if batch is None:
+                    break
+                total += len(batch)
+                imported += self.import_batch(batch)
+            if imported and not self.dry_run:
+                touch(Schedule)
+        self.write_report(self.problems, options["report"])
+        self.stdout.write(
+            "%s %d of %d schedules, %d rejected."
+            % (
+                "Would import" if self.dry_run else "Imported",
+                imported,
+                total,
+                total - imported,
+            )
+        )
+
+    def import_batch(self, batch):
+        """Import the (line, row) pairs of ``batch`` and return how many."""
+        self.fetch_lookups(batch)
+        lines = []
+        schedules = []
+        for line, row in batch:
+            try:
+                schedule = self.build_schedule(
+                    row, self.records, self.rooms, self.professors
+                )
+            except ValueError as error:
+                self.problems.append((line, "invalid", str(error)))
+                continue
+            lines.append(line)
+            schedules.append(schedule)
+        if not schedules:
+            return 0
+
+        existing = list(existing_schedules(schedules))
+        if self.dry_run:
+            existing += self.pending_overlaps(schedules)
+        conflicts = {}
+        for conflict in check_schedules(schedules, existing):
+            conflicts.setdefault(id(conflict.schedule), []).append(conflict)
+        accepted = []
+        for line, schedule in zip(lines, schedules):
+            blocking = [
+                conflict
+                for conflict in conflicts.get(id(schedule), [])
+                if conflict.other.pk or id(conflict.other) in self.unsaved
+            ]
+            if blocking:
+                for conflict in blocking:
+                    other = (
+                        "schedule #%s" % conflict.other.pk
+                        if conflict.other.pk
+                        else "line %s" % self.unsaved[id(conflict.other)]
+                    )
+                    self.problems.append(
+                        (
+                            line,
+                            conflict.kind,
+                            "%s conflict with %s" % (conflict.kind, other),
+                        )
+                    )
+                continue
+            accepted.append(schedule)
+            self.unsaved[id(schedule)] = line
+
+        if self.dry_run:
+            for schedule in accepted:
+                for key in resource_keys(schedule):
+                    self.pending[key].append(schedule)
+        elif accepted:
+            Schedule.objects.bulk_create(accepted)
+            index_objects(
+                Schedule.objects.filter(pk__in=[schedule.pk for schedule in accepted])
+            )
+            queue_refresh(record_ids={schedule.record_id for schedule in accepted})
+            touch_terms({term_of(schedule) for schedule in accepted})
+            self.unsaved.clear()
+        return len(accepted)
+
+    def pending_overlaps(self, schedules):
+        """The accepted schedules of earlier batches that share a resource."""
+        found = {}
+        for schedule in schedules:
+            for key in resource_keys(schedule):
+                for other in self.pending.get(key, ()):
+                    found[id(other)] = other
+        return list(found.values())
+
+    def fetch_lookups(self, batch):
+        """Load the records, rooms and professors of ``batch`` not seen yet."""
+        terms = {
+            (str(row.get("academic_year")), str(row.get("academic_term")))
+            for line, row in batch
+        } - self.terms
+        self.terms |= terms
+        query = Q()
+        for academic_year, academic_term in terms:
+            if academic_year.isdigit() and academic_term.isdigit():
+                query |= Q(academic_year=academic_year, academic_term=academic_term)
+        if query:
+            for record in Record.objects.filter(query).select_related(
+                "curriculum_course__course", "curriculum_course__curriculum", "section"
+            ):
+                key = (
+                    str(record.academic_year),
+                    str(record.academic_term),
+                    record.curriculum_course.course.code,
+                    record.section.name,
+                )
+                self.records.setdefault(key, []).append(record)
+        rooms = {str(row.get("room", "")) for line, row in batch} - set(self.rooms)
+        if rooms:
+            self.rooms.update(Room.objects.in_bulk(rooms, field_name="number"))
+        usernames = {str(row.get("professor", "")) for line, row in batch} - set(
+            self.professors
+        )
+        if usernames:
+            for professor in Professor.objects.filter(
+                user__username__in=usernames
+            ).select_related("user"):
+                self.professors[professor.user.username] = professor
+
+    def build_schedule(self, row, records, rooms, professors):
+        key = (
+            str(row.get("academic_year")),
+            str(row.get("academic_term")),
+            str(row.get("course", "")),
+            str(row.get("section", "")),
+        )
+        matches = records.get(key, [])
+        if row.get("curriculum"):
+            matches = [
+                record
+                for record in matches
+                if record.curriculum_course.curriculum.title == row["curriculum"]
+            ]
+        if not matches:
+            raise ValueError("No record matches %s." % " ".join(key))
+        if len(matches) > 1:
+            raise ValueError(
+                "Several records match %s, give the curriculum." % " ".join(key)
+            )
+        room = rooms.get(str(row.get("room", "")))
+        if room is None:
+            raise ValueError("Unknown room %r." % row.get("room"))
+        professor = professors.get(str(row.get("professor", "")))
+        if professor is None:
+            raise ValueError("Unknown professor %r." % row.get("professor"))
+        days = {str(label).lower(): value for value, label in Schedule.DAYS}
+        day = str(row.get("day", "")).strip().lower()
+        day = int(day) if day.isdigit() else days.get(day)
+        if day not in days.values():
+            raise ValueError("Unknown day %r." % row.get("day"))
+        start_time = parse_time(str(row.get("start_time", "")))
+        end_time = parse_time(str(row.get("end_time", "")))
+        if start_time is None or end_time is None or start_time >= end_time:
+            raise ValueError("Invalid time frame.")
+        if not (on_slot_boundary(start_time) and on_slot_boundary(end_time)):
+            raise ValueError(
+                "Times must be on a multiple of %d minutes." % SLOT_MINUTES
+            )
+        return Schedule(
+            record=matches[0],
+            room=room,
+            professor=professor,
+            day=day,
+            start_time=start_time,
+            end_time=end_time,
+        )
+
+    def write_report(self, problems, path):
+        if not problems:
+            return
+        problems.sort()
+        if path:
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(["line", "kind", "message"])
+                writer.writerows(problems)
+            return
+        for line, kind, message in problems:
+            self.stderr.write("line %s: %s" % (line, message))
@@ -0,0 +1,94 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from profiles.benchmarks import summarize
+from profiles.database import database_metrics, reset_metrics
+from profiles.enrollment import enroll
+from profiles.models import Record, Student, StudentRecord
+
+
+class Command(BaseCommand):
+    help = (
+        "Enroll many students into the same records concurrently through the "
+        "enrollment service and report latency percentiles. Runs against the "
+        "configured database, so point it at a disposable SQLite or "
+        "PostgreSQL database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "records", nargs="+", type=int, help="Record ids every student requests."
+        )
+        parser.add_argument(
+            "--students",
+            type=int,
+            default=500,
+            help="Number of students that try to enroll.",
+        )
+        parser.add_argument("--concurrency", type=int, default=500)
+        parser.add_argument(
+            "--cleanup",
+            action="store_true",
+            help="Remove the created student records afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        record_ids = options["records"]
+        if Record.objects.filter(pk__in=record_ids).count() != len(set(record_ids)):
+            raise CommandError("Some of the given records do not exist.")
+        students = list(
+            Student.objects.exclude(studentrecord__record__in=record_ids).order_by(
+                "pk"
+            )[: options["students"]]
+        )
+        if not students:
+            raise CommandError("No students left to enroll into these records.")
+
+        def attempt(student):
+            started = time.perf_counter()
+            try:
+                enroll(student, record_ids)
+                outcome = "enrolled"
+            except ValidationError as error:
+                outcome = error.error_list[0].code or "rejected"
+            except OperationalError:
+                outcome = "database error"
+            finally:
+                connection.close()
+            return outcome, time.perf_counter() - started
+
+        reset_metrics()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results = list(executor.map(attempt, students))
+        elapsed = time.perf_counter() - started
+
+        outcomes = {}
+        for outcome, latency in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies = [latency * 1000 for outcome, latency in results]
+        oversold = [
+            record.pk
+            for record in Record.objects.filter(pk__in=record_ids)
+            if record.capacity is not None
+            and StudentRecord.objects.filter(record=record).count() > record.capacity
+        ]
+        report = {
+            "requests": len(results),
+            "concurrency": options["concurrency"],
+            "database": connection.vendor,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(len(results) / elapsed, 1),
+            "outcomes": outcomes,
+            "latency": summarize(latencies),
+            "oversold_records": oversold,
+            "database_metrics": database_metrics(),
+        }
+        if options["cleanup"]:
+            StudentRecord.objects.filter(
+                record__in=record_ids, student__in=students
+            ).delete()
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from profiles.database import atomic_write
+from profiles.search import SEARCH_FIELDS, index_objects
+
+
+class Command(BaseCommand):
+    help = "Rebuild the admin search index of records, schedules and student records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        for model in SEARCH_FIELDS:
+            with atomic_write():
+                count = index_objects(
+                    model.objects.order_by("pk"), batch_size=options["batch_size"]
+                )
+            self.stdout.write(
+                "Indexed %d %s." % (count, model._meta.verbose_name_plural)
+            )
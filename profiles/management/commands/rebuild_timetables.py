@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from profiles.database import atomic_write
+from profiles.student_timetables import refresh_timetables
+
+
+class Command(BaseCommand):
+    help = "Rebuild the weekly timetables of every student, or of the given ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("students", nargs="*", type=int)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with atomic_write():
+            count = refresh_timetables(
+                options["students"] or None, batch_size=options["batch_size"]
+            )
+        self.stdout.write("Rebuilt %d timetables." % count)
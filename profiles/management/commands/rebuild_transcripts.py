@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from profiles.database import atomic_write
+from profiles.transcripts import refresh_transcripts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the transcript summary of every student, or of the given ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("students", nargs="*", type=int)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with atomic_write():
+            count = refresh_transcripts(
+                options["students"] or None, batch_size=options["batch_size"]
+            )
+        self.stdout.write("Rebuilt %d transcripts." % count)
@@ -0,0 +1,137 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from profiles.catalog import get_catalog
+from profiles.management.commands.import_schedules import read_rows
+from profiles.models import Course, CurriculumCourse, Professor, Room, Section
+from profiles.rollover import plan_rollover, roll_over
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the records of a term, with their schedules, into another term. "
+        "Records the target term already has are skipped, and so are records "
+        "whose schedules conflict with it. Advisors and professors can be "
+        "replaced with a CSV, JSON or JSON lines file of professor and "
+        "replacement usernames."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source_year", type=int)
+        parser.add_argument("source_term", type=int)
+        parser.add_argument("target_year", type=int)
+        parser.add_argument("target_term", type=int)
+        parser.add_argument("--advisors", help="File of advisor replacements.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print what would change without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        source = (options["source_year"], options["source_term"])
+        target = (options["target_year"], options["target_term"])
+        if source == target:
+            raise CommandError("The source and target terms are the same.")
+        advisors = self.read_advisors(options["advisors"])
+        started = time.perf_counter()
+        if options["dry_run"]:
+            rollover = plan_rollover(source, target, advisors)
+        else:
+            rollover = roll_over(
+                source, target, advisors, batch_size=options["batch_size"]
+            )
+        elapsed = time.perf_counter() - started
+        if options["dry_run"]:
+            self.write_diff(rollover.changes)
+        else:
+            for line in self.diff_lines(rollover.changes):
+                if line.startswith("!"):
+                    self.stderr.write(line)
+        counts = {"create": 0, "exists": 0, "conflict": 0}
+        for change in rollover.changes:
+            counts[change.action] += 1
+        self.stdout.write(
+            "%s %d records with %d schedules in %.1f seconds, %d already in the "
+            "target term, %d conflicting."
+            % (
+                "Would create" if options["dry_run"] else "Created",
+                counts["create"],
+                len(rollover.schedules),
+                elapsed,
+                counts["exists"],
+                counts["conflict"],
+            )
+        )
+
+    def read_advisors(self, path):
+        if not path:
+            return {}
+        try:
+            rows = [
+                (str(row.get("professor", "")), str(row.get("replacement", "")))
+                for row in read_rows(path)
+            ]
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        professors = dict(
+            Professor.objects.filter(
+                user__username__in={name for row in rows for name in row}
+            ).values_list("user__username", "pk")
+        )
+        advisors = {}
+        for professor, replacement in rows:
+            if professor not in professors or replacement not in professors:
+                raise CommandError(
+                    "Unknown professor %r or %r." % (professor, replacement)
+                )
+            advisors[professors[professor]] = professors[replacement]
+        return advisors
+
+    def diff_lines(self, changes):
+        courses = get_catalog(Course)
+        curriculum_courses = get_catalog(CurriculumCourse)
+        sections = get_catalog(Section)
+        rooms = get_catalog(Room)
+        usernames = dict(
+            Professor.objects.filter(
+                pk__in={
+                    professor
+                    for change in changes
+                    if change.record is not None
+                    for professor in [
+                        change.record.advisor_id,
+                        *[schedule.professor_id for schedule in change.schedules],
+                    ]
+                }
+            ).values_list("pk", "user__username")
+        )
+        for change in changes:
+            if change.record is None:
+                yield "= record #%d already in the target term" % change.source
+                continue
+            record = change.record
+            course = courses[
+                curriculum_courses[record.curriculum_course_id]["course_id"]
+            ]
+            yield "%s record #%d %s %s, advisor %s%s" % (
+                "+" if change.action == "create" else "!",
+                change.source,
+                course["code"],
+                sections[record.section_id]["name"],
+                usernames.get(record.advisor_id),
+                ", %s conflict" % change.detail if change.action == "conflict" else "",
+            )
+            for schedule in change.schedules:
+                yield "    %s day %d %s-%s, room %s, professor %s" % (
+                    "+" if change.action == "create" else "!",
+                    schedule.day,
+                    schedule.start_time.isoformat("minutes"),
+                    schedule.end_time.isoformat("minutes"),
+                    rooms[schedule.room_id]["number"],
+                    usernames.get(schedule.professor_id),
+                )
+
+    def write_diff(self, changes):
+        for line in self.diff_lines(changes):
+            self.stdout.write(line)
@@ -0,0 +1,152 @@
+import json
+import time
+import django
+from django.contrib.auth import authenticate
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import CustomUser
+from profiles.benchmarks import summarize
+from profiles.conflicts import check_schedules
+from profiles.enrollment import enroll
+from profiles.models import (
+    Professor,
+    Student,
+    CurriculumCourse,
+    Schedule,
+    Record,
+    StudentRecord,
+)
+
+CHANGELISTS = (Professor, Student, CurriculumCourse, Schedule, Record, StudentRecord)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time admin changelists, authentication, schedule conflict checks and "
+        "enrollment against the current database and print latency "
+        "percentiles and query counts as JSON. Every change is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=50)
+        parser.add_argument(
+            "--password",
+            default="enrollment",
+            help="Password of the seeded accounts.",
+        )
+        parser.add_argument("--output", help="Write the report to this file.")
+
+    def handle(self, *args, **options):
+        if not Schedule.objects.exists() or not Student.objects.exists():
+            raise CommandError("Seed the database first, see seed_university.")
+        self.runs = options["runs"]
+        with transaction.atomic():
+            results = {}
+            results.update(self.changelists())
+            results.update(self.authentication(options["password"]))
+            results["schedule_conflict_check"] = self.conflict_checks()
+            results["enrollment"] = self.enrollments()
+            transaction.set_rollback(True)
+        report = {
+            "timestamp": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "django": django.get_version(),
+            "dataset": {
+                model._meta.model_name: model.objects.count() for model in CHANGELISTS
+            },
+            "benchmarks": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        self.stdout.write(output)
+
+    def measure(self, function, arguments):
+        latencies = []
+        queries = []
+        for argument in arguments:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                function(argument)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+        return summarize(latencies, queries)
+
+    def changelists(self):
+        admin = CustomUser.objects.create_superuser(
+            username="benchmark-admin",
+            email="benchmark-admin@example.com",
+            contact_number="benchmark-admin",
+        )
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(admin)
+        results = {}
+        for model in CHANGELISTS:
+            url = reverse("admin:profiles_%s_changelist" % model._meta.model_name)
+
+            def get(argument):
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError("%s returned %d" % (url, response.status_code))
+
+            results["changelist_%s" % model._meta.model_name] = self.measure(
+                get, range(self.runs)
+            )
+        return results
+
+    def authentication(self, password):
+        usernames = list(
+            Student.objects.order_by("?").values_list("user__username", flat=True)[
+                : self.runs
+            ]
+        )
+        return {
+            "login_username": self.measure(
+                lambda username: authenticate(username=username, password=password),
+                usernames,
+            ),
+            "login_unknown_user": self.measure(
+                lambda username: authenticate(
+                    username="unknown-%s" % username, password=password
+                ),
+                usernames,
+            ),
+        }
+
+    def conflict_checks(self):
+        schedules = list(
+            Schedule.objects.select_related("record").order_by("?")[: self.runs]
+        )
+        for schedule in schedules:
+            schedule.pk = None
+        return self.measure(lambda schedule: check_schedules([schedule]), schedules)
+
+    def enrollments(self):
+        records = list(
+            Record.objects.filter(
+                Q(capacity__isnull=True) | Q(enrolled_count__lt=F("capacity"))
+            ).order_by("?")[: self.runs]
+        )
+        students = list(Student.objects.order_by("?")[: len(records)])
+        pairs = [
+            (student, record)
+            for student, record in zip(students, records)
+            if not StudentRecord.objects.filter(student=student, record=record).exists()
+        ]
+
+        def attempt(pair):
+            with transaction.atomic():
+                try:
+                    enroll(pair[0], [pair[1].pk])
+                except ValidationError:
+                    pass
+                transaction.set_rollback(True)
+
+        return self.measure(attempt, pairs)
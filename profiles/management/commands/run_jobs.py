@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from profiles.jobs import work
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the queued background jobs, several at a time in a pool of "
+        "worker processes. Keeps polling for new jobs unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "JOBS_CONCURRENCY", 2),
+            help="Jobs run at once; 1 runs them in this process.",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=getattr(settings, "JOBS_POLL_INTERVAL", 1.0),
+            help="Seconds between looks at an empty queue.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Stop once the queue is empty."
+        )
+
+    def handle(self, *args, **options):
+        work(
+            concurrency=max(1, options["concurrency"]),
+            once=options["once"],
+            poll=options["poll"],
+            log=self.stdout.write,
+        )
@@ -0,0 +1,364 @@
+import random
+from datetime import time
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import CustomUser
+from profiles.models import (
+    Professor,
+    Student,
+    Department,
+    Program,
+    Course,
+    Curriculum,
+    CurriculumCourse,
+    Section,
+    Room,
+    Schedule,
+    Record,
+    StudentRecord,
+)
+from profiles.search import SEARCH_FIELDS, index_objects
+from profiles.student_timetables import refresh_timetables
+from profiles.transcripts import refresh_transcripts
+from profiles.versions import VERSIONED_MODELS, touch
+
+DEPARTMENTS = [
+    "Engineering",
+    "Computer Studies",
+    "Business and Accountancy",
+    "Education",
+    "Arts and Sciences",
+    "Nursing",
+    "Architecture",
+    "Agriculture",
+]
+DAY_PAIRS = [(1, 4), (2, 5), (3, 6)]
+# Eight 90 minute blocks from 7:00 to 19:00.
+BLOCKS = [
+    (time(*divmod(420 + 90 * block, 60)), time(*divmod(510 + 90 * block, 60)))
+    for block in range(8)
+]
+YEAR_LEVELS = 4
+TERMS = (1, 2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty database with a synthetic university: departments, "
+        "programs, curricula with a prerequisite DAG, rooms, block sections, "
+        "professors, students and several years of records, conflict-free "
+        "schedules and graded student records."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--departments", type=int, default=6)
+        parser.add_argument("--programs", type=int, default=4, help="Per department.")
+        parser.add_argument(
+            "--courses", type=int, default=6, help="Per curriculum year and term."
+        )
+        parser.add_argument("--blocks", type=int, default=2, help="Per year level.")
+        parser.add_argument("--professors", type=int, default=600)
+        parser.add_argument("--students", type=int, default=20000)
+        parser.add_argument("--rooms", type=int, default=200)
+        parser.add_argument("--years", type=int, default=4)
+        parser.add_argument("--current-year", type=int, default=2025)
+        parser.add_argument("--capacity", type=int, default=60)
+        parser.add_argument("--password", default="enrollment")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--search-index",
+            action="store_true",
+            help="Also build the admin search index, which is slow for big seeds.",
+        )
+
+    def handle(self, *args, **options):
+        if Department.objects.exists():
+            raise CommandError("The database already has data, use an empty one.")
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.password = make_password(options["password"])
+        with transaction.atomic():
+            curricula = self.create_catalog(options)
+            professors = self.create_professors(options)
+            rooms = Room.objects.bulk_create(
+                [
+                    Room(
+                        number="RM-%04d" % index,
+                        building="Building %s" % chr(ord("A") + index // 25),
+                        capacity=(40, 60, 80)[index % 3],
+                    )
+                    for index in range(options["rooms"])
+                ]
+            )
+            records = self.create_records(curricula, professors, rooms, options)
+            self.create_students(curricula, records, options)
+            refresh_transcripts(batch_size=self.batch_size)
+            self.stdout.write("Built transcripts.")
+            refresh_timetables(batch_size=self.batch_size)
+            self.stdout.write("Built timetables.")
+            if options["search_index"]:
+                for model in SEARCH_FIELDS:
+                    index_objects(model.objects.all(), batch_size=self.batch_size)
+                self.stdout.write("Built the search index.")
+            touch(*VERSIONED_MODELS)
+
+    def create_users(self, prefix, count, is_staff):
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(
+                    username="%s%06d" % (prefix, index),
+                    email="%s%06d@example.edu" % (prefix, index),
+                    email_lookup="%s%06d@example.edu" % (prefix, index),
+                    contact_number="%s-%06d" % (prefix, index),
+                    first_name=self.random.choice(
+                        ["Ana", "Ben", "Carla", "Dan", "Eva"]
+                    ),
+                    last_name=self.random.choice(["Cruz", "Reyes", "Santos", "Lim"]),
+                    password=self.password,
+                    is_staff=is_staff,
+                )
+                for index in range(count)
+            ],
+            batch_size=self.batch_size,
+        )
+        return users
+
+    def create_catalog(self, options):
+        departments = Department.objects.bulk_create(
+            [
+                Department(
+                    title=DEPARTMENTS[index % len(DEPARTMENTS)]
+                    + ("" if index < len(DEPARTMENTS) else " %d" % index)
+                )
+                for index in range(options["departments"])
+            ]
+        )
+        programs = Program.objects.bulk_create(
+            [
+                Program(
+                    title="BS %s %d" % (department.title, number + 1),
+                    department=department,
+                )
+                for department in departments
+                for number in range(options["programs"])
+            ]
+        )
+        curricula = []
+        prerequisites = []
+        for number, program in enumerate(programs, start=1):
+            curriculum = Curriculum.objects.create(
+                title="%s Curriculum" % program.title, program=program
+            )
+            layout = {}
+            for year_level in range(1, YEAR_LEVELS + 1):
+                for term in TERMS:
+                    courses = Course.objects.bulk_create(
+                        [
+                            Course(
+                                code="P%03d-%d%d%02d"
+                                % (number, year_level, term, index),
+                                title="%s %d.%d.%d"
+                                % (program.title[:48], year_level, term, index),
+                                units=self.random.choice([2, 3, 3, 3, 4, 5]),
+                            )
+                            for index in range(options["courses"])
+                        ]
+                    )
+                    earlier = [
+                        course for placed in layout.values() for course in placed
+                    ]
+                    for course in courses:
+                        for prerequisite in self.random.sample(
+                            earlier, min(len(earlier), self.random.randint(0, 2))
+                        ):
+                            prerequisites.append(
+                                Course.prerequisites.through(
+                                    from_course_id=course.pk,
+                                    to_course_id=prerequisite.pk,
+                                )
+                            )
+                    layout[(year_level, term)] = courses
+            curriculum_courses = CurriculumCourse.objects.bulk_create(
+                [
+                    CurriculumCourse(
+                        curriculum=curriculum,
+                        course=course,
+                        year_level=year_level,
+                        academic_term=term,
+                    )
+                    for (year_level, term), courses in layout.items()
+                    for course in courses
+                ]
+            )
+            sections = {
+                year_level: Section.objects.bulk_create(
+                    [
+                        Section(
+                            name="P%03d-%d%s" % (number, year_level, chr(65 + block)),
+                            is_open=False,
+                        )
+                        for block in range(options["blocks"])
+                    ]
+                )
+                for year_level in range(1, YEAR_LEVELS + 1)
+            }
+            curricula.append((curriculum, curriculum_courses, sections))
+        Course.prerequisites.through.objects.bulk_create(
+            prerequisites, batch_size=self.batch_size
+        )
+        self.stdout.write(
+            "Created %d departments, %d programs and %d courses."
+            % (len(departments), len(programs), Course.objects.count())
+        )
+        return curricula
+
+    def create_professors(self, options):
+        users = self.create_users("professor", options["professors"], True)
+        return Professor.objects.bulk_create(
+            [
+                Professor(
+                    user=user,
+                    permanent_address="Campus",
+                    current_address="Campus",
+                    emergency_number="000",
+                )
+                for user in users
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def create_records(self, curricula, professors, rooms, options):
+        first_year = options["current_year"] - options["years"] + 1
+        records = []
+        schedules = []
+        for academic_year in range(first_year, options["current_year"] + 1):
+            for term in TERMS:
+                busy = set()
+                for curriculum, curriculum_courses, sections in curricula:
+                    for curriculum_course in curriculum_courses:
+                        if curriculum_course.academic_term != term:
+                            continue
+                        for section in sections[curriculum_course.year_level]:
+                            record = Record(
+                                academic_year=academic_year,
+                                academic_term=term,
+                                curriculum_course=curriculum_course,
+                                section=section,
+                                capacity=options["capacity"],
+                            )
+                            meetings = self.place(record, professors, rooms, busy)
+                            if meetings:
+                                records.append(record)
+                                schedules.extend(meetings)
+        Record.objects.bulk_create(records, batch_size=self.batch_size)
+        Schedule.objects.bulk_create(schedules, batch_size=self.batch_size)
+        self.stdout.write(
+            "Created %d records and %d schedules." % (len(records), len(schedules))
+        )
+        return records
+
+    def place(self, record, professors, rooms, busy):
+        # Two meetings a week in the same 90 minute block, on paired days,
+        # in the first room, professor and block that are all free.
+        patterns = [(days, block) for days in DAY_PAIRS for block in range(len(BLOCKS))]
+        self.random.shuffle(patterns)
+        for attempt in range(3):
+            professor = self.random.choice(professors)
+            for days, block in patterns:
+                keys = [("section", record.section.pk, day, block) for day in days]
+                keys += [("professor", professor.pk, day, block) for day in days]
+                if any(key in busy for key in keys):
+                    continue
+                offset = self.random.randrange(len(rooms))
+                for index in range(len(rooms)):
+                    room = rooms[(offset + index) % len(rooms)]
+                    room_keys = [("room", room.pk, day, block) for day in days]
+                    if any(key in busy for key in room_keys):
+                        continue
+                    busy.update(keys + room_keys)
+                    record.advisor = professor
+                    return [
+                        Schedule(
+                            record=record,
+                            room=room,
+                            professor=professor,
+                            day=day,
+                            start_time=BLOCKS[block][0],
+                            end_time=BLOCKS[block][1],
+                        )
+                        for day in days
+                    ]
+        return []
+
+    def create_students(self, curricula, records, options):
+        first_year = options["current_year"] - options["years"] + 1
+        users = self.create_users("student", options["students"], False)
+        programs = [self.random.choice(curricula) for user in users]
+        students = Student.objects.bulk_create(
+            [
+                Student(
+                    user=user,
+                    gender=self.random.choice("MF"),
+                    permanent_address="Home",
+                    current_address="Dormitory",
+                    emergency_number="000",
+                    curriculum=program[0],
+                )
+                for user, program in zip(users, programs)
+            ],
+            batch_size=self.batch_size,
+        )
+        records_by_section = {}
+        for record in records:
+            records_by_section.setdefault(
+                (record.section.pk, record.academic_year), []
+            ).append(record)
+        student_records = []
+        enrolled = {}
+        for student, program in zip(students, programs):
+            curriculum, curriculum_courses, sections = program
+            entry_year = self.random.randint(
+                first_year - YEAR_LEVELS + 1, options["current_year"]
+            )
+            block = self.random.randrange(options["blocks"])
+            for academic_year in range(
+                max(first_year, entry_year), options["current_year"] + 1
+            ):
+                year_level = academic_year - entry_year + 1
+                if year_level > YEAR_LEVELS:
+                    break
+                section = sections[year_level][block]
+                for record in records_by_section.get((section.pk, academic_year), []):
+                    if enrolled.get(record.pk, 0) >= options["capacity"]:
+                        continue
+                    enrolled[record.pk] = enrolled.get(record.pk, 0) + 1
+                    rating, remark = self.grade(record, options["current_year"])
+                    student_records.append(
+                        StudentRecord(
+                            record=record, student=student, rating=rating, remark=remark
+                        )
+                    )
+        StudentRecord.objects.bulk_create(student_records, batch_size=self.batch_size)
+        for record in records:
+            record.enrolled_count = enrolled.get(record.pk, 0)
+        Record.objects.bulk_update(
+            records, ["enrolled_count"], batch_size=self.batch_size
+        )
+        self.stdout.write(
+            "Created %d students and %d student records."
+            % (len(students), len(student_records))
+        )
+
+    def grade(self, record, current_year):
+        if record.academic_year == current_year and record.academic_term == TERMS[-1]:
+            return None, None
+        draw = self.random.random()
+        if draw < 0.04:
+            return 0, "DRP"
+        if draw < 0.07:
+            return 0, "INC"
+        if draw < 0.15:
+            return self.random.randint(60, 74), "FLD"
+        return self.random.randint(75, 99), "PSD"
@@ -1,18 +1,78 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from accounts.models import CustomUser
+from enrollment_system.profiling import timed
+from profiles.bitmaps import SLOT_MINUTES, on_slot_boundary
 from profiles.validators import validate_professor, validate_student
 
 
+class TrackedFieldsMixin:
+    """
+    Remember the values of ``tracked_fields``, attribute names, that a row
+    was loaded or last saved with, so that signals can tell what a save
+    changes without querying for the saved row.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = {
+            name: value
+            for name, value in zip(field_names, values)
+            if name in cls.tracked_fields
+        }
+        return instance
+
+    def saved_value(self, name):
+        """The saved value of the tracked field ``name``, None for a new row."""
+        return getattr(self, "_saved_values", {}).get(name)
+
+    def changed_fields(self, update_fields=None):
+        """
+        The tracked fields whose value differs from the saved one, out of
+        ``update_fields`` when those are given.
+        """
+        return {
+            name
+            for name in self.tracked_fields
+            if getattr(self, name) != self.saved_value(name)
+            and (
+                update_fields is None
+                or self._meta.get_field(name.removesuffix("_id")).name in update_fields
+            )
+        }
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and not hasattr(self, "_saved_values"):
+            # Built by hand rather than loaded, so only the database knows.
+            self._saved_values = (
+                type(self)
+                ._default_manager.filter(pk=self.pk)
+                .values(*self.tracked_fields)
+                .first()
+                or {}
+            )
+        elif not hasattr(self, "_saved_values"):
+            self._saved_values = {}
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        for name in self.tracked_fields:
+            field = self._meta.get_field(name.removesuffix("_id"))
+            if update_fields is None or field.name in update_fields:
+                self._saved_values[name] = getattr(self, name)
+
+
 # Create your models here.
 class Professor(models.Model):
     user = models.OneToOneField(
         CustomUser,
         on_delete=models.CASCADE,
         primary_key=True,
-        validators=[validate_professor],
     )
     title_prefix = models.CharField(_("title prefix"), max_length=8, blank=True)
     title_suffix = models.CharField(_("title suffix"), max_length=16, blank=True)
@@ -30,13 +90,18 @@ class Professor(models.Model):
             ]
         )
 
+    def clean(self):
+        # The form has already loaded the user, so check its role from the
+        # instance rather than querying for it again.
+        if self.user_id is not None:
+            validate_professor(self.user)
+
 
 class Student(models.Model):
     user = models.OneToOneField(
         CustomUser,
         on_delete=models.CASCADE,
         primary_key=True,
-        validators=[validate_student],
     )
     GENDER_CHOICES = [("M", _("Male")), ("F", _("Female"))]
     gender = models.CharField(_("gender"), max_length=1, choices=GENDER_CHOICES)
@@ -55,6 +120,9 @@ class Student(models.Model):
     permanent_address = models.CharField(_("permanent address"), max_length=128)
     current_address = models.CharField(_("current address"), max_length=128)
     emergency_number = models.CharField(_("emergency contact number"), max_length=16)
+    curriculum = models.ForeignKey(
+        "Curriculum", on_delete=models.SET_NULL, blank=True, null=True
+    )
 
     def __str__(self):
         return " ".join(
@@ -66,6 +134,10 @@ class Student(models.Model):
             ]
         )
 
+    def clean(self):
+        if self.user_id is not None:
+            validate_student(self.user)
+
 
 class Department(models.Model):
     title = models.CharField(_("college department"), max_length=64, unique=True)
@@ -82,12 +154,13 @@ class Program(models.Model):
         return self.title
 
 
-class Course(models.Model):
+class Course(TrackedFieldsMixin, models.Model):
     code = models.CharField(_("course code"), max_length=16, unique=True)
     title = models.CharField(_("course title"), max_length=64, unique=True)
     units = models.FloatField()
     corequisites = models.ManyToManyField("self", symmetrical=True, blank=True)
     prerequisites = models.ManyToManyField("self", symmetrical=False, blank=True)
+    tracked_fields = ("units",)
 
     def __str__(self):
         return self.title
@@ -97,6 +170,9 @@ class Curriculum(models.Model):
     title = models.CharField(_("curriculum title"), max_length=128, unique=True)
     program = models.ForeignKey(Program, on_delete=models.CASCADE)
     courses = models.ManyToManyField(Course, "CurriculumCourse")
+    # Bumped whenever the courses of the curriculum or their units change,
+    # so that cached degree audit plans can tell they are stale.
+    version = models.PositiveIntegerField(_("version"), default=1, editable=False)
 
     def __str__(self):
         return self.title
@@ -110,6 +186,12 @@ class CurriculumCourse(models.Model):
                 name="unique curriculum and course combination",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["curriculum", "year_level", "academic_term"],
+                name="curriculum_course_layout_idx",
+            )
+        ]
 
     curriculum = models.ForeignKey(Curriculum, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
@@ -139,12 +221,19 @@ class Section(models.Model):
 
 class Room(models.Model):
     number = models.CharField(_("room number"), max_length=16, unique=True)
+    building = models.CharField(_("building"), max_length=64, blank=True)
+    capacity = models.PositiveIntegerField(
+        _("seating capacity"),
+        blank=True,
+        null=True,
+        help_text=_("Leave blank if unknown."),
+    )
 
     def __str__(self):
         return self.number
 
 
-class Record(models.Model):
+class Record(TrackedFieldsMixin, models.Model):
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -157,6 +246,18 @@ class Record(models.Model):
                 name="unique academic year, academic term, curriculum course, and block section combination",
             )
         ]
+        # Filters on (academic_year, academic_term) use the unique constraint
+        # above, which starts with both columns.
+        indexes = [
+            models.Index(
+                fields=["section", "academic_year", "academic_term"],
+                name="record_section_term_idx",
+            ),
+            models.Index(
+                fields=["advisor", "academic_year", "academic_term"],
+                name="record_advisor_term_idx",
+            ),
+        ]
 
     academic_year = models.IntegerField(_("academic year"))
     academic_term = models.IntegerField(
@@ -165,8 +266,19 @@ class Record(models.Model):
     curriculum_course = models.ForeignKey(CurriculumCourse, on_delete=models.CASCADE)
     advisor = models.ForeignKey(Professor, on_delete=models.CASCADE)
     section = models.ForeignKey(Section, on_delete=models.CASCADE)
+    capacity = models.PositiveIntegerField(
+        _("capacity"),
+        blank=True,
+        null=True,
+        help_text=_("Leave blank for no enrollment limit."),
+    )
+    enrolled_count = models.PositiveIntegerField(
+        _("enrolled students"), default=0, editable=False
+    )
     schedules = models.ManyToManyField(Room, "Schedule", blank=True)
     students = models.ManyToManyField(Student, "StudentRecord", blank=True)
+    # What places the record's schedules in the room occupancy grids.
+    tracked_fields = ("academic_year", "academic_term", "curriculum_course_id")
 
     def __str__(self):
         return " | ".join(
@@ -178,7 +290,7 @@ class Record(models.Model):
         )
 
 
-class Schedule(models.Model):
+class Schedule(TrackedFieldsMixin, models.Model):
     class Meta:
         constraints = [
             models.CheckConstraint(
@@ -186,6 +298,16 @@ class Schedule(models.Model):
                 name="start time before end time",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["room", "day", "start_time", "end_time"],
+                name="schedule_room_time_idx",
+            ),
+            models.Index(
+                fields=["professor", "day", "start_time", "end_time"],
+                name="schedule_professor_time_idx",
+            ),
+        ]
 
     record = models.ForeignKey(Record, on_delete=models.CASCADE)
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
@@ -202,6 +324,7 @@ class Schedule(models.Model):
     day = models.IntegerField(_("day"), choices=DAYS)
     start_time = models.TimeField()
     end_time = models.TimeField()
+    tracked_fields = ("record_id",)
 
     def __str__(self):
         return "%s | %s | %s - %s" % (
@@ -211,58 +334,69 @@ class Schedule(models.Model):
             self.end_time,
         )
 
+    def validation_state(self):
+        return (
+            self.record_id,
+            self.room_id,
+            self.professor_id,
+            self.day,
+            self.start_time,
+            self.end_time,
+        )
+
+    @timed("schedule.clean")
     def clean(self):
-        try:
-            self.room
-            self.professor
-            self.day
-            self.start_time
-            self.end_time
-        except:
+        from profiles.conflicts import check_schedules
+
+        if None in self.validation_state():
             return
-        overlapping_room_schedules = Schedule.objects.filter(
-            room=self.room,
-            day=self.day,
-            start_time__lt=self.end_time,
-            end_time__gt=self.start_time,
-        )
-        overlapping_professor_schedules = Schedule.objects.filter(
-            professor=self.professor,
-            day=self.day,
-            start_time__lt=self.end_time,
-            end_time__gt=self.start_time,
-        )
-        if self.pk:
-            overlapping_room_schedules = overlapping_room_schedules.exclude(pk=self.pk)
-            overlapping_professor_schedules = overlapping_professor_schedules.exclude(
-                pk=self.pk
-            )
-        if (
-            overlapping_room_schedules.exists()
-            and overlapping_professor_schedules.exists()
-        ):
+        if self.start_time >= self.end_time:
+            return
+        if not (on_slot_boundary(self.start_time) and on_slot_boundary(self.end_time)):
             raise ValidationError(
+                _(
+                    "Schedules must start and end on a multiple of %(minutes)s "
+                    "minutes."
+                ),
+                code="slot",
+                params={"minutes": SLOT_MINUTES},
+            )
+        kinds = {conflict.kind for conflict in check_schedules([self])}
+        self._validated_state = self.validation_state()
+        errors = []
+        if "room" in kinds and "professor" in kinds:
+            errors.append(
                 _(
                     "The chosen time frame conflicts with an existing room and professor schedule."
                 )
             )
-        if overlapping_room_schedules.exists():
-            raise ValidationError(
+        elif "room" in kinds:
+            errors.append(
                 _("The chosen time frame conflicts with an existing room schedule.")
             )
-        if overlapping_professor_schedules.exists():
-            raise ValidationError(
+        elif "professor" in kinds:
+            errors.append(
                 _(
                     "The chosen time frame conflicts with an existing professor schedule."
                 )
             )
+        if "section" in kinds:
+            errors.append(
+                _("The chosen time frame conflicts with an existing section schedule.")
+            )
+        if errors:
+            self._validated_state = None
+            raise ValidationError(errors)
 
+    @timed("schedule.save")
     def save(self, *args, **kwargs):
-        self.clean()
+        # Skip the conflict check if clean() already passed for this state.
+        if getattr(self, "_validated_state", None) != self.validation_state():
+            self.clean()
         super().save(*args, **kwargs)
 
 
-class StudentRecord(models.Model):
+class StudentRecord(TrackedFieldsMixin, models.Model):
     class Meta:
         constraints = [
             models.CheckConstraint(
@@ -278,6 +412,15 @@ class StudentRecord(models.Model):
                 | models.Q(rating__isnull=True, remark__isnull=True),
                 name="rating match with remark",
             ),
+            models.UniqueConstraint(
+                fields=["record", "student"],
+                name="unique record and student combination",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["student", "record"], name="student_record_student_idx"
+            )
         ]
 
     record = models.ForeignKey(Record, on_delete=models.CASCADE)
@@ -292,6 +435,143 @@ class StudentRecord(models.Model):
     remark = models.CharField(
         _("remark"), max_length=3, blank=True, null=True, choices=REMARKS
     )
+    tracked_fields = ("record_id", "student_id", "rating", "remark")
+
+    def __str__(self):
+        return self.student.__str__()
+
+    def takes_seat(self):
+        """Whether saving the row enrolls the student into its record."""
+        return self.record_id is not None and (
+            self.record_id != self.saved_value("record_id")
+        )
+
+    def clean(self):
+        # Checked again when the seat is taken, as a concurrent enrollment
+        # may take the last one in between.
+        if (
+            self.takes_seat()
+            and Record.objects.filter(
+                pk=self.record_id, enrolled_count__gte=models.F("capacity")
+            ).exists()
+        ):
+            raise ValidationError(
+                _("Record %(record)s is already full."),
+                code="full",
+                params={"record": self.record_id},
+            )
+
+    def save(self, *args, **kwargs):
+        # The signal that counts the enrollment raises when the record is
+        # full, which must undo the save.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class Transcript(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-weighted_rating", "-units_earned"],
+                name="transcript_ranking_idx",
+            )
+        ]
+
+    student = models.OneToOneField(
+        Student, on_delete=models.CASCADE, primary_key=True, related_name="transcript"
+    )
+    units_attempted = models.FloatField(_("units attempted"), default=0)
+    units_earned = models.FloatField(_("units earned"), default=0)
+    weighted_rating = models.FloatField(
+        _("weighted average rating"), blank=True, null=True
+    )
+    passed = models.PositiveIntegerField(_("passed"), default=0)
+    failed = models.PositiveIntegerField(_("failed"), default=0)
+    dropped = models.PositiveIntegerField(_("dropped"), default=0)
+    incomplete = models.PositiveIntegerField(_("incomplete"), default=0)
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
 
     def __str__(self):
         return self.student.__str__()
+
+
+class StudentTimetable(models.Model):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "academic_year", "academic_term"],
+                name="unique student timetable per term",
+            )
+        ]
+
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="timetables"
+    )
+    academic_year = models.IntegerField(_("academic year"))
+    academic_term = models.IntegerField(
+        _("academic term"), choices=CurriculumCourse.ACADEMIC_TERMS
+    )
+    slots = models.BinaryField(_("busy slots"), default=b"")
+    meetings = models.JSONField(_("meetings"), default=list)
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+
+    def __str__(self):
+        return self.student.__str__()
+
+
+class SearchToken(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["model", "token", "object_id"], name="search_token_idx"
+            ),
+            models.Index(fields=["model", "object_id"], name="search_object_idx"),
+        ]
+
+    model = models.CharField(_("model"), max_length=32)
+    object_id = models.BigIntegerField(_("object id"))
+    token = models.CharField(_("token"), max_length=64)
+
+    def __str__(self):
+        return self.token
+
+
+class Job(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_queue_idx"),
+        ]
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUSES = [
+        (QUEUED, _("Queued")),
+        (RUNNING, _("Running")),
+        (SUCCEEDED, _("Succeeded")),
+        (FAILED, _("Failed")),
+    ]
+    name = models.CharField(_("job"), max_length=64)
+    arguments = models.JSONField(_("arguments"), default=dict, blank=True)
+    status = models.CharField(
+        _("status"), max_length=16, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveIntegerField(_("attempts"), default=0)
+    max_attempts = models.PositiveIntegerField(_("maximum attempts"), default=3)
+    progress_done = models.PositiveIntegerField(_("done"), default=0)
+    progress_total = models.PositiveIntegerField(_("total"), blank=True, null=True)
+    result = models.JSONField(_("result"), blank=True, null=True)
+    error = models.TextField(_("error"), blank=True)
+    worker = models.CharField(_("worker"), max_length=64, blank=True)
+    created_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, blank=True, null=True
+    )
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    run_after = models.DateTimeField(_("run after"), default=timezone.now)
+    started_at = models.DateTimeField(_("started at"), blank=True, null=True)
+    heartbeat_at = models.DateTimeField(_("heartbeat at"), blank=True, null=True)
+    finished_at = models.DateTimeField(_("finished at"), blank=True, null=True)
+
+    def __str__(self):
+        return "%s #%s" % (self.name, self.pk)
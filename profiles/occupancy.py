@@ -0,0 +1,238 @@
+from collections import Counter, defaultdict, namedtuple
+from profiles.bitmaps import SLOT_MINUTES, minutes_of, span_mask
+from profiles.catalog import catalog_cache, get_catalog
+from profiles.models import (
+    Curriculum,
+    CurriculumCourse,
+    Department,
+    Program,
+    Record,
+    Room,
+    Schedule,
+)
+from profiles.versions import key_versions, touch_keys, version_key
+
+# Occupancy grids: for each term, the week of every room as a bitmap of
+# five minute slots (see bitmaps.py), built from the term's schedules in one
+# query. Free rooms, utilization and the hourly heatmap are then answered
+# from the grid and the catalog snapshots without a query. A grid is kept
+# under the version of the Room table and a version of its term, which the
+# signals on schedules and records touch, so a change to one term has each
+# process rebuild the grid of that term alone the next time it is read.
+# Bulk writes of schedules must call touch_terms().
+# Utilization is measured over the teaching week, Monday to Saturday from
+# 07:00 to 21:00, the defaults of generate_timetable.
+DAYS = range(1, 7)
+DAY_START = 7 * 60
+DAY_END = 21 * 60
+HOURS = range(DAY_START // 60, DAY_END // 60)
+TERM_VERSION_KEY = "occupancy-version:%d:%d"
+
+Grid = namedtuple(
+    "Grid", ["academic_year", "academic_term", "rooms", "courses", "heatmap"]
+)
+
+_grids = {}
+
+
+def window_mask(days=DAYS, start=DAY_START, end=DAY_END):
+    mask = 0
+    for day in days:
+        mask |= span_mask(day, start, end)
+    return mask
+
+
+def hour_masks():
+    return {
+        (day, hour): span_mask(day, hour * 60, hour * 60 + 60)
+        for day in DAYS
+        for hour in HOURS
+    }
+
+
+def build_grid(academic_year, academic_term):
+    """
+    The grid of a term: the mask of every room, the slots taken by each
+    curriculum course and the slots taken in each hour of the week.
+    """
+    rooms = dict.fromkeys(get_catalog(Room), 0)
+    courses = Counter()
+    for room, day, start_time, end_time, curriculum_course in Schedule.objects.filter(
+        record__academic_year=academic_year, record__academic_term=academic_term
+    ).values_list("room", "day", "start_time", "end_time", "record__curriculum_course"):
+        mask = span_mask(
+            day, minutes_of(start_time), minutes_of(end_time, round_up=True)
+        )
+        courses[curriculum_course] += (mask & ~rooms.get(room, 0)).bit_count()
+        rooms[room] = rooms.get(room, 0) | mask
+    heatmap = Counter()
+    for key, mask in hour_masks().items():
+        heatmap[key] = sum((rooms[room] & mask).bit_count() for room in rooms)
+    return Grid(academic_year, academic_term, rooms, courses, heatmap)
+
+
+def get_grid(academic_year, academic_term):
+    """
+    The grid of a term from build_grid(), taken from this process, then
+    from the catalog cache if there is one, then from the database. It must
+    not be changed.
+    """
+    term = (academic_year, academic_term)
+    key = "occupancy:%d:%d:%s" % (
+        academic_year,
+        academic_term,
+        "-".join(map(str, key_versions([version_key(Room), TERM_VERSION_KEY % term]))),
+    )
+    cached = _grids.get(term)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    shared = catalog_cache()
+    grid = None if shared is None else shared.get(key)
+    if grid is None:
+        grid = build_grid(academic_year, academic_term)
+        if shared is not None:
+            shared.set(key, grid, timeout=None)
+    _grids[term] = (key, grid)
+    return grid
+
+
+def touch_terms(terms):
+    """
+    Give the grids of ``terms``, pairs of academic year and term, a new
+    version once the current transaction commits.
+    """
+    touch_keys(TERM_VERSION_KEY % tuple(term) for term in terms)
+
+
+def record_terms(record_ids):
+    return set(
+        Record.objects.filter(pk__in=record_ids).values_list(
+            "academic_year", "academic_term"
+        )
+    )
+
+
+def clear_grids():
+    _grids.clear()
+
+
+def room_data(room, **extra):
+    return {
+        "id": room["id"],
+        "number": room["number"],
+        "building": room["building"],
+        "capacity": room["capacity"],
+        **extra,
+    }
+
+
+def free_rooms(
+    academic_year, academic_term, day, start, end, min_capacity=None, building=None
+):
+    """
+    The rooms free on ``day`` from ``start`` to ``end``, in minutes after
+    midnight, with at least ``min_capacity`` seats and in ``building``.
+    """
+    grid = get_grid(academic_year, academic_term)
+    wanted = span_mask(day, start, end)
+    rooms = get_catalog(Room)
+    result = []
+    for pk, mask in grid.rooms.items():
+        room = rooms.get(pk)
+        if room is None or mask & wanted:
+            continue
+        if building is not None and room["building"] != building:
+            continue
+        if min_capacity is not None and (room["capacity"] or 0) < min_capacity:
+            continue
+        result.append(room_data(room))
+    result.sort(key=lambda room: room["number"])
+    return result
+
+
+def ratio(used, available):
+    return round(used / available, 4) if available else None
+
+
+def utilization(academic_year, academic_term, group="room"):
+    """
+    The share of the teaching week that the rooms are taken, by ``group``,
+    one of room, building or department. A department's share is of the
+    teaching week of every room, since rooms are not owned by departments.
+    """
+    grid = get_grid(academic_year, academic_term)
+    window = window_mask()
+    available = window.bit_count()
+    rooms = get_catalog(Room)
+    if group == "room":
+        result = [
+            room_data(
+                rooms[pk],
+                slots=(mask & window).bit_count(),
+                utilization=ratio((mask & window).bit_count(), available),
+            )
+            for pk, mask in grid.rooms.items()
+            if pk in rooms
+        ]
+        result.sort(key=lambda room: room["number"])
+        return result
+    if group == "building":
+        used = Counter()
+        count = Counter()
+        for pk, mask in grid.rooms.items():
+            if pk in rooms:
+                used[rooms[pk]["building"]] += (mask & window).bit_count()
+                count[rooms[pk]["building"]] += 1
+        return [
+            {
+                "building": building,
+                "rooms": count[building],
+                "slots": used[building],
+                "utilization": ratio(used[building], available * count[building]),
+            }
+            for building in sorted(count)
+        ]
+    if group == "department":
+        curriculum_courses = get_catalog(CurriculumCourse)
+        curricula = get_catalog(Curriculum)
+        programs = get_catalog(Program)
+        departments = get_catalog(Department)
+        used = defaultdict(int)
+        for pk, slots in grid.courses.items():
+            curriculum = curricula[curriculum_courses[pk]["curriculum_id"]]
+            used[programs[curriculum["program_id"]]["department_id"]] += slots
+        total = available * len(grid.rooms)
+        return [
+            {
+                "id": pk,
+                "title": departments[pk]["title"],
+                "slots": used[pk],
+                "utilization": ratio(used[pk], total),
+            }
+            for pk in sorted(used, key=lambda pk: departments[pk]["title"])
+        ]
+    raise ValueError("Unknown group %r." % group)
+
+
+def heatmap(academic_year, academic_term):
+    """
+    For each day and hour of the teaching week, the share of the room time
+    taken, and the five busiest hours.
+    """
+    grid = get_grid(academic_year, academic_term)
+    available = len(grid.rooms) * 60 // SLOT_MINUTES
+    cells = [
+        {
+            "day": day,
+            "hour": hour,
+            "utilization": ratio(grid.heatmap[day, hour], available),
+        }
+        for day in DAYS
+        for hour in HOURS
+    ]
+    return {
+        "days": list(DAYS),
+        "hours": list(HOURS),
+        "cells": cells,
+        "peak": sorted(cells, key=lambda cell: -(cell["utilization"] or 0))[:5],
+    }
@@ -0,0 +1,186 @@
+from django.db import connection
+from profiles.models import Course, StudentRecord
+from profiles.versions import table_versions
+
+# The graph is kept under the versions of these tables, so every process
+# rebuilds it the next time it is read after any of them changes.
+GRAPH_TABLES = (
+    Course,
+    Course.prerequisites.through,
+    Course.corequisites.through,
+)
+
+
+class CourseGraph:
+    """
+    In-memory prerequisite and corequisite graph of every course.
+
+    Course sets are stored as integer bitsets indexed by the position of the
+    course in ``ids``, and the transitive closure of the prerequisites is
+    computed once when the graph is built.
+    """
+
+    def __init__(self, ids, prerequisites, corequisites):
+        self.ids = sorted(ids)
+        self.index = {pk: position for position, pk in enumerate(self.ids)}
+        self.direct = [0] * len(self.ids)
+        self.corequisites = [0] * len(self.ids)
+        for course, prerequisite in prerequisites:
+            self.direct[self.index[course]] |= 1 << self.index[prerequisite]
+        for course, corequisite in corequisites:
+            self.corequisites[self.index[course]] |= 1 << self.index[corequisite]
+        self.closure = self.transitive_closure()
+
+    @classmethod
+    def load(cls):
+        return cls(
+            Course.objects.values_list("pk", flat=True),
+            Course.prerequisites.through.objects.values_list(
+                "from_course_id", "to_course_id"
+            ),
+            Course.corequisites.through.objects.values_list(
+                "from_course_id", "to_course_id"
+            ),
+        )
+
+    def transitive_closure(self):
+        closure = list(self.direct)
+        changed = True
+        while changed:
+            changed = False
+            for position in self.postorder():
+                bits = closure[position]
+                for prerequisite in self.positions(self.direct[position]):
+                    bits |= closure[prerequisite]
+                if bits != closure[position]:
+                    closure[position] = bits
+                    changed = True
+        return closure
+
+    def postorder(self):
+        # Prerequisites come before the courses requiring them, so a single
+        # pass of transitive_closure() is enough unless the graph has a cycle.
+        visited = set()
+        order = []
+        for root in range(len(self.ids)):
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(self.positions(self.direct[root])))]
+            while stack:
+                position, children = stack[-1]
+                for child in children:
+                    if child not in visited:
+                        visited.add(child)
+                        stack.append((child, iter(self.positions(self.direct[child]))))
+                        break
+                else:
+                    stack.pop()
+                    order.append(position)
+        return order
+
+    @staticmethod
+    def positions(bits):
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def bits(self, course_ids):
+        bits = 0
+        for pk in course_ids:
+            if pk in self.index:
+                bits |= 1 << self.index[pk]
+        return bits
+
+    def courses(self, bits):
+        return {self.ids[position] for position in self.positions(bits)}
+
+    def prerequisites_of(self, course_id):
+        return self.courses(self.closure[self.index[course_id]])
+
+    def corequisites_of(self, course_id):
+        return self.courses(self.corequisites[self.index[course_id]])
+
+    def has_cycle(self):
+        return any(
+            self.closure[position] >> position & 1 for position in range(len(self.ids))
+        )
+
+    def creates_cycle(self, course_id, prerequisite_ids):
+        """Whether requiring ``prerequisite_ids`` for ``course_id`` makes a cycle."""
+        if course_id in prerequisite_ids:
+            return True
+        if course_id not in self.index:
+            return False
+        bit = 1 << self.index[course_id]
+        return any(
+            self.closure[self.index[pk]] & bit
+            for pk in prerequisite_ids
+            if pk in self.index
+        )
+
+    def is_eligible(self, course_id, passed_ids):
+        if course_id not in self.index:
+            return False
+        required = self.closure[self.index[course_id]]
+        return required & ~self.bits(passed_ids) == 0
+
+    def available(self, passed_ids):
+        """Courses not yet passed whose prerequisites are all passed."""
+        passed = self.bits(passed_ids)
+        return {
+            pk
+            for position, pk in enumerate(self.ids)
+            if not passed >> position & 1 and self.closure[position] & ~passed == 0
+        }
+
+
+_graph = None
+
+
+def get_graph():
+    """
+    The graph of every course, taken from this process while it is current.
+
+    A graph loaded inside a transaction is not kept, as it may hold changes
+    that roll back without changing the versions it would be kept under.
+    """
+    global _graph
+    key = table_versions(GRAPH_TABLES)
+    cached = _graph
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    graph = CourseGraph.load()
+    if not connection.in_atomic_block:
+        _graph = (key, graph)
+    return graph
+
+
+def invalidate_graph():
+    """
+    Forget the graph of this process, which must not wait for the versions
+    of a transaction's changes, as they only change once it commits.
+    """
+    global _graph
+    _graph = None
+
+
+def passed_courses(student):
+    return set(
+        StudentRecord.objects.filter(student=student, remark="PSD").values_list(
+            "record__curriculum_course__course", flat=True
+        )
+    )
+
+
+def is_eligible(student, course):
+    """Whether ``student`` passed every transitive prerequisite of ``course``."""
+    return get_graph().is_eligible(course.pk, passed_courses(student))
+
+
+def next_courses(student):
+    """Every course ``student`` has not passed yet and can take next."""
+    return Course.objects.filter(
+        pk__in=get_graph().available(passed_courses(student))
+    ).order_by("code")
@@ -0,0 +1,265 @@
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from enrollment_system.profiling import current_profile, reset_spans, span_totals
+
+# Per-request profiles: the wall time, the number and total time of the SQL
+# queries, repeated query shapes (the fingerprints of N+1 queries) and the
+# time spent in functions decorated with enrollment_system.profiling.timed.
+# Each request is logged as one JSON line to the "profiles.profiling" logger
+# and added to per-view totals for the metrics view. Requests can also be run under cProfile,
+# when they carry the X-Profile header or are drawn by the sampling rate
+# that staff set in the admin.
+logger = logging.getLogger("profiles.profiling")
+
+SAMPLING_KEY = "profiling:sampling"
+HEADER = "HTTP_X_PROFILE"
+
+_lock = threading.Lock()
+_profiling = threading.Lock()
+_views = defaultdict(Counter)
+# The sampling rate and when to read it again.
+_sampling = [0.0, None]
+PLACEHOLDERS = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+NUMBERS = re.compile(r"\b\d+\b")
+
+
+def fingerprint(sql):
+    """The shape of ``sql``, the same for every length of an IN list."""
+    return NUMBERS.sub("N", PLACEHOLDERS.sub("(...)", sql))
+
+
+class Profile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.fingerprints = Counter()
+        self.spans = defaultdict(lambda: [0, 0.0])
+
+    def add_query(self, sql, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        self.fingerprints[fingerprint(sql)] += 1
+
+    def add_span(self, name, seconds):
+        span = self.spans[name]
+        span[0] += 1
+        span[1] += seconds
+
+    def duplicates(self):
+        threshold = getattr(settings, "PROFILING_DUPLICATE_THRESHOLD", 5)
+        return [
+            {"count": count, "fingerprint": sql[:500]}
+            for sql, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+
+
+def connection_opened(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def sampling_rate():
+    """The sampling rate staff set, read from the shared cache every 5 s."""
+    now = time.monotonic()
+    if _sampling[1] is None or _sampling[1] < now:
+        _sampling[0] = cache.get(SAMPLING_KEY, {}).get("rate", 0.0)
+        _sampling[1] = now + 5
+    return _sampling[0]
+
+
+def set_sampling(rate, minutes):
+    """Profile a ``rate`` fraction of requests for the next ``minutes``."""
+    if rate:
+        cache.set(
+            SAMPLING_KEY,
+            {"rate": rate, "until": time.time() + minutes * 60},
+            timeout=minutes * 60,
+        )
+    else:
+        cache.delete(SAMPLING_KEY)
+    _sampling[1] = None
+
+
+def get_sampling():
+    return cache.get(SAMPLING_KEY)
+
+
+def start_profiler(request):
+    """
+    A cProfile profiler for ``request`` if it asked for one or was drawn,
+    and no other request of this process is being profiled, else None.
+    """
+    token = getattr(settings, "PROFILING_HEADER_TOKEN", "")
+    header = request.META.get(HEADER)
+    if header is not None and (header == token if token else settings.DEBUG):
+        wanted = True
+    else:
+        rate = sampling_rate()
+        wanted = bool(rate) and random.random() < rate
+    if wanted and _profiling.acquire(blocking=False):
+        return cProfile.Profile()
+    return None
+
+
+def save_profile(profiler):
+    """Dump ``profiler`` to PROFILING_DIR, returning its id and hot spots."""
+    directory = Path(getattr(settings, "PROFILING_DIR"))
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = "%s-%s" % (time.strftime("%Y%m%dT%H%M%S"), uuid.uuid4().hex[:8])
+    profiler.dump_stats(directory / ("%s.prof" % profile_id))
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats("cumulative").print_stats(20)
+    hot = [line.strip() for line in output.getvalue().splitlines() if line.strip()]
+    return profile_id, hot[-20:]
+
+
+class ProfilingMiddleware:
+    """
+    Profile every request as described at the top of this module, and tell
+    the browser the SQL and total time in a Server-Timing header. cProfile
+    only sees the thread it runs in, so under ASGI the profile of a request
+    misses its sync code and holds whatever else the event loop ran.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        profile = Profile()
+        token = current_profile.set(profile)
+        profiler = start_profiler(request)
+        started = time.perf_counter()
+        try:
+            if profiler is None:
+                response = self.get_response(request)
+            else:
+                response = profiler.runcall(self.get_response, request)
+        except BaseException:
+            if profiler is not None:
+                _profiling.release()
+            raise
+        finally:
+            current_profile.reset(token)
+        return self.finish(request, response, profile, profiler, started)
+
+    async def __acall__(self, request):
+        profile = Profile()
+        token = current_profile.set(profile)
+        profiler = start_profiler(request)
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            response = await self.get_response(request)
+        except BaseException:
+            if profiler is not None:
+                _profiling.release()
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            current_profile.reset(token)
+        return self.finish(request, response, profile, profiler, started)
+
+    def finish(self, request, response, profile, profiler, started):
+        wall_ms = (time.perf_counter() - started) * 1000
+        sql_ms = profile.sql_seconds * 1000
+        match = request.resolver_match
+        view_name = match.view_name if match else "unresolved"
+        duplicates = profile.duplicates()
+        entry = {
+            "method": request.method,
+            "path": request.path,
+            "view": view_name,
+            "status": response.status_code,
+            "wall_ms": round(wall_ms, 3),
+            "queries": profile.queries,
+            "sql_ms": round(sql_ms, 3),
+            "duplicates": duplicates,
+            "spans": {
+                name: {"calls": calls, "ms": round(seconds * 1000, 3)}
+                for name, (calls, seconds) in profile.spans.items()
+            },
+        }
+        if profiler is not None:
+            try:
+                entry["profile"], entry["hot"] = save_profile(profiler)
+            finally:
+                _profiling.release()
+            response["X-Profile-Id"] = entry["profile"]
+        with _lock:
+            totals = _views[view_name]
+            totals["requests"] += 1
+            totals["wall_ms"] += wall_ms
+            totals["max_wall_ms"] = max(totals["max_wall_ms"], wall_ms)
+            totals["queries"] += profile.queries
+            totals["sql_ms"] += sql_ms
+            totals["duplicate_requests"] += bool(duplicates)
+        if wall_ms >= getattr(settings, "PROFILING_LOG_THRESHOLD_MS", 0):
+            logger.info(json.dumps(entry))
+        response["Server-Timing"] = ", ".join(
+            [
+                'sql;dur=%.1f;desc="%d queries"' % (sql_ms, profile.queries),
+                "total;dur=%.1f" % wall_ms,
+            ]
+        )
+        return response
+
+
+def profiling_metrics():
+    """Per-view and per-span totals of this process, slowest first."""
+    with _lock:
+        views = {name: dict(totals) for name, totals in _views.items()}
+    for totals in views.values():
+        totals["mean_wall_ms"] = totals["wall_ms"] / totals["requests"]
+        totals["mean_queries"] = totals["queries"] / totals["requests"]
+    spans = span_totals()
+    for totals in spans.values():
+        totals["mean_ms"] = totals["ms"] / totals["calls"]
+    return {
+        "views": dict(
+            sorted(views.items(), key=lambda item: item[1]["wall_ms"], reverse=True)
+        ),
+        "spans": dict(
+            sorted(spans.items(), key=lambda item: item[1]["ms"], reverse=True)
+        ),
+    }
+
+
+def reset_profiling():
+    with _lock:
+        _views.clear()
+    reset_spans()
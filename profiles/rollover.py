@@ -0,0 +1,137 @@
+from collections import defaultdict, namedtuple
+from profiles.bitmaps import minutes_of, span_mask
+from profiles.database import atomic_write
+from profiles.models import Record, Schedule
+from profiles.occupancy import touch_terms
+from profiles.search import index_objects
+from profiles.versions import touch
+
+# A term rollover copies the records of a term, with their schedules, into
+# another term. The copies are checked in memory against the schedules
+# already in the target term, with the room, professor and section bitmaps
+# of timetable.load_problem(), and written with bulk_create, so none of
+# the per-schedule queries of Schedule.clean() run.
+Rollover = namedtuple("Rollover", ["records", "schedules", "changes"])
+# What happens to a record of the source term: "create", "exists" when the
+# target term has a record of the same curriculum course and section, or
+# "conflict" with the kind of the first conflict of its schedules.
+Change = namedtuple("Change", ["source", "action", "detail", "record", "schedules"])
+
+
+def plan_rollover(source, target, advisors=None):
+    """
+    The records and schedules that rolling the ``source`` (academic year,
+    academic term) over into ``target`` would create, unsaved, and a change
+    for each record of the source term. ``advisors`` maps professor ids to
+    the ids of the professors who take over their records and schedules.
+
+    A record is copied with all of its schedules or, when one of them
+    conflicts with the target term or an earlier copy, not at all.
+    """
+    advisors = advisors or {}
+    source_year, source_term = source
+    target_year, target_term = target
+    existing = set(
+        Record.objects.filter(
+            academic_year=target_year, academic_term=target_term
+        ).values_list("curriculum_course", "section")
+    )
+    busy = defaultdict(int)
+    for room, professor, section, day, start_time, end_time in Schedule.objects.filter(
+        record__academic_year=target_year, record__academic_term=target_term
+    ).values_list(
+        "room", "professor", "record__section", "day", "start_time", "end_time"
+    ):
+        mask = span_mask(
+            day, minutes_of(start_time), minutes_of(end_time, round_up=True)
+        )
+        busy["room", room] |= mask
+        busy["professor", professor] |= mask
+        busy["section", section] |= mask
+    meetings = defaultdict(list)
+    for row in (
+        Schedule.objects.filter(
+            record__academic_year=source_year, record__academic_term=source_term
+        )
+        .order_by("pk")
+        .values_list("record", "room", "professor", "day", "start_time", "end_time")
+    ):
+        meetings[row[0]].append(row[1:])
+
+    records = []
+    schedules = []
+    changes = []
+    for pk, curriculum_course, section, advisor, capacity in (
+        Record.objects.filter(academic_year=source_year, academic_term=source_term)
+        .order_by("pk")
+        .values_list("pk", "curriculum_course", "section", "advisor", "capacity")
+    ):
+        if (curriculum_course, section) in existing:
+            changes.append(Change(pk, "exists", "", None, []))
+            continue
+        record = Record(
+            academic_year=target_year,
+            academic_term=target_term,
+            curriculum_course_id=curriculum_course,
+            section_id=section,
+            advisor_id=advisors.get(advisor, advisor),
+            capacity=capacity,
+        )
+        copies = []
+        masks = defaultdict(int)
+        conflict = None
+        for room, professor, day, start_time, end_time in meetings[pk]:
+            professor = advisors.get(professor, professor)
+            mask = span_mask(
+                day, minutes_of(start_time), minutes_of(end_time, round_up=True)
+            )
+            for key in (("room", room), ("professor", professor), ("section", section)):
+                if (busy[key] | masks[key]) & mask:
+                    conflict = conflict or key[0]
+                masks[key] |= mask
+            copies.append(
+                Schedule(
+                    record=record,
+                    room_id=room,
+                    professor_id=professor,
+                    day=day,
+                    start_time=start_time,
+                    end_time=end_time,
+                )
+            )
+        if conflict is not None:
+            changes.append(Change(pk, "conflict", conflict, record, copies))
+            continue
+        for key, mask in masks.items():
+            busy[key] |= mask
+        existing.add((curriculum_course, section))
+        records.append(record)
+        schedules.extend(copies)
+        changes.append(Change(pk, "create", "", record, copies))
+    return Rollover(records, schedules, changes)
+
+
+def roll_over(source, target, advisors=None, batch_size=1000):
+    """
+    Plan the rollover of ``source`` into ``target`` and write it, in one
+    transaction that takes the write lock before planning, so that the
+    target term cannot change in between.
+    """
+    with atomic_write():
+        rollover = plan_rollover(source, target, advisors)
+        Record.objects.bulk_create(rollover.records, batch_size=batch_size)
+        Schedule.objects.bulk_create(rollover.schedules, batch_size=batch_size)
+        if rollover.records:
+            index_objects(
+                Record.objects.filter(academic_year=target[0], academic_term=target[1]),
+                batch_size=batch_size,
+            )
+            index_objects(
+                Schedule.objects.filter(
+                    record__academic_year=target[0], record__academic_term=target[1]
+                ),
+                batch_size=batch_size,
+            )
+            touch(Record, Schedule)
+            touch_terms([target])
+    return rollover
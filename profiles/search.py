@@ -0,0 +1,146 @@
+import re
+from itertools import islice
+from profiles.models import Record, Schedule, SearchToken, StudentRecord
+
+SEARCH_FIELDS = {
+    Schedule: (
+        "record__curriculum_course__curriculum__program__department__title",
+        "record__curriculum_course__curriculum__program__title",
+        "record__section__name",
+        "room__number",
+        "professor__user__first_name",
+        "professor__user__middle_name",
+        "professor__user__last_name",
+        "professor__user__name_suffix",
+    ),
+    Record: (
+        "curriculum_course__curriculum__program__department__title",
+        "curriculum_course__curriculum__program__title",
+        "curriculum_course__course__code",
+        "curriculum_course__course__title",
+        "advisor__user__first_name",
+        "advisor__user__middle_name",
+        "advisor__user__last_name",
+        "advisor__user__name_suffix",
+        "section__name",
+    ),
+    StudentRecord: (
+        "student__user__first_name",
+        "student__user__middle_name",
+        "student__user__last_name",
+        "student__user__name_suffix",
+        "record__advisor__user__first_name",
+        "record__advisor__user__middle_name",
+        "record__advisor__user__last_name",
+        "record__advisor__user__name_suffix",
+        "record__curriculum_course__curriculum__program__department__title",
+        "record__curriculum_course__curriculum__program__title",
+        "record__curriculum_course__course__code",
+        "record__curriculum_course__course__title",
+        "record__section__name",
+    ),
+}
+TOKEN_LENGTH = SearchToken._meta.get_field("token").max_length
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return {word[:TOKEN_LENGTH] for word in WORD.findall(text.casefold())}
+
+
+def label_of(model):
+    return model._meta.label_lower
+
+
+def relations_of(model):
+    return {
+        lookup.rsplit("__", 1)[0] for lookup in SEARCH_FIELDS[model] if "__" in lookup
+    }
+
+
+def indexed_fields(model):
+    """The fields of ``model`` that its search fields start from."""
+    return {lookup.split("__", 1)[0] for lookup in SEARCH_FIELDS[model]}
+
+
+def dependencies(fields=SEARCH_FIELDS):
+    """
+    Map every model that a search field passes through to the indexed
+    models and lookup paths that must be reindexed when it changes, together
+    with the fields of that model that end up in the index.
+    """
+    dependents = {}
+    for model, lookups in fields.items():
+        for lookup in lookups:
+            parts = lookup.split("__")
+            related = model
+            for depth, part in enumerate(parts[:-1], start=1):
+                related = related._meta.get_field(part).related_model
+                path = "__".join(parts[:depth])
+                entry = dependents.setdefault(
+                    related, {"paths": set(), "fields": set()}
+                )
+                entry["paths"].add((model, path))
+                entry["fields"].add(parts[depth])
+    return dependents
+
+
+def document(instance, lookups):
+    tokens = set()
+    for lookup in lookups:
+        value = instance
+        for part in lookup.split("__"):
+            value = getattr(value, part, None)
+            if value is None:
+                break
+        if value is not None:
+            tokens |= tokenize(str(value))
+    return tokens
+
+
+def index_objects(queryset, batch_size=2000):
+    """Rebuild the search tokens of every object in ``queryset``."""
+    model = queryset.model
+    label = label_of(model)
+    lookups = SEARCH_FIELDS[model]
+    objects = queryset.select_related(*relations_of(model)).iterator(
+        chunk_size=batch_size
+    )
+    count = 0
+    while True:
+        chunk = list(islice(objects, batch_size))
+        if not chunk:
+            return count
+        SearchToken.objects.filter(
+            model=label, object_id__in=[instance.pk for instance in chunk]
+        ).delete()
+        SearchToken.objects.bulk_create(
+            [
+                SearchToken(model=label, object_id=instance.pk, token=token)
+                for instance in chunk
+                for token in document(instance, lookups)
+            ],
+            batch_size=batch_size,
+        )
+        count += len(chunk)
+
+
+def unindex_objects(model, pks):
+    SearchToken.objects.filter(model=label_of(model), object_id__in=pks).delete()
+
+
+def search(queryset, text):
+    """
+    Narrow ``queryset`` to the objects with an indexed word starting with
+    each word of ``text``.
+    """
+    label = label_of(queryset.model)
+    for word in tokenize(text):
+        # A range instead of LIKE so that the token index is used regardless
+        # of the database's case sensitivity rules.
+        queryset = queryset.filter(
+            pk__in=SearchToken.objects.filter(
+                model=label, token__gte=word, token__lt=word + chr(0x10FFFF)
+            ).values("object_id")
+        )
+    return queryset
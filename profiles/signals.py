@@ -0,0 +1,273 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from profiles import profiling
+from profiles.database import connection_opened
+from profiles.enrollment import release_seat, take_seat
+from profiles.models import (
+    Course,
+    Curriculum,
+    CurriculumCourse,
+    Record,
+    Schedule,
+    StudentRecord,
+)
+from profiles.occupancy import record_terms, touch_terms
+from profiles.prerequisites import get_graph, invalidate_graph
+from profiles.search import (
+    SEARCH_FIELDS,
+    dependencies,
+    index_objects,
+    indexed_fields,
+    unindex_objects,
+)
+from profiles.student_timetables import (
+    MEETING_FIELDS,
+    TERM_FIELDS,
+    queue_refresh,
+)
+from profiles.transcripts import refresh_transcripts
+from profiles.versions import UNVERSIONED_FIELDS, VERSIONED_MODELS, touch
+
+
+@receiver(post_save, sender=StudentRecord)
+def count_enrollment(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Runs inside the transaction of StudentRecord.save(), which the error
+    # of a full record rolls back.
+    if raw or not instance.takes_seat():
+        return
+    if update_fields is not None and "record" not in update_fields:
+        return
+    if not take_seat(instance.record_id):
+        raise ValidationError(
+            _("Record %(record)s is already full."),
+            code="full",
+            params={"record": instance.record_id},
+        )
+    previous = instance.saved_value("record_id")
+    if previous is not None:
+        release_seat(previous)
+    touch(Record)
+
+
+@receiver(post_delete, sender=StudentRecord)
+def count_unenrollment(sender, instance, **kwargs):
+    release_seat(instance.record_id)
+    touch(Record)
+
+
+@receiver(post_save, sender=StudentRecord)
+def update_transcript(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Transcripts only change with the grade of a row, or when it is moved to
+    # another record or student.
+    if not raw and instance.changed_fields(update_fields):
+        refresh_transcripts(
+            {instance.student_id, instance.saved_value("student_id")} - {None}
+        )
+
+
+@receiver(post_delete, sender=StudentRecord)
+def update_transcript_on_delete(sender, instance, **kwargs):
+    # Deferred so that deleting a student does not recreate its transcript.
+    transaction.on_commit(lambda: refresh_transcripts([instance.student_id]))
+
+
+def saved_owners(instance, field):
+    # The timetables of the record or student a row is moved away from must
+    # be refreshed too.
+    return {getattr(instance, field), instance.saved_value(field)} - {None}
+
+
+@receiver(post_save, sender=StudentRecord)
+def update_student_timetable(sender, instance, raw=False, **kwargs):
+    if not raw:
+        queue_refresh(student_ids=saved_owners(instance, "student_id"))
+
+
+@receiver(post_delete, sender=StudentRecord)
+def update_student_timetable_on_delete(sender, instance, **kwargs):
+    queue_refresh(student_ids=[instance.student_id], on_commit=True)
+
+
+@receiver(post_save, sender=Schedule)
+def update_schedule_timetables(sender, instance, raw=False, **kwargs):
+    if not raw:
+        queue_refresh(record_ids=saved_owners(instance, "record_id"))
+
+
+@receiver(post_delete, sender=Schedule)
+def update_schedule_timetables_on_delete(sender, instance, **kwargs):
+    queue_refresh(record_ids=[instance.record_id], on_commit=True)
+
+
+@receiver(post_save, sender=Schedule)
+def touch_schedule_terms(sender, instance, raw=False, **kwargs):
+    if not raw:
+        touch_terms(record_terms(saved_owners(instance, "record_id")))
+
+
+@receiver(post_delete, sender=Schedule)
+def touch_schedule_terms_on_delete(sender, instance, **kwargs):
+    touch_terms(record_terms([instance.record_id]))
+
+
+@receiver(m2m_changed, sender=Course.prerequisites.through)
+def check_prerequisites(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_add":
+        graph = get_graph()
+        if reverse:
+            cyclic = any(graph.creates_cycle(pk, {instance.pk}) for pk in pk_set)
+        else:
+            cyclic = graph.creates_cycle(instance.pk, pk_set)
+        if cyclic:
+            raise ValidationError(_("Course prerequisites cannot form a cycle."))
+    elif action.startswith("post_"):
+        invalidate_graph()
+
+
+@receiver(m2m_changed, sender=Course.corequisites.through)
+def update_corequisites(sender, action, **kwargs):
+    if action.startswith("post_"):
+        invalidate_graph()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def update_courses(sender, **kwargs):
+    invalidate_graph()
+
+
+@receiver(post_save, sender=Course)
+def update_course_units(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    if not created and not raw and instance.changed_fields(update_fields):
+        refresh_transcripts(
+            StudentRecord.objects.filter(
+                record__curriculum_course__course=instance
+            ).values("student")
+        )
+        Curriculum.objects.filter(curriculumcourse__course=instance).update(
+            version=F("version") + 1
+        )
+
+
+@receiver(post_save, sender=CurriculumCourse)
+@receiver(post_delete, sender=CurriculumCourse)
+def update_curriculum_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Curriculum.objects.filter(pk=instance.curriculum_id).update(
+            version=F("version") + 1
+        )
+
+
+def index_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # A saved row only needs new tokens when it points to other rows for its
+    # search fields, which models tracking those fields tell without a query.
+    fields = indexed_fields(sender)
+    if raw or update_fields is not None and not fields & set(update_fields):
+        return
+    tracked = getattr(sender, "tracked_fields", ())
+    if not created and fields <= {name.removesuffix("_id") for name in tracked}:
+        changed = instance.changed_fields(update_fields)
+        if not fields & {name.removesuffix("_id") for name in changed}:
+            return
+    index_objects(sender.objects.filter(pk=instance.pk))
+
+
+def unindex_deleted(sender, instance, **kwargs):
+    unindex_objects(sender, [instance.pk])
+
+
+def reindex_dependents(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    dependency = SEARCH_DEPENDENCIES[sender]
+    if created or raw:
+        return
+    if update_fields is not None and not dependency["fields"] & set(update_fields):
+        return
+    for model, path in dependency["paths"]:
+        index_objects(model.objects.filter(**{path: instance}))
+
+
+SEARCH_DEPENDENCIES = dependencies()
+for model in SEARCH_FIELDS:
+    post_save.connect(index_saved, sender=model)
+    post_delete.connect(unindex_deleted, sender=model)
+for model in SEARCH_DEPENDENCIES:
+    post_save.connect(reindex_dependents, sender=model)
+
+
+def refresh_dependent_timetables(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    dependency = TIMETABLE_DEPENDENCIES[sender]
+    if created or raw:
+        return
+    if update_fields is not None and not dependency["fields"] & set(update_fields):
+        return
+    for model, path in dependency["paths"]:
+        queue_refresh(
+            record_ids=model.objects.filter(**{path: instance}).values_list(
+                "record", flat=True
+            )
+        )
+
+
+TIMETABLE_DEPENDENCIES = dependencies(
+    {Schedule: [*MEETING_FIELDS.values(), *TERM_FIELDS]}
+)
+for model in TIMETABLE_DEPENDENCIES:
+    post_save.connect(refresh_dependent_timetables, sender=model)
+
+
+def touch_saved(sender, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) - UNVERSIONED_FIELDS:
+        touch(sender)
+
+
+def touch_deleted(sender, **kwargs):
+    touch(sender)
+
+
+def touch_related(sender, action, **kwargs):
+    if action.startswith("post_"):
+        touch(sender)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(touch_saved, sender=model)
+    post_delete.connect(touch_deleted, sender=model)
+    for field in model._meta.many_to_many:
+        m2m_changed.connect(touch_related, sender=field.remote_field.through)
+
+
+@receiver(post_save, sender=Record)
+def touch_record_schedules(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    # Room occupancy grids place a schedule by the term and course of its
+    # record, and the room views are validated against the version of the
+    # Schedule table.
+    if created or raw or not instance.changed_fields(update_fields):
+        return
+    touch(Schedule)
+    touch_terms(
+        {
+            (instance.academic_year, instance.academic_term),
+            (
+                instance.saved_value("academic_year"),
+                instance.saved_value("academic_term"),
+            ),
+        }
+        - {(None, None)}
+    )
+
+
+connection_created.connect(connection_opened)
+connection_created.connect(profiling.connection_opened)
@@ -0,0 +1,195 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from profiles.bitmaps import from_bytes, minutes_of, span_mask, to_bytes
+from profiles.models import Schedule, Student, StudentRecord, StudentTimetable
+from profiles.versions import touch
+
+# What a meeting of the student's weekly schedule shows, as lookups from
+# Schedule. Changes to any model these pass through refresh the timetables.
+MEETING_FIELDS = {
+    "schedule": "pk",
+    "record": "record",
+    "day": "day",
+    "start_time": "start_time",
+    "end_time": "end_time",
+    "room": "room__number",
+    "course": "record__curriculum_course__course__code",
+    "title": "record__curriculum_course__course__title",
+    "section": "record__section__name",
+    "professor_first_name": "professor__user__first_name",
+    "professor_last_name": "professor__user__last_name",
+}
+TERM_FIELDS = ("record__academic_year", "record__academic_term")
+
+_deferred = threading.local()
+
+
+def meeting_mask(day, start_time, end_time):
+    return span_mask(day, minutes_of(start_time), minutes_of(end_time, round_up=True))
+
+
+def build_meetings(rows):
+    meetings = []
+    for row in rows:
+        meeting = dict(zip(MEETING_FIELDS, row))
+        meeting["start_time"] = meeting["start_time"].isoformat("minutes")
+        meeting["end_time"] = meeting["end_time"].isoformat("minutes")
+        meetings.append(meeting)
+    meetings.sort(key=lambda meeting: (meeting["day"], meeting["start_time"]))
+    return meetings
+
+
+def refresh_timetables(student_ids=None, batch_size=1000):
+    """
+    Recompute the weekly timetables of ``student_ids``, or of every student,
+    from one query over their student records and the records' schedules.
+    """
+    students = Student.objects.all()
+    if student_ids is not None:
+        students = students.filter(pk__in=student_ids)
+    terms = defaultdict(list)
+    for row in (
+        StudentRecord.objects.filter(
+            student__in=students, record__schedule__isnull=False
+        )
+        .values_list(
+            "student",
+            *TERM_FIELDS,
+            *["record__schedule__%s" % lookup for lookup in MEETING_FIELDS.values()],
+        )
+        .iterator(chunk_size=batch_size)
+    ):
+        terms[row[:3]].append(row[3:])
+    existing = {
+        (timetable.student_id, timetable.academic_year, timetable.academic_term): (
+            timetable.pk
+        )
+        for timetable in StudentTimetable.objects.filter(student__in=students).only(
+            "student", "academic_year", "academic_term"
+        )
+    }
+    now = timezone.now()
+    timetables = []
+    for (student, academic_year, academic_term), rows in terms.items():
+        mask = 0
+        for row in rows:
+            mask |= meeting_mask(*row[2:5])
+        timetables.append(
+            StudentTimetable(
+                pk=existing.pop((student, academic_year, academic_term), None),
+                student_id=student,
+                academic_year=academic_year,
+                academic_term=academic_term,
+                slots=to_bytes(mask),
+                meetings=build_meetings(rows),
+                updated_at=now,
+            )
+        )
+    StudentTimetable.objects.filter(pk__in=existing.values()).delete()
+    StudentTimetable.objects.bulk_update(
+        [timetable for timetable in timetables if timetable.pk],
+        ["slots", "meetings", "updated_at"],
+        batch_size=batch_size,
+    )
+    StudentTimetable.objects.bulk_create(
+        [timetable for timetable in timetables if not timetable.pk],
+        batch_size=batch_size,
+    )
+    touch(StudentTimetable)
+    return len(timetables)
+
+
+def students_of(student_ids=(), record_ids=()):
+    return Student.objects.filter(
+        Q(pk__in=student_ids) | Q(studentrecord__record__in=record_ids)
+    ).values("pk")
+
+
+def queue_refresh(student_ids=(), record_ids=(), on_commit=False):
+    """
+    Refresh the timetables of ``student_ids`` and of the students of
+    ``record_ids``, now or on commit, or at the end of the enclosing
+    deferred_refresh() block.
+    """
+    pending = getattr(_deferred, "pending", None)
+    if pending is not None:
+        pending[0].update(student_ids)
+        pending[1].update(record_ids)
+    elif on_commit:
+        transaction.on_commit(
+            lambda: refresh_timetables(students_of(student_ids, record_ids))
+        )
+    else:
+        refresh_timetables(students_of(student_ids, record_ids))
+
+
+@contextmanager
+def deferred_refresh():
+    """
+    Collect the timetable refreshes queued inside the block, by signals on
+    each saved or deleted row for instance, and run them once at its end.
+    """
+    if getattr(_deferred, "pending", None) is not None:
+        yield
+        return
+    pending = _deferred.pending = (set(), set())
+    try:
+        yield
+    finally:
+        _deferred.pending = None
+    refresh_timetables(students_of(*pending))
+
+
+def find_clash(student, record_ids):
+    """
+    Return the first of ``record_ids`` whose schedules overlap the student's
+    timetable of its term or an earlier record of ``record_ids``, or None.
+
+    The student's row is locked for the rest of the transaction, as the
+    timetable of a first enrollment in a term does not exist to be locked.
+    """
+    Student.objects.select_for_update().filter(pk=student.pk).exists()
+    masks = defaultdict(int)
+    terms = {}
+    schedules = Schedule.objects.filter(record__in=record_ids).values_list(
+        "record", *TERM_FIELDS, "day", "start_time", "end_time"
+    )
+    for record, academic_year, academic_term, *meeting in schedules:
+        masks[record] |= meeting_mask(*meeting)
+        terms[record] = (academic_year, academic_term)
+    if not terms:
+        return None
+    query = Q()
+    for academic_year, academic_term in set(terms.values()):
+        query |= Q(academic_year=academic_year, academic_term=academic_term)
+    busy = defaultdict(int)
+    for academic_year, academic_term, slots in StudentTimetable.objects.filter(
+        query, student=student
+    ).values_list("academic_year", "academic_term", "slots"):
+        busy[(academic_year, academic_term)] = from_bytes(slots)
+    for record in record_ids:
+        if record not in terms:
+            continue
+        if masks[record] & busy[terms[record]]:
+            return record
+        busy[terms[record]] |= masks[record]
+    return None
+
+
+def timetables_of(student, academic_year=None, academic_term=None):
+    """The student's timetables of the given term, or all of them latest first."""
+    timetables = StudentTimetable.objects.filter(student=student)
+    if academic_year is not None:
+        timetables = timetables.filter(
+            academic_year=academic_year, academic_term=academic_term
+        )
+    return timetables.order_by("-academic_year", "-academic_term")
+
+
+def schedule_of(student, academic_year=None, academic_term=None):
+    """The student's timetable of the given term, or of the latest one."""
+    return timetables_of(student, academic_year, academic_term).first()
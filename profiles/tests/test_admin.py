@@ -0,0 +1,156 @@
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from accounts.models import CustomUser
+from profiles.models import (
+    Curriculum,
+    CurriculumCourse,
+    Professor,
+    Program,
+    Record,
+    Schedule,
+    Student,
+    StudentRecord,
+)
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+    create_student,
+    create_user,
+)
+
+
+class AdminQueryCountTests(CacheTestCase):
+    # Enough rows for an N+1 query to break the limits below.
+    rows = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            contact_number="admin",
+            password="password",
+        )
+        curriculum = create_curriculum()
+        students = [
+            create_student("student%d" % index, curriculum) for index in range(cls.rows)
+        ]
+        for index in range(cls.rows):
+            professor = create_professor("professor%d" % index)
+            record = create_record(
+                create_course("CS%d" % index, curriculum), professor, "S%d" % index
+            )
+            create_schedule(record, "R%d" % index)
+            StudentRecord.objects.create(record=record, student=students[index])
+        cls.record = Record.objects.order_by("pk").first()
+        for student in students[1:]:
+            StudentRecord.objects.create(record=cls.record, student=student)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def assertMaxQueries(self, url, maximum):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), maximum, "%s ran %d queries" % (url, len(queries))
+        )
+
+    def test_changelists(self):
+        for model in (
+            Professor,
+            Student,
+            Program,
+            Curriculum,
+            CurriculumCourse,
+            Schedule,
+            Record,
+            StudentRecord,
+        ):
+            with self.subTest(model=model.__name__):
+                self.assertMaxQueries(
+                    reverse("admin:profiles_%s_changelist" % model._meta.model_name),
+                    8,
+                )
+
+    def test_change_forms(self):
+        self.assertMaxQueries(
+            reverse("admin:profiles_record_change", args=[self.record.pk]), 20
+        )
+        self.assertMaxQueries(
+            reverse(
+                "admin:profiles_schedule_change",
+                args=[self.record.schedule_set.get().pk],
+            ),
+            12,
+        )
+        self.assertMaxQueries(
+            reverse(
+                "admin:profiles_studentrecord_change",
+                args=[self.record.studentrecord_set.first().pk],
+            ),
+            12,
+        )
+
+
+class ProfileAdminTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            contact_number="admin",
+            password="password",
+        )
+        cls.professor = create_professor("professor1")
+        cls.student = create_student("student1")
+        cls.staff = create_user("professor2", is_staff=True)
+        cls.user = create_user("student2")
+
+    def test_roles_are_checked_on_the_loaded_user(self):
+        for profile, message in (
+            (Professor(user=self.user), "not a staff"),
+            (Student(user=self.staff, gender="F"), "is a staff"),
+        ):
+            with self.subTest(profile=type(profile).__name__):
+                with self.assertNumQueries(0), self.assertRaisesMessage(
+                    ValidationError, message
+                ):
+                    profile.clean()
+        with self.assertNumQueries(0):
+            Professor(user=self.staff).clean()
+            Student(user=self.user, gender="F").clean()
+
+    def test_user_autocomplete_offers_users_without_the_profile(self):
+        self.client.force_login(self.admin)
+        for model_name, term, expected in (
+            ("professor", "", ["professor2"]),
+            ("student", "", ["student2"]),
+            ("student", "STUDENT2@", ["student2"]),
+            ("student", "prof", []),
+        ):
+            with self.subTest(model_name=model_name, term=term):
+                response = self.client.get(
+                    reverse("admin:autocomplete"),
+                    {
+                        "app_label": "profiles",
+                        "model_name": model_name,
+                        "field_name": "user",
+                        "term": term,
+                    },
+                )
+                self.assertEqual(
+                    [
+                        CustomUser.objects.get(pk=result["id"]).username
+                        for result in response.json()["results"]
+                    ],
+                    expected,
+                )
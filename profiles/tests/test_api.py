@@ -0,0 +1,94 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from profiles.models import Record, Room, Student, StudentRecord
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+    create_student,
+)
+
+
+class ApiTests(CacheTestCase):
+    rows = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        curriculum = create_curriculum()
+        professor = create_professor("professor")
+        cls.student = create_student("student")
+        for index in range(cls.rows):
+            record = create_record(
+                create_course("CS%d" % index, curriculum), professor, "S%d" % index
+            )
+            create_schedule(record, "R%d" % index, day=1 + index)
+            StudentRecord.objects.create(record=record, student=cls.student)
+        cls.record = Record.objects.order_by("pk").first()
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **headers)
+        return response, len(queries)
+
+    def test_queries_do_not_grow_with_the_page(self):
+        for name, queries in (("curricula", 2), ("records", 2)):
+            with self.subTest(name=name):
+                for limit in (1, self.rows):
+                    response, count = self.get(
+                        "%s?limit=%d" % (reverse("api:%s" % name), limit)
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(count, queries)
+
+    def test_catalog_endpoints_are_served_from_the_cache(self):
+        for name in ("courses", "sections"):
+            with self.subTest(name=name):
+                self.client.get(reverse("api:%s" % name))
+                for limit in (1, self.rows):
+                    response, count = self.get(
+                        "%s?limit=%d" % (reverse("api:%s" % name), limit)
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.json()["results"]), limit)
+                    self.assertEqual(count, 0)
+
+    def test_cursor_pagination(self):
+        url = "%s?limit=2" % reverse("api:records")
+        seen = []
+        while url:
+            page = self.client.get(url).json()
+            seen += [record["id"] for record in page["results"]]
+            url = page["next"]
+        self.assertEqual(
+            seen, list(Record.objects.order_by("pk").values_list("pk", flat=True))
+        )
+
+    def test_not_modified_without_queries(self):
+        url = reverse("api:records")
+        response, count = self.get(url)
+        response, count = self.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(count, 0)
+
+    def test_changes_invalidate_the_etag(self):
+        url = reverse("api:records")
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Room.objects.get(number="R0").save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_student_schedule_is_private(self):
+        url = reverse("api:student_schedule", args=[self.student.pk])
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(create_student("other").user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(Student.objects.get(pk=self.student.pk).user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["meetings"][0]["record"], self.record.pk)
@@ -0,0 +1,72 @@
+from profiles.audits import audit_students
+from profiles.models import StudentRecord
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_student,
+)
+
+
+class AuditTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # CS1 in the first term, CS2 requiring CS1 in the second, and CS3
+        # requiring CS2 in the second year.
+        cls.curriculum = create_curriculum()
+        professor = create_professor("professor")
+        cls.records = {}
+        previous = None
+        for code, year_level, academic_term in (
+            ("CS1", 1, 1),
+            ("CS2", 1, 2),
+            ("CS3", 2, 1),
+        ):
+            curriculum_course = create_course(
+                code, cls.curriculum, year_level=year_level, academic_term=academic_term
+            )
+            if previous is not None:
+                curriculum_course.course.prerequisites.add(previous)
+            previous = curriculum_course.course
+            cls.records[code] = create_record(curriculum_course, professor, "S0")
+        cls.student = create_student("student", cls.curriculum)
+
+    def pass_courses(self, *codes):
+        for code in codes:
+            StudentRecord.objects.create(
+                record=self.records[code], student=self.student, rating=90, remark="PSD"
+            )
+
+    def audit(self):
+        return audit_students([self.student.pk])[self.student.pk]
+
+    def test_ineligible_students(self):
+        self.pass_courses("CS1")
+        StudentRecord.objects.create(
+            record=self.records["CS2"], student=self.student, rating=70, remark="FLD"
+        )
+        audit = self.audit()
+        self.assertFalse(audit.eligible)
+        self.assertEqual(
+            (audit.units_required, audit.units_earned, audit.units_remaining),
+            (9, 3, 6),
+        )
+        self.assertEqual(audit.missing, {(1, 2): ["CS2"], (2, 1): ["CS3"]})
+        self.assertEqual(audit.blocked, ["CS3"])
+
+    def test_eligible_students(self):
+        self.pass_courses("CS1", "CS2", "CS3")
+        audit = self.audit()
+        self.assertTrue(audit.eligible)
+        self.assertEqual((audit.units_earned, audit.units_remaining), (9, 0))
+        self.assertEqual((audit.missing, audit.blocked), ({}, []))
+
+    def test_plans_follow_unit_changes(self):
+        self.pass_courses("CS1")
+        self.assertEqual(self.audit().units_required, 9)
+        course = self.records["CS3"].curriculum_course.course
+        course.units = 5
+        course.save()
+        self.assertEqual(self.audit().units_required, 11)
@@ -0,0 +1,37 @@
+from profiles.catalog import catalog_stats, get_catalog
+from profiles.models import Course, Room, Section
+from profiles.tests.utils import CacheTestCase, create_course
+
+
+class CatalogTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = create_course("CS1")
+        cls.prerequisite = create_course("CS0")
+        Section.objects.create(name="S0", is_open=True)
+
+    def test_snapshots_follow_changes(self):
+        course = self.course
+        with self.captureOnCommitCallbacks(execute=True):
+            course.prerequisites.add(self.prerequisite)
+        self.assertEqual(
+            get_catalog(Course)[course.pk]["prerequisites"], [self.prerequisite.pk]
+        )
+        with self.assertNumQueries(0):
+            get_catalog(Course)
+        with self.captureOnCommitCallbacks(execute=True):
+            course.title = "Renamed"
+            course.save()
+        self.assertEqual(get_catalog(Course)[course.pk]["title"], "Renamed")
+        with self.captureOnCommitCallbacks(execute=True):
+            course.delete()
+        self.assertNotIn(course.pk, get_catalog(Course))
+
+    def test_changes_only_invalidate_their_models(self):
+        get_catalog(Section)
+        with self.captureOnCommitCallbacks(execute=True):
+            Room.objects.create(number="R-new")
+        with self.assertNumQueries(0):
+            get_catalog(Section)
+        self.assertIn("R-new", [row["number"] for row in get_catalog(Room).values()])
+        self.assertGreater(catalog_stats()["profiles.section"]["hits"], 0)
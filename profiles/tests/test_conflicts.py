@@ -0,0 +1,115 @@
+from datetime import time
+from unittest import mock
+from django.core.exceptions import ValidationError
+from profiles import conflicts
+from profiles.conflicts import check_schedules
+from profiles.models import Room, Schedule
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+)
+
+
+class ConflictTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        curriculum = create_curriculum()
+        cls.professor = create_professor("professor")
+        cls.other = create_professor("other")
+        cls.room = Room.objects.create(number="R0")
+        cls.other_room = Room.objects.create(number="R1")
+        cls.record = create_record(
+            create_course("CS0", curriculum), cls.professor, "S0"
+        )
+        cls.other_record = create_record(
+            create_course("CS1", curriculum), cls.other, "S1"
+        )
+        create_schedule(cls.record, cls.room, start=8, end=10)
+
+    def proposed(self, record=None, room=None, professor=None, start=9, end=10):
+        record = record or self.other_record
+        return Schedule(
+            record=record,
+            room=room or self.other_room,
+            professor=professor or record.advisor,
+            day=1,
+            start_time=time(start),
+            end_time=time(end),
+        )
+
+    def kinds(self, *schedules):
+        return sorted(conflict.kind for conflict in check_schedules(schedules))
+
+    def test_overlaps_by_kind(self):
+        self.assertEqual(self.kinds(self.proposed()), [])
+        self.assertEqual(self.kinds(self.proposed(room=self.room)), ["room"])
+        self.assertEqual(
+            self.kinds(self.proposed(professor=self.professor)), ["professor"]
+        )
+        section = self.proposed(record=self.record, professor=self.other)
+        self.assertEqual(self.kinds(section), ["section"])
+        self.assertEqual(
+            self.kinds(self.proposed(room=self.room, professor=self.professor)),
+            ["professor", "room"],
+        )
+
+    def test_back_to_back_meetings_do_not_overlap(self):
+        self.assertEqual(
+            self.kinds(self.proposed(room=self.room, start=10, end=11)), []
+        )
+        self.assertEqual(self.kinds(self.proposed(room=self.room, start=7, end=8)), [])
+
+    def test_batches_conflict_with_themselves(self):
+        first = self.proposed(start=11, end=12)
+        second = self.proposed(room=self.room, start=11, end=13)
+        found = check_schedules([first, second])
+        self.assertEqual(
+            sorted(conflict.kind for conflict in found), ["professor", "section"]
+        )
+        for conflict in found:
+            self.assertIs(conflict.schedule, second)
+            self.assertIs(conflict.other, first)
+
+    def test_other_terms_are_ignored(self):
+        record = create_record(
+            self.other_record.curriculum_course,
+            self.professor,
+            self.record.section,
+            term=(2025, 2),
+        )
+        self.assertEqual(self.kinds(self.proposed(record=record, room=self.room)), [])
+
+    def test_clean_reports_conflicts(self):
+        with self.assertRaisesMessage(ValidationError, "room and professor schedule"):
+            self.proposed(room=self.room, professor=self.professor).full_clean()
+
+    def test_times_must_be_on_slot_boundaries(self):
+        # 10:00-10:02 and 10:03-10:30 do not overlap, but would share a slot.
+        schedule = self.proposed(start=10, end=11)
+        for start_time, end_time in (
+            (time(10, 3), time(10, 30)),
+            (time(10), time(10, 2)),
+            (time(10, 0, 30), time(10, 30)),
+        ):
+            with self.subTest(start_time=start_time, end_time=end_time):
+                schedule.start_time, schedule.end_time = start_time, end_time
+                with self.assertRaisesMessage(ValidationError, "multiple of 5"):
+                    schedule.full_clean()
+        schedule.start_time, schedule.end_time = time(10, 5), time(10, 30)
+        schedule.full_clean()
+
+    def test_save_does_not_check_a_cleaned_schedule_again(self):
+        schedule = self.proposed()
+        with mock.patch.object(
+            conflicts, "existing_schedules", wraps=conflicts.existing_schedules
+        ) as existing:
+            schedule.full_clean()
+            schedule.save()
+            self.assertEqual(existing.call_count, 1)
+            schedule.start_time = time(8)
+            schedule.save()
+            self.assertEqual(existing.call_count, 2)
@@ -0,0 +1,73 @@
+from io import StringIO
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from profiles.database import atomic_write
+from profiles.models import Room
+from profiles.rollover import roll_over
+from profiles.tests.utils import (
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+)
+
+
+class AtomicWriteTests(TransactionTestCase):
+    def begins(self, block):
+        with CaptureQueriesContext(connection) as queries:
+            with block():
+                Room.objects.exists()
+                with atomic_write():
+                    Room.objects.exists()
+        return [query["sql"] for query in queries if query["sql"].startswith("BEGIN")]
+
+    def test_only_write_paths_take_the_write_lock(self):
+        self.assertEqual(self.begins(atomic_write), ["BEGIN IMMEDIATE"])
+        self.assertEqual(self.begins(transaction.atomic), ["BEGIN"])
+        self.assertFalse(connection.begin_immediate)
+
+    def test_transaction_modes_are_checked(self):
+        options = connection.settings_dict["OPTIONS"]
+        options["transaction_mode"] = "LATER"
+        self.addCleanup(options.pop, "transaction_mode")
+        with self.assertRaisesMessage(ImproperlyConfigured, "transaction_mode"):
+            connection.get_connection_params()
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CATALOG_CACHE=None,
+)
+class WritePathTests(TransactionTestCase):
+    def test_write_paths_begin_immediate(self):
+        curriculum = create_curriculum()
+        professor = create_professor("professor")
+        create_schedule(
+            create_record(create_course("CS0", curriculum), professor, "S0"), "R0"
+        )
+        create_record(create_course("CS1", curriculum), professor, "S1", term=(2025, 2))
+        for name, write in (
+            ("roll_over", lambda: roll_over((2025, 1), (2026, 1))),
+            ("generate_timetable", lambda: self.call("generate_timetable", 2025, 2)),
+            ("rebuild_timetables", lambda: self.call("rebuild_timetables")),
+            ("rebuild_transcripts", lambda: self.call("rebuild_transcripts")),
+            ("rebuild_search_index", lambda: self.call("rebuild_search_index")),
+        ):
+            with self.subTest(name=name):
+                with CaptureQueriesContext(connection) as queries:
+                    write()
+                self.assertEqual(
+                    [
+                        query["sql"]
+                        for query in queries
+                        if query["sql"].startswith("BEGIN")
+                    ][:1],
+                    ["BEGIN IMMEDIATE"],
+                )
+
+    def call(self, name, *args):
+        call_command(name, *map(str, args), stdout=StringIO())
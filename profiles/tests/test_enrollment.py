@@ -0,0 +1,204 @@
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from accounts.models import CustomUser
+from profiles.enrollment import enroll, enroll_block
+from profiles.models import Record, Section, StudentRecord
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+    create_student,
+)
+
+
+class EnrollmentTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        curriculum = create_curriculum()
+        professor = create_professor("professor")
+        cls.record = create_record(
+            create_course("CS0", curriculum), professor, "S0", capacity=1
+        )
+        cls.other = create_record(create_course("CS1", curriculum), professor, "S0")
+        cls.students = [create_student("student%d" % index) for index in range(3)]
+
+    def assertEnrolled(self, record, count):
+        record.refresh_from_db()
+        self.assertEqual(record.enrolled_count, count)
+        self.assertEqual(record.studentrecord_set.count(), count)
+
+    def assertRejected(self, code, student, record_ids):
+        with self.assertRaises(ValidationError) as context:
+            enroll(student, record_ids)
+        self.assertEqual(context.exception.code, code)
+
+    def test_full_records_reject_the_seat(self):
+        enroll(self.students[0], [self.record.pk])
+        with self.assertRaises(ValidationError) as context:
+            enroll(self.students[1], [self.other.pk, self.record.pk])
+        self.assertEqual(context.exception.code, "full")
+        self.assertEnrolled(self.record, 1)
+        self.assertEnrolled(self.other, 0)
+
+    def test_seats_taken_since_the_check_are_not_sold_again(self):
+        # As if a concurrent enrollment took the last seat after clean().
+        student_record = StudentRecord(record=self.record, student=self.students[0])
+        student_record.full_clean()
+        Record.objects.filter(pk=self.record.pk).update(enrolled_count=1)
+        with self.assertRaises(ValidationError) as context:
+            student_record.save()
+        self.assertEqual(context.exception.code, "full")
+        self.assertFalse(StudentRecord.objects.exists())
+
+    def test_moving_a_student_record_moves_the_seat(self):
+        student_record = StudentRecord.objects.create(
+            record=self.other, student=self.students[0]
+        )
+        student_record.record = self.record
+        student_record.save()
+        self.assertEnrolled(self.record, 1)
+        self.assertEnrolled(self.other, 0)
+        student_record = StudentRecord.objects.create(
+            record=self.other, student=self.students[1]
+        )
+        student_record.record = self.record
+        with self.assertRaisesMessage(ValidationError, "already full"):
+            student_record.full_clean()
+        with self.assertRaisesMessage(ValidationError, "already full"):
+            student_record.save()
+        self.assertEnrolled(self.record, 1)
+        self.assertEnrolled(self.other, 1)
+        StudentRecord.objects.get(student=self.students[1]).delete()
+        self.assertEnrolled(self.other, 0)
+
+    def test_clashes_and_duplicates_are_rejected(self):
+        # Records of other professors and sections, meeting 8-10, 9-11 and
+        # 10-11 on Mondays.
+        records = []
+        for index, (start, end) in enumerate(((8, 10), (9, 11), (10, 11))):
+            record = create_record(
+                self.other.curriculum_course,
+                create_professor("other%d" % index),
+                "T%d" % index,
+            )
+            create_schedule(record, "R%d" % index, start=start, end=end)
+            records.append(record.pk)
+        student = self.students[0]
+        # With each other, then with the student's timetable.
+        self.assertRejected("clash", student, records[:2])
+        enroll(student, records[:1])
+        self.assertRejected("clash", student, records[1:2])
+        self.assertRejected("duplicate", student, records[:1])
+        enroll(student, records[2:])
+        self.assertEqual(
+            sorted(student.studentrecord_set.values_list("record", flat=True)),
+            [records[0], records[2]],
+        )
+
+    def test_admin_inlines_respect_the_capacity(self):
+        admin = CustomUser.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            contact_number="admin",
+            password="password",
+        )
+        self.client.force_login(admin)
+        data = {
+            "academic_year": 2025,
+            "academic_term": 1,
+            "curriculum_course": self.record.curriculum_course_id,
+            "advisor": self.record.advisor_id,
+            "section": self.record.section_id,
+            "capacity": 1,
+        }
+        for prefix in ("schedule_set", "studentrecord_set"):
+            data.update(
+                {
+                    "%s-TOTAL_FORMS" % prefix: 0,
+                    "%s-INITIAL_FORMS" % prefix: 0,
+                    "%s-MIN_NUM_FORMS" % prefix: 0,
+                    "%s-MAX_NUM_FORMS" % prefix: 1000,
+                }
+            )
+        for index, student in enumerate(self.students[:2]):
+            data["studentrecord_set-%d-record" % index] = self.record.pk
+            data["studentrecord_set-%d-student" % index] = student.pk
+        url = reverse("admin:profiles_record_change", args=[self.record.pk])
+        response = self.client.post(url, {**data, "studentrecord_set-TOTAL_FORMS": 2})
+        self.assertContains(response, "no room for 2 more students")
+        self.assertEnrolled(self.record, 0)
+        response = self.client.post(url, {**data, "studentrecord_set-TOTAL_FORMS": 1})
+        self.assertEqual(response.status_code, 302)
+        self.assertEnrolled(self.record, 1)
+        response = self.client.post(
+            reverse("admin:profiles_studentrecord_add"),
+            {"record": self.record.pk, "student": self.students[2].pk},
+        )
+        self.assertContains(response, "already full")
+        self.assertEnrolled(self.record, 1)
+
+
+class BlockEnrollmentTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        curriculum = create_curriculum()
+        professor = create_professor("professor")
+        other = create_professor("other")
+        course = create_course("CS0", curriculum)
+        cls.students = [create_student("student%d" % index) for index in range(4)]
+        # Two sections meeting at the same time, student0 in the first and
+        # student1 and student2 in the second.
+        record = create_record(course, professor, "S1")
+        create_schedule(record, "R1")
+        StudentRecord.objects.create(record=record, student=cls.students[0])
+        record = create_record(course, other, "S2")
+        create_schedule(record, "R2")
+        for student in cls.students[1:3]:
+            StudentRecord.objects.create(record=record, student=student)
+        cls.section = Section.objects.create(name="BLK", is_open=False)
+        cls.records = []
+        for code, hour in (("CS1", 8), ("CS2", 9)):
+            record = create_record(
+                create_course(code, curriculum), professor, cls.section, capacity=3
+            )
+            create_schedule(record, "R1", day=2, start=hour, end=hour + 1)
+            cls.records.append(record)
+
+    def test_enroll_block(self):
+        progress = []
+        enroll_block(self.section, self.students[:1], 2025, 1)
+        created = enroll_block(
+            self.section,
+            self.students[:3],
+            2025,
+            1,
+            batch_size=3,
+            progress=lambda *args: progress.append(args),
+        )
+        self.assertEqual(created, 4)
+        self.assertEqual(progress, [(3, 4), (4, 4)])
+        for record in self.records:
+            record.refresh_from_db()
+            self.assertEqual(record.enrolled_count, 3)
+            self.assertEqual(record.studentrecord_set.count(), 3)
+        timetable = self.students[1].timetables.get()
+        self.assertEqual(len(timetable.meetings), 3)
+        with self.assertRaisesMessage(ValidationError, "no room"):
+            enroll_block(self.section, self.students[3:], 2025, 1)
+
+    def test_nothing_is_written_on_clashes(self):
+        with self.assertRaises(ValidationError) as context:
+            enroll_block(Section.objects.get(name="S2"), self.students[:3], 2025, 1)
+        self.assertEqual(context.exception.code, "clash")
+        self.assertEqual(Record.objects.get(section__name="S2").enrolled_count, 2)
+        self.assertFalse(
+            StudentRecord.objects.filter(
+                record__section__name="S2", student=self.students[0]
+            ).exists()
+        )
+        self.section.is_open = True
+        with self.assertRaisesMessage(ValidationError, "Only block sections"):
+            enroll_block(self.section, self.students, 2025, 1)
@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from profiles.grading import parse_grade
+from profiles.models import StudentRecord, Transcript
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_student,
+)
+
+
+class ParseGradeTests(SimpleTestCase):
+    def test_remarks_are_derived_from_ratings(self):
+        for value, expected in (
+            (75, (75, "PSD")),
+            ("100", (100, "PSD")),
+            (74.5, (74.5, "FLD")),
+            (" drp ", (0, "DRP")),
+            ("INC", (0, "INC")),
+            ("", (None, None)),
+            (None, (None, None)),
+        ):
+            with self.subTest(value=value):
+                self.assertEqual(parse_grade(value), expected)
+
+    def test_invalid_grades(self):
+        for value in (0, 101, "PSD", True, [90]):
+            with self.subTest(value=value), self.assertRaises(ValidationError):
+                parse_grade(value)
+
+
+class GradingTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = create_professor("professor")
+        cls.record = create_record(
+            create_course("CS0", create_curriculum()), cls.professor, "S0"
+        )
+        cls.students = [create_student("student%d" % index) for index in range(2)]
+        for student in cls.students:
+            StudentRecord.objects.create(record=cls.record, student=student)
+
+    def grade(self, grades):
+        return self.client.post(
+            reverse("profiles:grade_record", args=[self.record.pk]),
+            {"grades": grades},
+            content_type="application/json",
+        )
+
+    def grades(self):
+        return list(
+            StudentRecord.objects.order_by("student").values_list("rating", "remark")
+        )
+
+    def test_only_the_professor_grades_the_record(self):
+        grades = [{"student": self.students[0].pk, "grade": 90}]
+        self.assertEqual(self.grade(grades).status_code, 401)
+        self.client.force_login(create_professor("other").user)
+        self.assertEqual(self.grade(grades).status_code, 403)
+        self.client.force_login(self.professor.user)
+        response = self.grade(grades)
+        self.assertEqual(response.json(), {"updated": 1})
+        self.assertEqual(self.grades(), [(90, "PSD"), (None, None)])
+
+    def test_grades(self):
+        self.client.force_login(self.professor.user)
+        response = self.grade(
+            [
+                {"student": self.students[0].pk, "grade": 70},
+                {"student": self.students[1].pk, "grade": "inc"},
+            ]
+        )
+        self.assertEqual(response.json(), {"updated": 2})
+        self.assertEqual(self.grades(), [(70, "FLD"), (0, "INC")])
+        self.assertEqual(
+            Transcript.objects.get(student=self.students[0]).units_attempted, 3
+        )
+        # A missing grade is an error, an explicit null clears it.
+        response = self.grade([{"student": self.students[0].pk}])
+        self.assertEqual(response.status_code, 400)
+        response = self.grade([{"student": self.students[0].pk, "grade": None}])
+        self.assertEqual(response.json(), {"updated": 1})
+        self.assertEqual(self.grades(), [(None, None), (0, "INC")])
+        response = self.grade(
+            [
+                {"student": self.students[0].pk, "grade": 101},
+                {"student": self.students[1].pk, "grade": 90},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.grades(), [(None, None), (0, "INC")])
+
+    def import_grades(self, rows, *args):
+        file, path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(file, "w") as file:
+            file.write("\n".join(json.dumps(row) for row in rows))
+        self.addCleanup(os.remove, path)
+        output, errors = StringIO(), StringIO()
+        call_command("import_grades", path, *args, stdout=output, stderr=errors)
+        return output.getvalue(), errors.getvalue()
+
+    def test_import_grades(self):
+        rows = [
+            {"record": self.record.pk, "student_username": "student0", "grade": 80},
+            {"record": self.record.pk, "student_username": "student1", "grade": "DRP"},
+        ]
+        output, errors = self.import_grades(rows, "--dry-run")
+        self.assertEqual(output, "Would change 2 of 2 grades.\n")
+        self.assertEqual(self.grades(), [(None, None), (None, None)])
+        output, errors = self.import_grades(rows)
+        self.assertEqual(output, "Changed 2 of 2 grades.\n")
+        self.assertEqual(self.grades(), [(80, "PSD"), (0, "DRP")])
+        rows = [
+            {"record": self.record.pk, "student_username": "student0", "grade": 60},
+            {"record": self.record.pk, "student_username": "nobody", "grade": 90},
+            {"record": self.record.pk, "student_username": "student1", "grade": 0},
+        ]
+        with self.assertRaisesMessage(CommandError, "2 problems"):
+            self.import_grades(rows)
+        self.assertEqual(self.grades(), [(80, "PSD"), (0, "DRP")])
@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from profiles.models import Room, Schedule
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+)
+
+
+class ImportSchedulesTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        curriculum = create_curriculum()
+        professor = create_professor("professor")
+        for code in ("CS0", "CS1"):
+            create_record(create_course(code, curriculum), professor, "S0")
+        Room.objects.create(number="R0")
+        Room.objects.create(number="R1")
+        create_schedule(
+            create_record(create_course("CS2", curriculum), professor, "S1"),
+            "R1",
+            day=2,
+        )
+
+    def row(self, course, room, day, start, end):
+        return {
+            "academic_year": 2025,
+            "academic_term": 1,
+            "course": course,
+            "section": "S0",
+            "room": room,
+            "professor": "professor",
+            "day": day,
+            "start_time": start,
+            "end_time": end,
+        }
+
+    def import_rows(self, rows, *args):
+        file, path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(file, "w") as file:
+            file.write("\n".join(json.dumps(row) for row in rows))
+        self.addCleanup(os.remove, path)
+        output, errors = StringIO(), StringIO()
+        call_command(
+            "import_schedules",
+            path,
+            "--batch-size=1",
+            *args,
+            stdout=output,
+            stderr=errors
+        )
+        return output.getvalue(), errors.getvalue()
+
+    def test_conflicting_and_malformed_rows_are_reported(self):
+        rows = [
+            self.row("CS0", "R0", "Monday", "08:00", "09:00"),
+            # The section and professor are taken by the row above.
+            self.row("CS1", "R1", 1, "08:30", "10:00"),
+            # The professor is taken by a saved schedule.
+            self.row("CS1", "R1", 2, "08:00", "09:00"),
+            self.row("CS1", "R1", "Someday", "10:00", "11:00"),
+            self.row("CS1", "R1", 3, "11:00", "10:00"),
+            self.row("CS1", "R1", 1, "09:00", "10:00"),
+            self.row("CS1", "R1", 4, "10:03", "10:30"),
+        ]
+        for args in (["--dry-run"], []):
+            with self.subTest(args=args):
+                output, errors = self.import_rows(rows, *args)
+                self.assertIn("2 of 7 schedules, 5 rejected.", output)
+                # A dry run saves nothing, so the earlier row is named by
+                # its line.
+                earlier = "line 1" if args else "schedule #"
+                self.assertIn("line 2: professor conflict with %s" % earlier, errors)
+                self.assertIn("line 2: section conflict with %s" % earlier, errors)
+                self.assertRegex(errors, r"line 3: professor conflict with schedule #")
+                self.assertIn("line 4: Unknown day 'Someday'.", errors)
+                self.assertIn("line 5: Invalid time frame.", errors)
+                self.assertIn("line 7: Times must be on a multiple of 5", errors)
+        self.assertEqual(
+            sorted(
+                Schedule.objects.filter(record__section__name="S0").values_list(
+                    "day", "start_time__hour"
+                )
+            ),
+            [(1, 8), (1, 9)],
+        )
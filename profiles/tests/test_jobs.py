@@ -0,0 +1,126 @@
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import CustomUser
+from profiles import workers
+from profiles.jobs import JOBS, Heartbeat, claim, enqueue, requeue_stale, work
+from profiles.models import Job, StudentRecord
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_student,
+)
+
+
+def crash(pk):
+    # Run in a pool process in place of workers.run_job(), which it kills.
+    os._exit(1)
+
+
+@override_settings(JOBS_DIR=tempfile.mkdtemp())
+class JobTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            contact_number="admin",
+            password="password",
+        )
+        record = create_record(
+            create_course("CS0", create_curriculum()),
+            create_professor("professor"),
+            "S0",
+        )
+        StudentRecord.objects.create(record=record, student=create_student("student"))
+
+    def test_export_job(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("profiles:export", args=["class-lists"]), {"academic_year": 2025}
+        )
+        self.assertEqual(response.status_code, 202)
+        work(once=True)
+        data = self.client.get(response.json()["url"]).json()
+        self.assertEqual(data["status"], Job.SUCCEEDED)
+        response = self.client.get(data["file"])
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="class-lists-2025.csv"',
+        )
+        self.assertIn(b"student", b"".join(response.streaming_content))
+        response = self.client.get(reverse("admin:profiles_job_changelist"))
+        self.assertContains(response, "export_records")
+
+    def test_failed_jobs_are_retried(self):
+        calls = []
+
+        def flaky(run, fail_times):
+            calls.append(1)
+            run.progress(len(calls), 2)
+            if len(calls) <= fail_times:
+                raise RuntimeError("Try again.")
+            return {"calls": len(calls)}
+
+        with mock.patch.dict(JOBS, {"flaky": flaky}):
+            job = enqueue("flaky", {"fail_times": 1})
+            work(once=True)
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.QUEUED)
+            self.assertIn("Try again.", job.error)
+            Job.objects.update(run_after=job.created_at)
+            work(once=True)
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.SUCCEEDED)
+            self.assertEqual((job.attempts, job.result), (2, {"calls": 2}))
+            self.assertEqual((job.progress_done, job.progress_total), (2, 2))
+            job = enqueue("flaky", {"fail_times": 5}, max_attempts=2)
+            for attempt in range(2):
+                Job.objects.update(run_after=job.created_at)
+                work(once=True)
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.FAILED)
+            job = enqueue("flaky", {"unknown": 1})
+            work(once=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+
+    def test_jobs_without_recent_heartbeats_are_requeued(self):
+        with mock.patch.dict(JOBS, {"noop": lambda run: None}):
+            alive, lost = enqueue("noop"), enqueue("noop")
+            doomed = enqueue("noop", max_attempts=1)
+        for job in (alive, lost, doomed):
+            self.assertEqual(claim("worker"), job.pk)
+        long_ago = timezone.now() - timedelta(hours=1)
+        Job.objects.update(heartbeat_at=long_ago)
+        heartbeat = Heartbeat(1)
+        heartbeat.jobs.add(alive.pk)
+        heartbeat.beat()
+        self.assertEqual(requeue_stale(), 2)
+        self.assertEqual(
+            dict(Job.objects.values_list("pk", "status")),
+            {alive.pk: Job.RUNNING, lost.pk: Job.QUEUED, doomed.pk: Job.FAILED},
+        )
+        self.assertGreater(Job.objects.get(pk=alive.pk).heartbeat_at, long_ago)
+        lost.refresh_from_db()
+        self.assertGreater(lost.run_after, timezone.now())
+        self.assertIn("heartbeats", lost.error)
+
+    def test_dead_pool_processes_do_not_stop_the_worker(self):
+        with mock.patch.dict(JOBS, {"noop": lambda run: None}):
+            retried = enqueue("noop")
+            doomed = enqueue("noop", max_attempts=1)
+        with mock.patch.object(workers, "run_job", crash):
+            work(concurrency=2, once=True)
+        retried.refresh_from_db()
+        doomed.refresh_from_db()
+        self.assertEqual((retried.status, doomed.status), (Job.QUEUED, Job.FAILED))
+        self.assertGreater(retried.run_after, timezone.now())
+        self.assertIn("worker process died", retried.error)
@@ -0,0 +1,89 @@
+from datetime import time
+from django.urls import reverse
+from profiles.models import Record, Room, Schedule
+from profiles.occupancy import free_rooms, get_grid, utilization
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+)
+from profiles.versions import touch
+
+
+class OccupancyTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        curriculum = create_curriculum()
+        for index in range(2):
+            record = create_record(
+                create_course("CS%d" % index, curriculum),
+                create_professor("professor%d" % index),
+                "S%d" % index,
+            )
+            create_schedule(record, "R%d" % index)
+        Room.objects.create(number="R2")
+
+    def free_numbers(self, *args, **kwargs):
+        return [room["number"] for room in free_rooms(2025, 1, *args, **kwargs)]
+
+    def test_free_rooms_follow_schedule_changes(self):
+        self.assertEqual(self.free_numbers(1, 8 * 60 + 30, 9 * 60), ["R2"])
+        self.assertEqual(self.free_numbers(1, 9 * 60, 10 * 60), ["R0", "R1", "R2"])
+        with self.assertNumQueries(0):
+            self.free_numbers(2, 10 * 60, 11 * 60 + 30)
+        schedule = Schedule.objects.get(room__number="R0")
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.day = 2
+            schedule.start_time = time(10)
+            schedule.end_time = time(11, 30)
+            schedule.save()
+        self.assertEqual(self.free_numbers(1, 8 * 60, 9 * 60), ["R0", "R2"])
+        self.assertNotIn("R0", self.free_numbers(2, 11 * 60, 12 * 60))
+        with self.captureOnCommitCallbacks(execute=True):
+            Room.objects.filter(number="R0").update(building="Main", capacity=40)
+            touch(Room)
+        self.assertEqual(self.free_numbers(1, 8 * 60, 9 * 60, min_capacity=30), ["R0"])
+        self.assertEqual(self.free_numbers(1, 8 * 60, 9 * 60, min_capacity=50), [])
+        self.assertEqual(self.free_numbers(1, 8 * 60, 9 * 60, building="Main"), ["R0"])
+
+    def test_grids_follow_changes_of_their_term_only(self):
+        other_term = get_grid(2025, 2)
+        grid = get_grid(2025, 1)
+        schedule = Schedule.objects.get(room__number="R0")
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.start_time = time(9)
+            schedule.end_time = time(10)
+            schedule.save()
+        with self.assertNumQueries(0):
+            self.assertIs(get_grid(2025, 2), other_term)
+        self.assertIsNot(get_grid(2025, 1), grid)
+        self.assertEqual(self.free_numbers(1, 8 * 60, 9 * 60), ["R0", "R2"])
+        record = Record.objects.get(pk=schedule.record_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            record.academic_term = 2
+            record.save()
+        self.assertEqual(self.free_numbers(1, 9 * 60, 10 * 60), ["R0", "R1", "R2"])
+        self.assertEqual(
+            [room["number"] for room in free_rooms(2025, 2, 1, 9 * 60, 10 * 60)],
+            ["R1", "R2"],
+        )
+
+    def test_utilization(self):
+        rooms = utilization(2025, 1)
+        self.assertEqual([room["slots"] for room in rooms], [12, 12, 0])
+        (department,) = utilization(2025, 1, group="department")
+        self.assertEqual(department["title"], "Computer Science")
+        self.assertEqual(department["slots"], 24)
+        response = self.client.get(
+            reverse("api:room_heatmap"), {"academic_year": 2025, "academic_term": 1}
+        )
+        self.assertEqual(
+            response.json()["peak"][0], {"day": 1, "hour": 8, "utilization": 0.6667}
+        )
+        response = self.client.get(
+            reverse("api:free_rooms"), {"academic_year": 2025, "day": 1}
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,113 @@
+from unittest import mock
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from profiles import prerequisites
+from profiles.forms import CourseForm
+from profiles.models import StudentRecord
+from profiles.prerequisites import (
+    GRAPH_TABLES,
+    CourseGraph,
+    get_graph,
+    is_eligible,
+    next_courses,
+)
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_student,
+)
+from profiles.versions import table_versions
+
+
+class PrerequisiteTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # CS3 requires CS2, which requires CS1. CS4 requires nothing.
+        cls.courses = {code: create_course(code) for code in ("CS1", "CS2", "CS3")}
+        cls.courses["CS2"].prerequisites.add(cls.courses["CS1"])
+        cls.courses["CS3"].prerequisites.add(cls.courses["CS2"])
+        cls.courses["CS4"] = create_course("CS4")
+        cls.curriculum = create_curriculum()
+        cls.professor = create_professor("professor")
+        cls.student = create_student("student", cls.curriculum)
+
+    def pass_course(self, code):
+        curriculum_course = self.curriculum.curriculumcourse_set.create(
+            course=self.courses[code], year_level=1, academic_term=1
+        )
+        StudentRecord.objects.create(
+            record=create_record(curriculum_course, self.professor, "S1"),
+            student=self.student,
+            rating=90,
+            remark="PSD",
+        )
+
+    def test_cycles_are_rejected_by_the_signal(self):
+        for course, related, prerequisite in (
+            ("CS1", "prerequisites", "CS3"),
+            ("CS3", "course_set", "CS1"),
+            ("CS1", "prerequisites", "CS1"),
+        ):
+            with self.subTest(course=course, related=related):
+                with self.assertRaisesMessage(
+                    ValidationError, "cannot form a cycle"
+                ), transaction.atomic():
+                    getattr(self.courses[course], related).add(
+                        self.courses[prerequisite]
+                    )
+        self.assertFalse(self.courses["CS1"].prerequisites.exists())
+
+    def test_cycles_are_rejected_by_the_form(self):
+        course = self.courses["CS1"]
+        data = {"code": course.code, "title": course.title, "units": 3}
+        form = CourseForm(
+            {**data, "prerequisites": [self.courses["CS3"].pk]}, instance=course
+        )
+        self.assertIn("prerequisite of itself", str(form.errors["prerequisites"]))
+        form = CourseForm(
+            {**data, "prerequisites": [self.courses["CS4"].pk]}, instance=course
+        )
+        self.assertTrue(form.is_valid())
+
+    def test_eligibility_is_transitive(self):
+        self.assertFalse(is_eligible(self.student, self.courses["CS3"]))
+        self.pass_course("CS2")
+        self.assertFalse(is_eligible(self.student, self.courses["CS3"]))
+        self.pass_course("CS1")
+        self.assertTrue(is_eligible(self.student, self.courses["CS3"]))
+        self.assertTrue(is_eligible(self.student, self.courses["CS4"]))
+        self.assertFalse(get_graph().is_eligible(0, set()))
+
+    def test_next_courses(self):
+        self.assertEqual(
+            [course.code for course in next_courses(self.student)], ["CS1", "CS4"]
+        )
+        self.pass_course("CS1")
+        self.assertEqual(
+            [course.code for course in next_courses(self.student)], ["CS2", "CS4"]
+        )
+
+    def test_graphs_follow_changes_made_elsewhere(self):
+        stale = (table_versions(GRAPH_TABLES), CourseGraph.load())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.courses["CS4"].prerequisites.add(self.courses["CS1"])
+        # Another process still holds the graph from before the change.
+        with mock.patch.object(prerequisites, "_graph", stale):
+            self.assertEqual(
+                get_graph().prerequisites_of(self.courses["CS4"].pk),
+                {self.courses["CS1"].pk},
+            )
+
+    def test_graphs_of_rolled_back_changes_are_not_kept(self):
+        # set() removes CS1 before adding CS3, which the signal rejects.
+        with self.assertRaisesMessage(
+            ValidationError, "cannot form a cycle"
+        ), transaction.atomic():
+            self.courses["CS2"].prerequisites.set([self.courses["CS3"]])
+        self.assertEqual(
+            get_graph().prerequisites_of(self.courses["CS3"].pk),
+            {self.courses["CS1"].pk, self.courses["CS2"].pk},
+        )
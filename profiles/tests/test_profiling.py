@@ -0,0 +1,56 @@
+from django.test import override_settings
+from django.urls import reverse
+from accounts.models import CustomUser
+from profiles.profiling import fingerprint
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+    create_user,
+)
+
+
+@override_settings(PROFILING_METRICS_VIEW=True)
+class ProfilingTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            contact_number="admin",
+            password="password",
+        )
+        cls.record = create_record(
+            create_course("CS0", create_curriculum()),
+            create_professor("professor"),
+            "S0",
+        )
+
+    def test_fingerprints_ignore_in_list_lengths(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s) LIMIT 21'),
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s) LIMIT 21'),
+        )
+
+    def test_requests_are_timed(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("admin:profiles_record_changelist"))
+        self.assertIn("sql;dur=", response["Server-Timing"])
+        with self.captureOnCommitCallbacks(execute=True):
+            create_schedule(self.record, "R0")
+        metrics = self.client.get(reverse("profiles:profiling_metrics")).json()
+        self.assertIn("admin:profiles_record_changelist", metrics["views"])
+        self.assertGreater(metrics["spans"]["schedule.save"]["calls"], 0)
+
+    def test_metrics_are_for_staff_only(self):
+        url = reverse("profiles:profiling_metrics")
+        # Test requests come from 127.0.0.1, like those of a local proxy.
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(create_user("student"))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.admin)
+        with self.settings(PROFILING_METRICS_VIEW=False):
+            self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,50 @@
+from profiles.models import Record
+from profiles.rollover import plan_rollover, roll_over
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+)
+
+
+class RolloverTests(CacheTestCase):
+    rows = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        curriculum = create_curriculum()
+        cls.professors = []
+        for index in range(cls.rows):
+            professor = create_professor("professor%d" % index)
+            record = create_record(
+                create_course("CS%d" % index, curriculum), professor, "S%d" % index
+            )
+            create_schedule(record, "R%d" % index)
+            cls.professors.append(professor)
+
+    def test_roll_over(self):
+        with self.assertNumQueries(4):
+            rollover = plan_rollover((2025, 1), (2026, 1))
+        self.assertEqual(len(rollover.records), self.rows)
+        self.assertEqual(len(rollover.schedules), self.rows)
+        roll_over((2025, 1), (2026, 1))
+        record = Record.objects.get(academic_year=2026, section__name="S0")
+        self.assertEqual(record.advisor, self.professors[0])
+        self.assertEqual(record.schedule_set.get().room.number, "R0")
+        rollover = plan_rollover((2025, 1), (2026, 1))
+        self.assertEqual({change.action for change in rollover.changes}, {"exists"})
+
+    def test_conflicts_skip_whole_records(self):
+        professors = [professor.pk for professor in self.professors]
+        rollover = roll_over(
+            (2025, 1), (2026, 1), advisors={professors[1]: professors[0]}
+        )
+        change = rollover.changes[1]
+        self.assertEqual((change.action, change.detail), ("conflict", "professor"))
+        self.assertEqual(len(rollover.records), self.rows - 1)
+        self.assertFalse(
+            Record.objects.filter(academic_year=2026, section__name="S1").exists()
+        )
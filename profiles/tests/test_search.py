@@ -0,0 +1,74 @@
+from unittest import mock
+from django.urls import reverse
+from accounts.models import CustomUser
+from profiles import signals
+from profiles.models import SearchToken, StudentRecord
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_student,
+)
+
+
+class SearchTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        curriculum = create_curriculum()
+        professor = create_professor("professor")
+        cls.records = [
+            create_record(create_course(code, curriculum), professor, "S0")
+            for code in ("CS0", "CS1")
+        ]
+        cls.student_records = [
+            StudentRecord.objects.create(
+                record=cls.records[0], student=create_student(username)
+            )
+            for username in ("alice", "bob")
+        ]
+
+    def test_admin_search_matches_word_prefixes(self):
+        admin = CustomUser.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            contact_number="admin",
+            password="password",
+        )
+        self.client.force_login(admin)
+        url = reverse("admin:profiles_studentrecord_changelist")
+        for query, expected in (
+            ("ali", ["alice"]),
+            ("COMP sci", ["alice", "bob"]),
+            ("bob cs0", ["bob"]),
+            ("lice", []),
+            ("alice bob", []),
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(url, {"q": query})
+                self.assertEqual(
+                    sorted(
+                        student_record.student.user.username
+                        for student_record in response.context["cl"].result_list
+                    ),
+                    expected,
+                )
+
+    def test_only_indexed_relations_reindex_a_row(self):
+        student_record = self.student_records[0]
+        with mock.patch.object(signals, "index_objects") as index_objects:
+            student_record.rating = 90
+            student_record.remark = "PSD"
+            student_record.save()
+            student_record.save(update_fields=["rating"])
+        index_objects.assert_not_called()
+        student_record.record = self.records[1]
+        student_record.save()
+        self.assertTrue(
+            SearchToken.objects.filter(
+                model="profiles.studentrecord",
+                object_id=student_record.pk,
+                token="cs1",
+            ).exists()
+        )
@@ -0,0 +1,47 @@
+from django.test import SimpleTestCase
+from profiles.bitmaps import span_mask
+from profiles.timetable import Problem, Task, search
+
+
+class SolverTests(SimpleTestCase):
+    # Three 3-unit courses of one professor and section, meeting twice a
+    # week for 90 minutes on days 1 and 3, at one of four start times from
+    # 8:00 to 12:30. The professor is busy at 8:00 on day 1 and room 1
+    # all of day 3, so the only solution puts every course in room 2 at one
+    # of the three later start times.
+    problem = Problem(
+        tasks=[Task(record, 1, 1, 180) for record in (1, 2, 3)],
+        rooms=[1, 2],
+        busy={
+            ("professor", 1): span_mask(1, 480, 570),
+            ("room", 1): span_mask(3, 0, 24 * 60),
+        },
+        days=3,
+        day_start=480,
+        day_end=840,
+        step=90,
+    )
+
+    def test_small_problems_are_placed_without_conflicts(self):
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                solution = search(self.problem, seed=seed)
+                self.assertEqual(solution.unplaced, [])
+                self.assertEqual(
+                    sorted(placement.record for placement in solution.placements),
+                    [1, 2, 3],
+                )
+                busy = dict(self.problem.busy)
+                for placement in solution.placements:
+                    self.assertEqual(placement.days, (1, 3))
+                    self.assertEqual(placement.end - placement.start, 90)
+                    mask = 0
+                    for day in placement.days:
+                        mask |= span_mask(day, placement.start, placement.end)
+                    for key in (
+                        ("room", placement.room),
+                        ("professor", placement.professor),
+                        ("section", 1),
+                    ):
+                        self.assertFalse(busy.get(key, 0) & mask, key)
+                        busy[key] = busy.get(key, 0) | mask
@@ -0,0 +1,69 @@
+from unittest import mock
+from profiles import signals
+from profiles.models import StudentRecord, Transcript
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_student,
+)
+
+
+class TranscriptTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.curriculum = create_curriculum()
+        professor = create_professor("professor")
+        cls.student = create_student("student", cls.curriculum)
+        cls.records = [
+            create_record(
+                create_course(code, cls.curriculum, units=units), professor, "S0"
+            )
+            for code, units in (("CS0", 3), ("CS1", 2), ("CS2", 4))
+        ]
+
+    def grade(self, record, rating, remark):
+        return StudentRecord.objects.create(
+            record=record, student=self.student, rating=rating, remark=remark
+        )
+
+    def test_ratings_are_weighted_by_units(self):
+        self.grade(self.records[0], 90, "PSD")
+        self.grade(self.records[1], 70, "FLD")
+        self.grade(self.records[2], 0, "DRP")
+        transcript = Transcript.objects.get(student=self.student)
+        self.assertEqual(transcript.units_attempted, 5)
+        self.assertEqual(transcript.units_earned, 3)
+        self.assertEqual(transcript.weighted_rating, 82)
+        self.assertEqual(
+            (transcript.passed, transcript.failed, transcript.dropped), (1, 1, 1)
+        )
+
+    def test_regrading_and_unit_changes_update_the_transcript(self):
+        student_record = self.grade(self.records[0], 80, "PSD")
+        self.grade(self.records[1], 90, "PSD")
+        student_record.rating = 70
+        student_record.remark = "FLD"
+        student_record.save(update_fields=["rating", "remark"])
+        transcript = Transcript.objects.get(student=self.student)
+        self.assertEqual(transcript.units_earned, 2)
+        self.assertEqual(transcript.weighted_rating, 78)
+        course = self.records[0].curriculum_course.course
+        course.units = 1
+        course.save()
+        transcript.refresh_from_db()
+        self.assertEqual(transcript.units_attempted, 3)
+        self.assertEqual(transcript.weighted_rating, 250 / 3)
+
+    def test_other_changes_leave_transcripts_alone(self):
+        student_record = self.grade(self.records[0], 80, "PSD")
+        course = self.records[0].curriculum_course.course
+        with mock.patch.object(signals, "refresh_transcripts") as refresh:
+            student_record.save()
+            student_record.rating = 85
+            student_record.save(update_fields=["record"])
+            course.title = "Renamed"
+            course.save()
+        refresh.assert_not_called()
@@ -0,0 +1,73 @@
+from asgiref.sync import sync_to_async
+from django.urls import reverse
+from profiles.models import Student, StudentRecord
+from profiles.tests.utils import (
+    CacheTestCase,
+    create_course,
+    create_curriculum,
+    create_professor,
+    create_record,
+    create_schedule,
+    create_student,
+)
+
+
+class AsyncViewTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        curriculum = create_curriculum()
+        professor = create_professor("professor")
+        record = create_record(create_course("CS0", curriculum), professor, "S0")
+        create_schedule(record, "R0")
+        StudentRecord.objects.create(record=record, student=create_student("student"))
+        cls.record = create_record(create_course("CS1", curriculum), professor, "S0")
+
+    async def test_schedule(self):
+        url = reverse("profiles:my_schedule")
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+        student = await Student.objects.select_related("user").aget(
+            user__username="student"
+        )
+        await sync_to_async(self.async_client.force_login)(student.user)
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["meetings"]), 1)
+
+    async def test_enroll_expects_a_list_of_record_ids(self):
+        url = reverse("profiles:enroll")
+        student = await Student.objects.select_related("user").aget(
+            user__username="student"
+        )
+        await sync_to_async(self.async_client.force_login)(student.user)
+        for body in (
+            {"records": str(self.record.pk)},
+            {"records": [str(self.record.pk)]},
+            {"records": [True]},
+            {},
+            [self.record.pk],
+            "not JSON",
+        ):
+            with self.subTest(body=body):
+                response = await self.async_client.post(
+                    url, body, content_type="application/json"
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(await student.studentrecord_set.acount(), 1)
+
+
+class ExportViewTests(CacheTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = create_professor("professor")
+
+    def test_filenames_are_slugified(self):
+        self.client.force_login(self.professor.user)
+        response = self.client.get(
+            reverse("profiles:export", args=["grades"]),
+            {"academic_year": 2025, "section": 'S0"; x=\r\n1', "course": "CS 101"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="grades-2025-s0-x-1-cs-101.csv"',
+        )
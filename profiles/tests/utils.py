@@ -0,0 +1,110 @@
+from datetime import time
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from accounts.models import CustomUser
+from profiles.catalog import clear_catalog
+from profiles.models import (
+    Course,
+    Curriculum,
+    CurriculumCourse,
+    Department,
+    Professor,
+    Program,
+    Record,
+    Room,
+    Schedule,
+    Section,
+    Student,
+)
+from profiles.occupancy import clear_grids
+from profiles.prerequisites import invalidate_graph
+
+
+def create_user(username, is_staff=False, **fields):
+    return CustomUser.objects.create(
+        username=username,
+        email="%s@example.com" % username,
+        contact_number=username,
+        first_name=username,
+        last_name="User",
+        is_staff=is_staff,
+        **fields,
+    )
+
+
+def create_professor(username):
+    return Professor.objects.create(user=create_user(username, is_staff=True))
+
+
+def create_student(username, curriculum=None):
+    return Student.objects.create(
+        user=create_user(username), gender="F", curriculum=curriculum
+    )
+
+
+def create_curriculum(title="BSCS 2020"):
+    department, created = Department.objects.get_or_create(title="Computer Science")
+    program, created = Program.objects.get_or_create(
+        title="BSCS", department=department
+    )
+    return Curriculum.objects.create(title=title, program=program)
+
+
+def create_course(code, curriculum=None, units=3, year_level=1, academic_term=1):
+    """A course, and its curriculum course if ``curriculum`` is given."""
+    course = Course.objects.create(code=code, title="Course %s" % code, units=units)
+    if curriculum is None:
+        return course
+    return CurriculumCourse.objects.create(
+        curriculum=curriculum,
+        course=course,
+        year_level=year_level,
+        academic_term=academic_term,
+    )
+
+
+def create_record(curriculum_course, advisor, section, term=(2025, 1), **fields):
+    if isinstance(section, str):
+        section, created = Section.objects.get_or_create(
+            name=section, defaults={"is_open": False}
+        )
+    return Record.objects.create(
+        academic_year=term[0],
+        academic_term=term[1],
+        curriculum_course=curriculum_course,
+        advisor=advisor,
+        section=section,
+        **fields,
+    )
+
+
+def create_schedule(record, room, day=1, start=8, end=9, professor=None):
+    """A meeting of ``record`` from hour ``start`` to hour ``end``."""
+    if isinstance(room, str):
+        room, created = Room.objects.get_or_create(number=room)
+    return Schedule.objects.create(
+        record=record,
+        room=room,
+        professor=professor or record.advisor,
+        day=day,
+        start_time=start if isinstance(start, time) else time(start),
+        end_time=end if isinstance(end, time) else time(end),
+    )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CATALOG_CACHE=None,
+)
+class CacheTestCase(TestCase):
+    """
+    A test case with caches of its own, emptied before each test, as rolling
+    back a test's changes bumps no table version.
+    """
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        clear_catalog()
+        clear_grids()
+        invalidate_graph()
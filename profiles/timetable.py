@@ -0,0 +1,316 @@
+import math
+import random
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from profiles.bitmaps import SLOT_MINUTES, minutes_of, span_mask, time_of
+
+# The search only works on the plain tuples below, so that it can run in
+# worker processes that have no database connection.
+Task = namedtuple("Task", ["record", "professor", "section", "minutes"])
+Placement = namedtuple(
+    "Placement", ["record", "professor", "room", "days", "start", "end"]
+)
+Problem = namedtuple(
+    "Problem", ["tasks", "rooms", "busy", "days", "day_start", "day_end", "step"]
+)
+Solution = namedtuple("Solution", ["placements", "unplaced", "ejections", "seed"])
+
+
+def day_patterns(meetings, days):
+    """Sets of ``meetings`` days out of the first ``days``, a day apart."""
+    return [
+        pattern
+        for pattern in combinations(range(1, days + 1), meetings)
+        if all(second - first > 1 for first, second in zip(pattern, pattern[1:]))
+    ]
+
+
+def meetings_of(minutes):
+    if minutes <= 90:
+        return 1
+    if minutes <= 360:
+        return 2
+    return 3
+
+
+def options_of(problem, minutes):
+    """Every (days, start, end, mask) a course of ``minutes`` a week fits in."""
+    meetings = meetings_of(minutes)
+    length = math.ceil(minutes / meetings / SLOT_MINUTES) * SLOT_MINUTES
+    options = []
+    for days in day_patterns(meetings, problem.days):
+        for start in range(
+            problem.day_start, problem.day_end - length + 1, problem.step
+        ):
+            mask = 0
+            for day in days:
+                mask |= span_mask(day, start, start + length)
+            options.append((days, start, start + length, mask))
+    return options
+
+
+class Solver:
+    """
+    Greedy placement of the most constrained records first, with conflict
+    bitmaps per room, professor and section. A record that fits nowhere
+    takes the option that displaces the fewest records placed by this
+    search, which go back to the queue, until ``max_ejections`` is spent.
+    """
+
+    sample = 12
+
+    def __init__(self, problem, seed=0, max_ejections=None):
+        self.problem = problem
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.max_ejections = (
+            len(problem.tasks) if max_ejections is None else max_ejections
+        )
+        self.fixed = problem.busy
+        self.busy = defaultdict(int, problem.busy)
+        self.owners = defaultdict(dict)
+        self.placed = {}
+        self.ejected_by = {}
+        self.options = {}
+
+    def resources(self, task, room):
+        return (
+            ("room", room),
+            ("professor", task.professor),
+            ("section", task.section),
+        )
+
+    def options_for(self, task):
+        # Earliest start first packs the rooms, the shuffle varies the days.
+        if task.minutes not in self.options:
+            options = options_of(self.problem, task.minutes)
+            self.random.shuffle(options)
+            options.sort(key=lambda option: option[1])
+            self.options[task.minutes] = options
+        return self.options[task.minutes]
+
+    def rooms(self):
+        rooms = self.problem.rooms
+        offset = self.random.randrange(len(rooms)) if rooms else 0
+        return rooms[offset:] + rooms[:offset]
+
+    def assign(self, task, room, days, start, end, mask):
+        for key in self.resources(task, room):
+            self.busy[key] |= mask
+            self.owners[key][task.record] = mask
+        self.placed[task.record] = (
+            task,
+            Placement(task.record, task.professor, room, days, start, end),
+            mask,
+        )
+
+    def unassign(self, record):
+        task, placement, mask = self.placed.pop(record)
+        for key in self.resources(task, placement.room):
+            self.busy[key] &= ~mask
+            del self.owners[key][record]
+        return task
+
+    def place(self, task):
+        taken = self.busy[("professor", task.professor)]
+        taken |= self.busy[("section", task.section)]
+        for days, start, end, mask in self.options_for(task):
+            if mask & taken:
+                continue
+            for room in self.problem.rooms:
+                if not self.busy[("room", room)] & mask:
+                    self.assign(task, room, days, start, end, mask)
+                    return True
+        return False
+
+    def clashes(self, key, mask):
+        return {record for record, owned in self.owners[key].items() if owned & mask}
+
+    def displace(self, task):
+        protected = self.ejected_by.get(task.record)
+        professor = ("professor", task.professor)
+        section = ("section", task.section)
+        fixed = self.fixed.get(professor, 0) | self.fixed.get(section, 0)
+        best = None
+        options = self.options_for(task)
+        for days, start, end, mask in self.random.sample(
+            options, min(self.sample, len(options))
+        ):
+            if mask & fixed:
+                continue
+            clashes = self.clashes(professor, mask) | self.clashes(section, mask)
+            if protected in clashes:
+                continue
+            if best is not None and len(clashes) >= len(best[0]):
+                continue
+            for room in self.rooms():
+                key = ("room", room)
+                if self.fixed.get(key, 0) & mask:
+                    continue
+                ejected = clashes | self.clashes(key, mask)
+                if protected in ejected:
+                    continue
+                if best is None or len(ejected) < len(best[0]):
+                    best = (ejected, room, days, start, end, mask)
+                    if len(ejected) == len(clashes):
+                        break
+        if best is None:
+            return None
+        ejected, room, days, start, end, mask = best
+        tasks = []
+        for record in ejected:
+            self.ejected_by[record] = task.record
+            tasks.append(self.unassign(record))
+        self.assign(task, room, days, start, end, mask)
+        return tasks
+
+    def solve(self):
+        load = defaultdict(int)
+        for task in self.problem.tasks:
+            load[("professor", task.professor)] += task.minutes
+            load[("section", task.section)] += task.minutes
+        queue = deque(
+            sorted(
+                self.problem.tasks,
+                key=lambda task: (
+                    -load[("professor", task.professor)]
+                    - load[("section", task.section)],
+                    -task.minutes,
+                    self.random.random(),
+                ),
+            )
+        )
+        unplaced = []
+        ejections = 0
+        while queue:
+            task = queue.popleft()
+            if self.place(task):
+                continue
+            if ejections < self.max_ejections:
+                ejected = self.displace(task)
+                if ejected is not None:
+                    ejections += len(ejected)
+                    queue.extend(ejected)
+                    continue
+            unplaced.append(task.record)
+        return Solution(
+            [placement for task, placement, mask in self.placed.values()],
+            unplaced,
+            ejections,
+            self.seed,
+        )
+
+
+def solve(problem, seed=0, max_ejections=None):
+    return Solver(problem, seed, max_ejections).solve()
+
+
+def quality(solution):
+    return (len(solution.unplaced), solution.ejections)
+
+
+def search(problem, restarts=1, workers=1, seed=0, max_ejections=None):
+    """
+    Run ``restarts`` randomized searches, in ``workers`` processes if more
+    than one, and return the solution that leaves the fewest records
+    unplaced. Stops at the first solution that places every record.
+    """
+    seeds = range(seed, seed + max(restarts, 1))
+    best = None
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [
+                executor.submit(solve, problem, seed, max_ejections) for seed in seeds
+            ]
+            for future in as_completed(futures):
+                solution = future.result()
+                if best is None or quality(solution) < quality(best):
+                    best = solution
+                if not best.unplaced:
+                    executor.shutdown(cancel_futures=True)
+                    break
+        return best
+    for seed in seeds:
+        solution = solve(problem, seed, max_ejections)
+        if best is None or quality(solution) < quality(best):
+            best = solution
+        if not best.unplaced:
+            break
+    return best
+
+
+def load_problem(records, days=6, day_start=7 * 60, day_end=21 * 60, step=30):
+    """
+    Build the problem of placing ``records``, which must all be of one term,
+    around the saved schedules of the other records of that term.
+    """
+    # Imported here so that search workers do not need Django set up.
+    from profiles.models import Room, Schedule
+
+    rows = list(
+        records.values_list(
+            "pk",
+            "advisor",
+            "section",
+            "curriculum_course__course__units",
+            "academic_year",
+            "academic_term",
+        )
+    )
+    terms = {(row[4], row[5]) for row in rows}
+    if len(terms) > 1:
+        raise ValueError("The records must all be of the same term.")
+    busy = defaultdict(int)
+    for academic_year, academic_term in terms:
+        for room, professor, section, day, start_time, end_time in (
+            Schedule.objects.filter(
+                record__academic_year=academic_year,
+                record__academic_term=academic_term,
+            )
+            .exclude(record__in=[row[0] for row in rows])
+            .values_list(
+                "room", "professor", "record__section", "day", "start_time", "end_time"
+            )
+            .iterator()
+        ):
+            mask = span_mask(
+                day, minutes_of(start_time), minutes_of(end_time, round_up=True)
+            )
+            busy[("room", room)] |= mask
+            busy[("professor", professor)] |= mask
+            busy[("section", section)] |= mask
+    return Problem(
+        tasks=[
+            Task(record, professor, section, round(units * 60))
+            for record, professor, section, units, year, term in rows
+            if units > 0
+        ],
+        rooms=list(Room.objects.order_by("pk").values_list("pk", flat=True)),
+        busy=dict(busy),
+        days=days,
+        day_start=day_start,
+        day_end=day_end,
+        step=step,
+    )
+
+
+def build_schedules(solution):
+    """Unsaved schedules for ``solution``, with their records attached."""
+    from profiles.models import Record, Schedule
+
+    records = Record.objects.in_bulk(
+        [placement.record for placement in solution.placements]
+    )
+    return [
+        Schedule(
+            record=records[placement.record],
+            room_id=placement.room,
+            professor_id=placement.professor,
+            day=day,
+            start_time=time_of(placement.start),
+            end_time=time_of(placement.end),
+        )
+        for placement in solution.placements
+        for day in placement.days
+    ]
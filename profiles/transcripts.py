@@ -0,0 +1,92 @@
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from profiles.models import Student, StudentRecord, Transcript
+
+GRADED = Q(remark__in=["PSD", "FLD"])
+UNITS = F("record__curriculum_course__course__units")
+SUMMARY = {
+    "units_attempted": Sum(UNITS, filter=GRADED),
+    "units_earned": Sum(UNITS, filter=Q(remark="PSD")),
+    "rating_total": Sum(F("rating") * UNITS, filter=GRADED),
+    "passed": Count("pk", filter=Q(remark="PSD")),
+    "failed": Count("pk", filter=Q(remark="FLD")),
+    "dropped": Count("pk", filter=Q(remark="DRP")),
+    "incomplete": Count("pk", filter=Q(remark="INC")),
+}
+FIELDS = [
+    "units_attempted",
+    "units_earned",
+    "weighted_rating",
+    "passed",
+    "failed",
+    "dropped",
+    "incomplete",
+    "updated_at",
+]
+
+
+def build_transcript(student_id, summary, now):
+    summary = summary or {}
+    units_attempted = summary.get("units_attempted") or 0
+    return Transcript(
+        student_id=student_id,
+        units_attempted=units_attempted,
+        units_earned=summary.get("units_earned") or 0,
+        weighted_rating=(
+            summary["rating_total"] / units_attempted if units_attempted else None
+        ),
+        passed=summary.get("passed", 0),
+        failed=summary.get("failed", 0),
+        dropped=summary.get("dropped", 0),
+        incomplete=summary.get("incomplete", 0),
+        updated_at=now,
+    )
+
+
+def refresh_transcripts(student_ids=None, batch_size=1000):
+    """
+    Recompute the transcripts of ``student_ids``, or of every student, with
+    one grouped aggregate over their student records.
+    """
+    students = Student.objects.all()
+    if student_ids is not None:
+        students = students.filter(pk__in=student_ids)
+    summaries = {
+        row.pop("student"): row
+        for row in StudentRecord.objects.filter(student__in=students)
+        .values("student")
+        .annotate(**SUMMARY)
+    }
+    existing = set(
+        Transcript.objects.filter(student__in=students).values_list(
+            "student", flat=True
+        )
+    )
+    now = timezone.now()
+    transcripts = [
+        build_transcript(pk, summaries.get(pk), now)
+        for pk in students.values_list("pk", flat=True)
+    ]
+    Transcript.objects.bulk_update(
+        [transcript for transcript in transcripts if transcript.pk in existing],
+        FIELDS,
+        batch_size=batch_size,
+    )
+    Transcript.objects.bulk_create(
+        [transcript for transcript in transcripts if transcript.pk not in existing],
+        batch_size=batch_size,
+    )
+    return len(transcripts)
+
+
+def honors_list(min_rating, min_units=0):
+    return (
+        Transcript.objects.filter(
+            weighted_rating__gte=min_rating,
+            units_earned__gte=min_units,
+            failed=0,
+            incomplete=0,
+        )
+        .select_related("student__user")
+        .order_by("-weighted_rating", "-units_earned")
+    )
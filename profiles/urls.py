@@ -0,0 +1,14 @@
+from django.urls import path
+from profiles import views
+
+app_name = "profiles"
+urlpatterns = [
+    path("enroll/", views.enroll, name="enroll"),
+    path("records/<int:record_id>/grades/", views.grade_record, name="grade_record"),
+    path("schedule/", views.my_schedule, name="my_schedule"),
+    path("audit/", views.audit, name="audit"),
+    path("exports/<slug:name>/", views.export, name="export"),
+    path("jobs/<int:job_id>/", views.job, name="job"),
+    path("jobs/<int:job_id>/file/", views.job_file, name="job_file"),
+    path("profiling/metrics/", views.metrics, name="profiling_metrics"),
+]
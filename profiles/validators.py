@@ -1,16 +1,12 @@
 from django.core.exceptions import ValidationError
-from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
-from accounts.models import CustomUser
 
 
-def validate_professor(pk):
-    user = CustomUser.objects.get(Q(pk=pk))
+def validate_professor(user):
     if not user.is_staff:
-        raise ValidationError(_("User is not a staff."))
+        raise ValidationError({"user": _("User is not a staff.")})
 
 
-def validate_student(pk):
-    user = CustomUser.objects.get(Q(pk=pk))
+def validate_student(user):
     if user.is_staff:
-        raise ValidationError(_("User is a staff."))
+        raise ValidationError({"user": _("User is a staff.")})
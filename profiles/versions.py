@@ -0,0 +1,83 @@
+import time
+from django.core.cache import cache
+from django.db import transaction
+from accounts.models import CustomUser
+from profiles.models import (
+    Course,
+    Curriculum,
+    CurriculumCourse,
+    Department,
+    Professor,
+    Program,
+    Record,
+    Room,
+    Schedule,
+    Section,
+    StudentTimetable,
+)
+
+# Every table the API reads has a version in the cache, the time in
+# nanoseconds of its last change. Responses are validated against these
+# versions alone, so a request for an unchanged page never reaches the
+# database. The cache must be shared by every process serving the API.
+VERSION_KEY = "table-version:%s"
+VERSIONED_MODELS = (
+    CustomUser,
+    Department,
+    Program,
+    Course,
+    Course.prerequisites.through,
+    Course.corequisites.through,
+    Curriculum,
+    CurriculumCourse,
+    Section,
+    Room,
+    Professor,
+    Record,
+    Schedule,
+    StudentTimetable,
+)
+# Saves of only these fields change nothing the API shows.
+UNVERSIONED_FIELDS = {"last_login", "password"}
+
+
+def version_key(model):
+    return VERSION_KEY % model._meta.label_lower
+
+
+def touch(*models):
+    """
+    Give the tables of ``models`` a new version once the current
+    transaction commits, so that no reader can pair the new version with
+    the old rows. Bulk writes, which send no signals, must call this.
+    """
+    touch_keys({version_key(model) for model in models})
+
+
+def table_versions(models):
+    """
+    The versions of the tables of ``models``. A table without one, as after
+    a cache restart, is treated as changed just now.
+    """
+    return key_versions([version_key(model) for model in models])
+
+
+def touch_keys(keys):
+    """Like touch(), for version keys other than those of tables."""
+    keys = set(keys)
+    if keys:
+        transaction.on_commit(
+            lambda: cache.set_many({key: time.time_ns() for key in keys}, timeout=None)
+        )
+
+
+def key_versions(keys):
+    """Like table_versions(), for version keys other than those of tables."""
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
@@ -1,3 +1,314 @@
-from django.shortcuts import render
+import json
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user
+from django.core.exceptions import ValidationError
+from django.http import (
+    FileResponse,
+    HttpResponseNotAllowed,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import (
+    require_GET,
+    require_http_methods,
+    require_POST,
+)
+from profiles import enrollment
+from profiles.audits import audit_students
+from profiles.catalog import catalog_stats
+from profiles.database import database_metrics
+from profiles.exports import (
+    EXPORTS,
+    FORMATS,
+    clean_filters,
+    csv_chunks,
+    export_filename,
+    export_rows,
+    openpyxl,
+    xlsx_file,
+)
+from profiles.forms import ProfilingForm
+from profiles.grading import apply_grades
+from profiles.jobs import enqueue, job_progress
+from profiles.models import Job, Record, Student
+from profiles.profiling import get_sampling, profiling_metrics, set_sampling
+from profiles.student_timetables import timetables_of
 
-# Create your views here.
+# enroll and my_schedule carry most of the traffic, so they are async and
+# use the async ORM; under ASGI they wait on the database without holding
+# a worker. The method decorators of this Django version only wrap sync
+# views, so they check the method themselves.
+
+
+async def current_user(request):
+    return await sync_to_async(get_user)(request)
+
+
+async def enroll(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    user = await current_user(request)
+    if not user.is_authenticated:
+        return JsonResponse({"errors": ["Authentication required."]}, status=401)
+    try:
+        student = await Student.objects.aget(pk=user.pk)
+    except Student.DoesNotExist:
+        return JsonResponse({"errors": ["User is not a student."]}, status=403)
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        body = None
+    record_ids = body.get("records") if isinstance(body, dict) else None
+    if not isinstance(record_ids, list) or not all(
+        type(pk) is int for pk in record_ids
+    ):
+        return JsonResponse(
+            {"errors": ["Expected a JSON object with a list of record ids."]},
+            status=400,
+        )
+    try:
+        # Not thread sensitive, so that enrollments run in parallel threads
+        # instead of queueing for the single thread of sync code.
+        student_records = await sync_to_async(
+            enrollment.enroll, thread_sensitive=False
+        )(student, record_ids)
+    except ValidationError as error:
+        return JsonResponse({"errors": error.messages}, status=409)
+    return JsonResponse(
+        {"records": [student_record.record_id for student_record in student_records]},
+        status=201,
+    )
+
+
+@require_POST
+def grade_record(request, record_id):
+    if not request.user.is_authenticated:
+        return JsonResponse({"errors": ["Authentication required."]}, status=401)
+    try:
+        record = Record.objects.only("advisor").get(pk=record_id)
+    except Record.DoesNotExist:
+        return JsonResponse({"errors": ["Unknown record."]}, status=404)
+    if not request.user.is_superuser and record.advisor_id != request.user.pk:
+        return JsonResponse(
+            {"errors": ["Only the record's professor can grade it."]}, status=403
+        )
+    try:
+        grades = {
+            (record.pk, int(entry["student"])): entry["grade"]
+            for entry in json.loads(request.body)["grades"]
+        }
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse(
+            {"errors": ["Expected a JSON object with a list of student grades."]},
+            status=400,
+        )
+    try:
+        changed = apply_grades(grades)
+    except ValidationError as error:
+        return JsonResponse({"errors": error.messages}, status=400)
+    return JsonResponse({"updated": len(changed)})
+
+
+async def my_schedule(request):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    user = await current_user(request)
+    if not user.is_authenticated:
+        return JsonResponse({"errors": ["Authentication required."]}, status=401)
+    term = [request.GET.get(key) for key in ("academic_year", "academic_term")]
+    if term != [None, None]:
+        try:
+            term = [int(value) for value in term]
+        except (TypeError, ValueError):
+            return JsonResponse(
+                {"errors": ["Expected both an academic year and an academic term."]},
+                status=400,
+            )
+    if not await Student.objects.filter(pk=user.pk).aexists():
+        return JsonResponse({"errors": ["User is not a student."]}, status=403)
+    timetable = await timetables_of(user.pk, *term).afirst()
+    if timetable is None:
+        return JsonResponse({"errors": ["No schedule for this term."]}, status=404)
+    return JsonResponse(
+        {
+            "academic_year": timetable.academic_year,
+            "academic_term": timetable.academic_term,
+            "meetings": timetable.meetings,
+        }
+    )
+
+
+@require_http_methods(["GET", "HEAD", "POST"])
+def export(request, name):
+    if not request.user.is_authenticated:
+        return JsonResponse({"errors": ["Authentication required."]}, status=401)
+    if not request.user.is_staff:
+        return JsonResponse({"errors": ["Exports are for staff only."]}, status=403)
+    if name not in EXPORTS:
+        return JsonResponse({"errors": ["Unknown export."]}, status=404)
+    params = request.POST if request.method == "POST" else request.GET
+    extension = params.get("format", "csv")
+    if extension not in FORMATS:
+        return JsonResponse(
+            {"errors": ["Expected a format of %s." % " or ".join(FORMATS)]},
+            status=400,
+        )
+    if extension == "xlsx" and openpyxl is None:
+        return JsonResponse({"errors": ["XLSX exports are not available."]}, status=400)
+    try:
+        filters = clean_filters(EXPORTS[name], params)
+    except ValueError:
+        return JsonResponse(
+            {"errors": ["Expected a numeric academic year and term."]}, status=400
+        )
+    if request.method == "POST":
+        # Large exports are written by a background job instead.
+        job = enqueue(
+            "export_records",
+            {"export": name, "format": extension, **filters},
+            created_by=request.user,
+        )
+        return JsonResponse(
+            {"job": job.pk, "url": reverse("profiles:job", args=[job.pk])},
+            status=202,
+        )
+    filename = export_filename(name, filters, extension)
+    rows = export_rows(EXPORTS[name], filters)
+    if extension == "xlsx":
+        return FileResponse(
+            xlsx_file(rows, name), as_attachment=True, filename=filename
+        )
+    return StreamingHttpResponse(
+        csv_chunks(rows),
+        content_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="%s"' % filename},
+    )
+
+
+@require_GET
+def audit(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"errors": ["Authentication required."]}, status=401)
+    result = audit_students([request.user.pk]).get(request.user.pk)
+    if result is None:
+        return JsonResponse(
+            {"errors": ["User is not a student of any curriculum."]}, status=404
+        )
+    return JsonResponse(
+        {
+            "curriculum": result.curriculum,
+            "units_required": result.units_required,
+            "units_earned": result.units_earned,
+            "units_remaining": result.units_remaining,
+            "missing": [
+                {
+                    "year_level": year_level,
+                    "academic_term": academic_term,
+                    "courses": courses,
+                }
+                for (year_level, academic_term), courses in result.missing.items()
+            ],
+            "blocked": result.blocked,
+            "eligible": result.eligible,
+        }
+    )
+
+
+def staff_job(view):
+    @wraps(view)
+    def wrapper(request, job_id):
+        if not request.user.is_authenticated:
+            return JsonResponse({"errors": ["Authentication required."]}, status=401)
+        if not request.user.is_staff:
+            return JsonResponse({"errors": ["Jobs are for staff only."]}, status=403)
+        job = Job.objects.filter(pk=job_id).first()
+        if job is None:
+            return JsonResponse({"errors": ["Unknown job."]}, status=404)
+        return view(request, job)
+
+    return wrapper
+
+
+@require_GET
+@staff_job
+def job(request, job):
+    done, total = job_progress(job)
+    data = {
+        "id": job.pk,
+        "name": job.name,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "progress": {"done": done, "total": total},
+        "result": job.result,
+        "error": job.error.strip().splitlines()[-1] if job.error else None,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == Job.SUCCEEDED and "file" in (job.result or {}):
+        data["file"] = reverse("profiles:job_file", args=[job.pk])
+    return JsonResponse(data)
+
+
+@require_GET
+@staff_job
+def job_file(request, job):
+    if job.status != Job.SUCCEEDED or "file" not in (job.result or {}):
+        return JsonResponse({"errors": ["The job has no file."]}, status=404)
+    name = Path(job.result["file"]).name
+    try:
+        file = open(Path(settings.JOBS_DIR) / name, "rb")
+    except FileNotFoundError:
+        return JsonResponse({"errors": ["The file was removed."]}, status=404)
+    return FileResponse(file, as_attachment=True, filename=name.split("-", 1)[1])
+
+
+@require_GET
+def metrics(request):
+    if not getattr(settings, "PROFILING_METRICS_VIEW", False):
+        return JsonResponse({"errors": ["Metrics are turned off."]}, status=404)
+    if not request.user.is_authenticated:
+        return JsonResponse({"errors": ["Authentication required."]}, status=401)
+    if not request.user.is_staff:
+        return JsonResponse({"errors": ["Metrics are for staff only."]}, status=403)
+    return JsonResponse(
+        {
+            **profiling_metrics(),
+            "database": database_metrics(),
+            "catalog": catalog_stats(),
+            "sampling": get_sampling(),
+        }
+    )
+
+
+def profiling(request):
+    """The admin page that turns sampled profiling on and off."""
+    sampling = get_sampling()
+    if request.method == "POST":
+        form = ProfilingForm(request.POST)
+        if form.is_valid():
+            set_sampling(form.cleaned_data["rate"], form.cleaned_data["minutes"])
+            return HttpResponseRedirect(request.path)
+    else:
+        form = ProfilingForm(initial={"rate": sampling["rate"] if sampling else 0})
+    return TemplateResponse(
+        request,
+        "admin/profiles/profiling.html",
+        {
+            **admin.site.each_context(request),
+            "title": _("Profiling"),
+            "form": form,
+            "sampling": sampling,
+            "until": datetime.fromtimestamp(sampling["until"]) if sampling else None,
+            "profiling_dir": getattr(settings, "PROFILING_DIR", None),
+        },
+    )
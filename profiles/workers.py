@@ -0,0 +1,15 @@
+# Entry points of the spawned job processes. A spawned process unpickles
+# these before Django is set up, so nothing that needs the app registry
+# may be imported at module level.
+
+
+def setup():
+    import django
+
+    django.setup()
+
+
+def run_job(pk):
+    from profiles.jobs import run_job
+
+    return run_job(pk)